@@ -1,8 +1,12 @@
 # ---------------------------------------------------------------------------- #
 # Imports
 # ---------------------------------------------------------------------------- #
+from datetime import datetime
+from functools import lru_cache
+
 import dateutil.parser
-from babel.dates import format_datetime as babel_format_datetime
+from babel import Locale
+from babel.dates import format_datetime as babel_format_datetime, parse_pattern
 from flask import Flask, render_template, abort
 from flask_moment import Moment
 from flask_migrate import Migrate
@@ -13,7 +17,10 @@ from flask_wtf.csrf import CSRFError
 from http import HTTPStatus
 
 from util import set_config, get_config
-from misc import print_exc_info
+from misc import print_exc_info, get_latest_lists
+from misc.profiler import init_profiler
+from misc.archive import init_archiver
+from misc.fragments import init_fragment_cache
 
 # ---------------------------------------------------------------------------- #
 # App Config.
@@ -32,16 +39,23 @@ LOCALE = get_config("DEFAULT_LOCALE")
 
 if ORM:
     from models import SQLAlchemyDB as db
-    from misc import latest_lists_orm as latest_lists
+    from misc.pool import engine_options
 
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
     db.init_app(app)
 
     migrate = Migrate(app, db)
 else:  # ENGINE
-    from misc.engine import setup
-    from misc import latest_lists_engine as latest_lists
+    from misc.engine import setup, release_connection
 
     setup()
+    app.teardown_appcontext(release_connection)
+
+if get_config("PROFILE_QUERIES"):
+    init_profiler(app)
+
+init_archiver(app)
+init_fragment_cache(app)
 
 # https://nickjanetakis.com/blog/fix-missing-csrf-token-issues-with-flask
 csrf = CSRFProtect()
@@ -52,22 +66,31 @@ csrf.init_app(app)
 # ---------------------------------------------------------------------------- #
 
 from controllers import (
-    shows, create_show, search_shows, search_shows_advanced,
+    shows, create_show, search_shows, search_shows_advanced, bulk_shows, export_shows,
     artists, search_artists, search_artists_advanced, display_artist,
-    edit_artist, delete_artist, artist_availability, create_artist,
+    edit_artist, delete_artist, artist_availability, create_artist, search_artist_names,
+    export_artists,
     venues, search_venues, search_venues_advanced, display_venue,
-    create_venue, delete_venue, edit_venue, venue_bookings, venue_search_performer
+    create_venue, delete_venue, edit_venue, venue_bookings, venue_search_performer, search_venue_names,
+    export_venues,
+    pool_status, profile_status, cache_status
 )
 
 app.add_url_rule('/shows', view_func=shows, methods=['GET'])
 app.add_url_rule('/shows/search', view_func=search_shows, methods=['POST'])
 app.add_url_rule('/shows/advanced_search', view_func=search_shows_advanced, methods=['GET', 'POST'])
+app.add_url_rule('/shows/export', view_func=export_shows, methods=['GET'])
 app.add_url_rule('/shows/create', view_func=create_show, methods=['POST', 'GET'])
+# api for other applications; only accepts json or csv requests, which browsers won't send cross-site without
+# a cors preflight, so csrf protection is not needed
+app.add_url_rule('/shows/bulk', view_func=csrf.exempt(bulk_shows), methods=['POST'])
 
 app.add_url_rule('/artists', view_func=artists, methods=['GET'])
 app.add_url_rule('/artists/search', view_func=search_artists, methods=['POST'])
 app.add_url_rule('/artists/advanced_search', view_func=search_artists_advanced, methods=['GET', 'POST'])
+app.add_url_rule('/artists/export', view_func=export_artists, methods=['GET'])
 app.add_url_rule('/artists/create', view_func=create_artist, methods=['POST', 'GET'])
+app.add_url_rule('/artists/names', view_func=search_artist_names, methods=['GET'])
 app.add_url_rule('/artists/<int:artist_id>', view_func=display_artist, methods=['GET'])
 app.add_url_rule('/artists/<int:artist_id>', view_func=delete_artist, methods=['DELETE'])
 app.add_url_rule('/artists/<int:artist_id>/edit', view_func=edit_artist, methods=['POST', 'GET'])
@@ -76,25 +99,51 @@ app.add_url_rule('/artists/<int:artist_id>/availability', view_func=artist_avail
 app.add_url_rule('/venues', view_func=venues, methods=['GET'])
 app.add_url_rule('/venues/search', view_func=search_venues, methods=['POST'])
 app.add_url_rule('/venues/advanced_search', view_func=search_venues_advanced, methods=['GET', 'POST'])
+app.add_url_rule('/venues/export', view_func=export_venues, methods=['GET'])
 app.add_url_rule('/venues/create', view_func=create_venue, methods=['POST', 'GET'])
+app.add_url_rule('/venues/names', view_func=search_venue_names, methods=['GET'])
 app.add_url_rule('/venues/<int:venue_id>', view_func=display_venue, methods=['GET'])
 app.add_url_rule('/venues/<int:venue_id>', view_func=delete_venue, methods=['DELETE'])
 app.add_url_rule('/venues/<int:venue_id>/edit', view_func=edit_venue, methods=['POST', 'GET'])
 app.add_url_rule('/venues/<int:venue_id>/bookings', view_func=venue_bookings, methods=['GET'])
 app.add_url_rule('/venues/<int:venue_id>/search/artist', view_func=venue_search_performer, methods=['POST'])
 
+if get_config("DEBUG_ENDPOINTS"):
+    app.add_url_rule('/debug/pool', view_func=pool_status, methods=['GET'])
+    app.add_url_rule('/debug/profile', view_func=profile_status, methods=['GET'])
+    app.add_url_rule('/debug/cache', view_func=cache_status, methods=['GET'])
+
 # ---------------------------------------------------------------------------- #
 # Filters.
 # ---------------------------------------------------------------------------- #
 
 
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def datetime_formatter(date_format: str, locale: str):
+    """
+    Get the parsed Babel pattern and locale for a format
+    :param date_format: 'full', 'medium' or a Babel datetime pattern
+    :param locale:      locale identifier
+    :return: tuple of (pattern, locale), pattern is None for the other Babel named formats, i.e. 'long' and 'short'
+    """
+    date_format = DATETIME_FORMATS.get(date_format, date_format)
+    pattern = None if date_format in ('long', 'short') else parse_pattern(date_format)
+    return pattern, Locale.parse(locale)
+
+
 def format_datetime(date_value, date_format='medium'):
-    date = dateutil.parser.parse(date_value)
-    if date_format == 'full':
-        date_format = "EEEE MMMM, d, y 'at' h:mma"
-    elif date_format == 'medium':
-        date_format = "EE MM, dd, y h:mma"
-    return babel_format_datetime(date, format=date_format, locale=LOCALE)
+    # templates are passed datetimes, strings are still accepted
+    date = date_value if isinstance(date_value, datetime) else dateutil.parser.parse(date_value)
+    pattern, locale = datetime_formatter(date_format, LOCALE)
+    if pattern is None:
+        return babel_format_datetime(date, format=date_format, locale=locale)
+    return pattern.apply(date, locale)
 
 
 app.jinja_env.filters['datetime'] = format_datetime
@@ -123,16 +172,14 @@ def inject_user():
 
 @app.route('/')
 def index():
-    latest_artists = []
-    latest_venues = []
+    artist_list = []
+    venue_list = []
     try:
-        latest_artists, latest_venues = latest_lists()
+        artist_list, venue_list = get_latest_lists()
     except:
         print_exc_info()
         abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
-       
-    artist_list = [{'id': a.id, 'name': a.name} for a in latest_artists]
-    venue_list = [{'id': v.id, 'name': v.name} for v in latest_venues]
+
     return render_template('pages/home.html', artists=artist_list, venues=venue_list)
 
 
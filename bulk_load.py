@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Bulk loader for genres, venues, artists, availability and shows.
+
+Loads CSV files with a header row, or JSONL files with one object per line, named after the data they contain, i.e.
+genres, venues, artists, availability or shows, with a .csv or .jsonl extension. Files are loaded in that order,
+so shows may refer to the venues and artists loaded before them.
+
+Venues and artists require an 'id', which shows and availability use to refer to them, and may specify 'genres'
+as a list of genre names, or a comma-separated string in CSV files. Shows require a 'duration' of 1 to
+MAX_SHOW_DURATION minutes. Columns which are not properties of the model are ignored, so the output of the export
+endpoints may be loaded. The columns loaded are those of the CSV header, or the keys of the first JSONL object.
+
+Rows are copied into a staging table, and inserted from there, a batch at a time; rows which conflict with
+existing rows, e.g. same id, are skipped, so rows with ids may be reloaded safely; rows without ids, e.g. shows
+exported without an id column, are duplicated if reloaded. Progress is recorded in a state file after each batch,
+so an interrupted load may be resumed by running the same command again.
+
+Usage:
+    python bulk_load.py [-b BATCH_SIZE] [-s STATE_FILE] [--restart] PATH [PATH ...]
+where PATH is a file or a directory containing files to load.
+"""
+# ---------------------------------------------------------------------------- #
+# Imports
+# ---------------------------------------------------------------------------- #
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import date, time
+from time import perf_counter
+from typing import Iterator, Union
+
+from sqlalchemy import create_engine, Table
+
+from config import SQLALCHEMY_DATABASE_URI, BULK_LOAD_BATCH_SIZE, MAX_SHOW_DURATION
+from models import (Venue, Artist, Show, Genre, Availability, SQLAlchemyDB as db,
+                    VENUE_GENRES_TABLE, ARTIST_GENRES_TABLE)
+
+DEFAULT_STATE_FILE = 'bulk_load_state.json'
+CSV_EXT = '.csv'
+JSONL_EXT = '.jsonl'
+GENRES_KEY = 'genres'
+# min seconds between progress reports
+PROGRESS_INTERVAL = 5
+
+# null and escaped characters in PostgreSQL COPY text format
+_COPY_NULL_ = '\\N'
+_COPY_ESCAPES_ = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+class BulkLoadError(Exception):
+    """
+    Exception raised when a file can't be loaded
+    """
+    pass
+
+
+class Source:
+    """
+    Class representing a type of file which may be loaded
+    :param name:        file name, without extension
+    :param table:       table to load
+    :param required:    columns which each row must specify
+    :param genre_link:  name of genre link table; None if genres are not loaded
+    :param ranges:      dict of column: (min, max) inclusive range of valid integer values
+    """
+    def __init__(self, name: str, table: Table, required: list, genre_link: str = None, ranges: dict = None):
+        self.name = name
+        self.table = table
+        self.required = required
+        self.ranges = ranges if ranges is not None else {}
+        self.genre_link = db.metadata.tables[genre_link] if genre_link is not None else None
+
+    def link_column(self) -> str:
+        """
+        Get the name of the genre link table column referencing the loaded table
+        """
+        return [c.name for c in self.genre_link.columns if c.name != 'genre_id'][0]
+
+    def defaults(self, columns: list) -> dict:
+        """
+        Get the model defaults for the columns which are not loaded; the defaults are not set by the database
+        :param columns: columns loaded
+        """
+        return {c.name: c.default.arg for c in self.table.columns
+                if c.name not in columns and c.default is not None and c.default.is_scalar}
+
+
+# in load order
+SOURCES = [
+    Source('genres', Genre.__table__, ['name']),
+    Source('venues', Venue.__table__, ['id', 'name', 'address', 'city', 'state'], genre_link=VENUE_GENRES_TABLE),
+    Source('artists', Artist.__table__, ['id', 'name'], genre_link=ARTIST_GENRES_TABLE),
+    Source('availability', Availability.__table__, ['artist_id', 'from_date']),
+    # booking conflict detection only looks back MAX_SHOW_DURATION for overlapping shows
+    Source('shows', Show.__table__, ['venue_id', 'artist_id', 'start_time', 'duration'],
+           ranges={'duration': (1, MAX_SHOW_DURATION)}),
+]
+
+
+def find_files(paths: list) -> list:
+    """
+    Find the files to load
+    :param paths:  files, or directories containing files
+    :return: list of (source, path) in load order
+    """
+    files = {}
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = [os.path.join(path, f) for f in sorted(os.listdir(path))]
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            name, ext = os.path.splitext(os.path.basename(candidate))
+            source = next((s for s in SOURCES if s.name == name), None)
+            if source is None or ext not in [CSV_EXT, JSONL_EXT]:
+                if candidate == path:
+                    raise BulkLoadError(f'{path}: expected one of '
+                                        f'{", ".join(s.name for s in SOURCES)} with a {CSV_EXT} or {JSONL_EXT} extension')
+                continue
+            if source.name in files:
+                raise BulkLoadError(f'{candidate}: {source.name} already loaded from {files[source.name]}')
+            files[source.name] = candidate
+    return [(s, files[s.name]) for s in SOURCES if s.name in files]
+
+
+def read_rows(path: str) -> Iterator[dict]:
+    """
+    Read the rows of a file
+    :param path: path of CSV or JSONL file
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(JSONL_EXT):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def copy_value(value, is_string: bool) -> str:
+    """
+    Convert a value to PostgreSQL COPY text format
+    :param value:     value to convert
+    :param is_string: value is for a string column; empty strings are null for other columns
+    """
+    if value is None or (value == '' and not is_string):
+        return _COPY_NULL_
+    if isinstance(value, bool):
+        value = 'true' if value else 'false'
+    elif isinstance(value, (date, time)):
+        value = value.isoformat()
+    return str(value).translate(_COPY_ESCAPES_)
+
+
+def in_range(value, low: int, high: int) -> bool:
+    """
+    Check if a value is an integer within a range
+    :param value:   value to check; CSV values are strings
+    :param low:     min valid value
+    :param high:    max valid value
+    """
+    try:
+        return low <= int(value) <= high
+    except (TypeError, ValueError):
+        return False
+
+
+def genre_names(value: Union[str, list, None]) -> list:
+    """
+    Get the genre names from a genres value
+    :param value: list of names, or comma-separated names
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [name.strip() for name in value if name.strip() != '']
+
+
+class BulkLoader:
+    """
+    Class loading files into the database
+    :param connection:  DBAPI connection
+    :param batch_size:  number of rows to load per transaction
+    :param state_file:  path of file recording the number of rows loaded from each file
+    """
+    def __init__(self, connection, batch_size: int, state_file: str):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.state_file = state_file
+        self.state = {}
+        self.genres = None     # genre name: id
+
+        if os.path.exists(state_file):
+            with open(state_file) as f:
+                self.state = json.load(f)
+
+    def _save_state(self):
+        temp_file = f'{self.state_file}.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(temp_file, self.state_file)
+
+    def _execute(self, sql: str, params: list = None) -> int:
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def _copy(self, table: str, columns: list, lines: list):
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN',
+                               io.StringIO(''.join(lines)))
+
+    def genre_ids(self) -> dict:
+        """
+        Get the genre ids by name, which are looked up once, after any genres are loaded
+        """
+        if self.genres is None:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f'SELECT name, id FROM "{Genre.__tablename__}";')
+                self.genres = {name: genre_id for name, genre_id in cursor.fetchall()}
+        return self.genres
+
+    def resume_point(self, path: str) -> int:
+        """
+        Get the number of rows of a file already loaded
+        :param path: path of file
+        """
+        key = os.path.abspath(path)
+        loaded = self.state.get(key)
+        if loaded is None:
+            return 0
+        stat = os.stat(path)
+        if loaded["size"] != stat.st_size or loaded["mtime"] != stat.st_mtime:
+            raise BulkLoadError(f'{path}: file changed since it was partially loaded, rerun with --restart')
+        return loaded["rows"]
+
+    def load(self, source: Source, path: str) -> int:
+        """
+        Load a file
+        :param source:  type of file
+        :param path:    path of file
+        :return: number of rows loaded
+        """
+        skip = self.resume_point(path)
+        rows = read_rows(path)
+        columns = None
+        staging = f'bulk_{source.name}'
+        link_staging = f'bulk_{source.name}_genres'
+        table = f'"{source.table.name}"'
+        stat = os.stat(path)
+
+        count = 0
+        loaded = 0
+        inserted = 0
+        batch = []
+        links = []
+        start = perf_counter()
+        reported = start
+        for count, row in enumerate(rows, start=1):
+            if count <= skip:
+                continue
+            if columns is None:
+                columns = self._columns(source, path, row)
+                # the staging tables only hold the columns being loaded, so omitted columns get their defaults
+                self._execute(f'DROP TABLE IF EXISTS {staging}; '
+                              f'CREATE TEMP TABLE {staging} ON COMMIT DELETE ROWS AS '
+                              f'SELECT {", ".join(columns)} FROM {table} WITH NO DATA;')
+                if source.genre_link is not None:
+                    self._execute(f'DROP TABLE IF EXISTS {link_staging}; '
+                                  f'CREATE TEMP TABLE {link_staging} ON COMMIT DELETE ROWS AS '
+                                  f'SELECT * FROM {source.genre_link.name} WITH NO DATA;')
+                string_columns = [source.table.columns[c].type.python_type is str for c in columns]
+
+            missing = [c for c in source.required if row.get(c) in [None, '']]
+            if len(missing) > 0:
+                raise BulkLoadError(f'{path}: row {count} missing {", ".join(missing)}')
+            for column, (low, high) in source.ranges.items():
+                if not in_range(row.get(column), low, high):
+                    raise BulkLoadError(f'{path}: row {count} invalid {column} "{row.get(column)}", '
+                                        f'must be {low} to {high}')
+            batch.append('\t'.join(copy_value(row.get(c), s) for c, s in zip(columns, string_columns)) + '\n')
+
+            if source.genre_link is not None:
+                genres = self.genre_ids()
+                for name in genre_names(row.get(GENRES_KEY)):
+                    if name not in genres:
+                        raise BulkLoadError(f'{path}: row {count} unknown genre "{name}"')
+                    links.append(f'{row["id"]}\t{genres[name]}\n')
+
+            if len(batch) == self.batch_size:
+                inserted = inserted + self._load_batch(source, path, stat, staging, link_staging, columns, batch,
+                                                       links, count)
+                loaded = loaded + len(batch)
+                batch = []
+                links = []
+                if perf_counter() - reported >= PROGRESS_INTERVAL:
+                    reported = perf_counter()
+                    print(f'  {source.name}: {count} rows, {loaded / (reported - start):.0f} rows/s', flush=True)
+
+        if len(batch) > 0:
+            inserted = inserted + self._load_batch(source, path, stat, staging, link_staging, columns, batch,
+                                                   links, count)
+            loaded = loaded + len(batch)
+
+        if columns is not None and 'id' in columns:
+            # ids were loaded, so move the sequence past them
+            self._execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                          f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false);")
+            self.connection.commit()
+        if source.name == 'genres':
+            # reload after any new genres
+            self.genres = None
+
+        elapsed = perf_counter() - start
+        print(f'{source.name}: loaded {loaded} rows from {path} in {elapsed:.1f}s, '
+              f'{loaded / elapsed if elapsed > 0 else 0:.0f} rows/s; {inserted} inserted, '
+              f'{loaded - inserted} skipped as already present'
+              f'{f", resumed after {skip} rows" if skip > 0 else ""}', flush=True)
+        return inserted
+
+    def _columns(self, source: Source, path: str, row: dict) -> list:
+        """
+        Get the columns to load, from the first row
+        :param source:  type of file
+        :param path:    path of file
+        :param row:     first row
+        """
+        missing = [c for c in source.required if c not in row]
+        if len(missing) > 0:
+            raise BulkLoadError(f'{path}: missing columns {", ".join(missing)}')
+        ignored = [k for k in row.keys() if k not in source.table.columns and k != GENRES_KEY]
+        if len(ignored) > 0:
+            print(f'{path}: ignoring columns {", ".join(ignored)}')
+        return [c.name for c in source.table.columns if c.name in row]
+
+    def _load_batch(self, source: Source, path: str, stat: os.stat_result, staging: str, link_staging: str,
+                    columns: list, batch: list, links: list, count: int):
+        """
+        Load a batch of rows in a transaction, and record the progress
+        :param count:  number of rows of file processed, including the batch
+        :return: number of rows inserted
+        """
+        defaults = source.defaults(columns)
+        insert_list = ", ".join(columns + list(defaults.keys()))
+        select_list = ", ".join(columns + ['%s'] * len(defaults))
+        try:
+            self._copy(staging, columns, batch)
+            inserted = self._execute(f'INSERT INTO "{source.table.name}" ({insert_list}) '
+                                     f'SELECT {select_list} FROM {staging} ON CONFLICT DO NOTHING;',
+                                     list(defaults.values()))
+            if len(links) > 0:
+                link_columns = [source.link_column(), 'genre_id']
+                self._copy(link_staging, link_columns, links)
+                self._execute(f'INSERT INTO {source.genre_link.name} ({", ".join(link_columns)}) '
+                              f'SELECT {", ".join(link_columns)} FROM {link_staging} ON CONFLICT DO NOTHING;')
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            raise BulkLoadError(f'{path}: rows {count - len(batch) + 1}-{count} not loaded: {e}'.strip())
+
+        self.state[os.path.abspath(path)] = {"rows": count, "size": stat.st_size, "mtime": stat.st_mtime}
+        self._save_state()
+        return inserted
+
+
+def bulk_load(paths: list, batch_size: int = BULK_LOAD_BATCH_SIZE, state_file: str = DEFAULT_STATE_FILE,
+              restart: bool = False) -> int:
+    """
+    Load files into the database
+    :param paths:       files, or directories containing files
+    :param batch_size:  number of rows to load per transaction
+    :param state_file:  path of file recording progress
+    :param restart:     ignore any previous progress
+    :return: total number of rows inserted
+    """
+    files = find_files(paths)
+    if len(files) == 0:
+        raise BulkLoadError(f'No files to load in {", ".join(paths)}')
+    if restart and os.path.exists(state_file):
+        os.remove(state_file)
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URI)
+    connection = engine.raw_connection()
+    try:
+        loader = BulkLoader(connection, batch_size, state_file)
+        total = sum(loader.load(source, path) for source, path in files)
+    finally:
+        connection.close()
+        engine.dispose()
+
+    if os.path.exists(state_file):
+        # everything loaded, so nothing to resume
+        os.remove(state_file)
+    return total
+
+
+# ---------------------------------------------------------------------------- #
+# Launch.
+# ---------------------------------------------------------------------------- #
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk load genres, venues, artists, availability and shows.')
+    parser.add_argument('paths', metavar='PATH', nargs='+', help='file, or directory containing files, to load')
+    parser.add_argument('-b', '--batch-size', type=int, default=BULK_LOAD_BATCH_SIZE,
+                        help=f'rows per transaction; default {BULK_LOAD_BATCH_SIZE}')
+    parser.add_argument('-s', '--state', default=DEFAULT_STATE_FILE,
+                        help=f'file recording progress, for resuming; default {DEFAULT_STATE_FILE}')
+    parser.add_argument('--restart', action='store_true', help='ignore any previous progress')
+    args = parser.parse_args()
+
+    try:
+        start = perf_counter()
+        loaded = bulk_load(args.paths, batch_size=args.batch_size, state_file=args.state, restart=args.restart)
+        print(f'Inserted {loaded} rows in {perf_counter() - start:.1f}s')
+    except BulkLoadError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
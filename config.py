@@ -23,8 +23,67 @@ SQLALCHEMY_DATABASE_URI = f'postgresql://{USERNAME}:{PASSWORD}@{SERVER}:{PORT}/{
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False    # disable FSADeprecationWarning
 
+# database connection pool
+DB_POOL_SIZE = 5            # number of connections kept open in the pool
+DB_POOL_MAX_OVERFLOW = 10   # number of connections allowed in excess of pool size
+DB_POOL_TIMEOUT = 30        # seconds to wait for a connection before giving up
+DB_POOL_RECYCLE = 1800      # seconds after which a connection is replaced
+DB_POOL_PRE_PING = True     # test connections for liveness on checkout
+
 # general 
 SHOWS_PER_PAGE = 6
+# shows pagination mode; 'offset' for numbered pages or 'keyset' for cursor based pages which cost the same
+# regardless of depth. Keyset mode is also used for any request with an 'after' cursor query parameter
+OFFSET_PAGINATION = 'offset'
+KEYSET_PAGINATION = 'keyset'
+SHOWS_PAGINATION = OFFSET_PAGINATION
+# count the total number of matching shows in keyset pagination mode
+SHOWS_KEYSET_COUNT = False
+
+# text search backend for name and city searches;
+# 'fulltext' for postgres full text search, matching word prefixes and ranking results by relevance,
+# 'local' for an in-process inverted index, with the same matching and ranking, e.g. if full text search indexes are
+#   not available,
+# 'like' for case-insensitive substring matching
+FULLTEXT_SEARCH = 'fulltext'
+LOCAL_SEARCH = 'local'
+LIKE_SEARCH = 'like'
+SEARCH_BACKEND = FULLTEXT_SEARCH
+# seconds before the in-process search indices are reloaded; 0 to only reload after artists or venues are written
+SEARCH_INDEX_CACHE_TTL = 3600
+
+# max number of cached results per searched entity type; 0 to disable caching search results
+SEARCH_CACHE_SIZE = 256
+# seconds before cached search results are discarded; results are also discarded after writes affecting them
+SEARCH_CACHE_TTL = 60
+
+# number of rows fetched from the database and sent at a time by the export endpoints
+EXPORT_BATCH_SIZE = 1000
+
+# number of rows loaded per transaction by bulk_load.py
+BULK_LOAD_BATCH_SIZE = 10000
+
+# days after which past shows are moved to the shows archive by a background thread; None to never archive shows.
+# archived shows are no longer listed or counted, and are kept when their venue or artist is deleted
+SHOW_ARCHIVE_DAYS = None
+# seconds between runs of the background show archiver
+SHOW_ARCHIVE_INTERVAL = 3600
+# number of shows archived per transaction
+SHOW_ARCHIVE_BATCH_SIZE = 1000
+
+# answer conditional GETs (If-None-Match/If-Modified-Since) of the listing and detail pages, using the writes to the
+# data they display; only writes by this process are tracked
+HTTP_CACHE = True
+# seconds after which page tags change regardless of writes, as pages depend on the current time, e.g. past/upcoming
+# shows; should be less than WTF_CSRF_TIME_LIMIT as pages embed a csrf token. 0 to only change after writes
+HTTP_CACHE_PERIOD = 60
+
+# memory budget in bytes of the in-process cache of rendered show tiles and venue entries; 0 to disable
+FRAGMENT_CACHE_MAX_BYTES = 4 * 1024 * 1024
+# optional shared fragment cache, e.g. 'redis://localhost:6379/0', requires the redis package; None for in-process only
+FRAGMENT_CACHE_REDIS_URL = None
+# seconds before shared fragments expire
+FRAGMENT_CACHE_TTL = 3600
 
 # default region for phone number validation
 DEFAULT_REGION = "US"
@@ -32,8 +91,38 @@ DEFAULT_REGION = "US"
 # default locale
 DEFAULT_LOCALE = 'en_US'
 
+# seconds before the cached genre catalogue is reloaded; 0 to only reload when invalidated
+GENRE_CACHE_TTL = 3600
+# min seconds between reloads of the genre catalogue when looking up unknown genre names
+GENRE_RELOAD_INTERVAL = 10
+
+# max show duration in minutes; bounds how far back booking conflict detection looks for overlapping shows
+MAX_SHOW_DURATION = 24 * 60
+
+# max number of artists whose availability timelines are cached
+AVAILABILITY_CACHE_SIZE = 1024
+# seconds before a cached availability timeline is reloaded; 0 to only reload after the artist is written
+AVAILABILITY_CACHE_TTL = 300
+
+# max number of shows in a bulk show listing request
+BULK_SHOWS_MAX = 1000
+
+# seconds before the cached artist & venue name indices used by the show form are reloaded; 0 to only reload
+# after artists or venues are written
+NAME_INDEX_CACHE_TTL = 3600
+# max number of matches returned by the artist & venue name searches
+NAME_SEARCH_LIMIT = 10
+# max length of name search prefixes whose matches are found when the name indices are loaded; longer prefixes match
+# fewer names, so are searched on each request
+NAME_INDEX_PREFIX_LENGTH = 3
+
+# max number of most recent past shows listed on artist and venue pages; None for all
+MAX_PAST_SHOWS = 50
+
 # max number of latest listings on home page
 NUM_LATEST_ON_HOME = 10
+# seconds before the cached latest listings are reloaded; 0 to only reload after artists or venues are written
+LATEST_CACHE_TTL = 300
 
 # app mode
 ORM_CONNECTION = 'orm'
@@ -44,6 +133,20 @@ CONNECTION_MODE = ORM_CONNECTION
 USE_ORM = CONNECTION_MODE == ORM_CONNECTION
 USE_ENGINE = CONNECTION_MODE == ENGINE_CONNECTION
 
+# max number of parsed SQL statements to cache (only valid in engine mode)
+STATEMENT_CACHE_SIZE = 256
+
 # print sql statements (only valid in engine mode)
 PRINT_SQL = True
 
+# enable debug endpoints, e.g. connection pool statistics
+DEBUG_ENDPOINTS = DEBUG
+
+# database statement profiling (valid in both modes)
+PROFILE_QUERIES = DEBUG         # record the statements executed by each request
+PROFILE_HEADERS = True          # add X-DB-Queries, X-DB-Time-ms & X-DB-Repeated headers to responses
+PROFILE_SLOWEST = 5             # number of slowest statements to report per request
+PROFILE_REPEAT_THRESHOLD = 3    # executions of the same statement shape in a request reported as a possible N+1
+PROFILE_HISTORY = 50            # number of recent request profiles kept for the debug endpoint
+SLOW_QUERY_MS = 100             # log statements taking longer than this; None to disable
+
@@ -1,15 +1,19 @@
-from .show_controller import shows, create_show, search_shows, search_shows_advanced
+from .show_controller import shows, create_show, search_shows, search_shows_advanced, bulk_shows, export_shows
 from .artist_controller import (artists, search_artists, search_artists_advanced, display_artist,
-                                edit_artist, delete_artist, artist_availability, create_artist)
+                                edit_artist, delete_artist, artist_availability, create_artist,
+                                search_artist_names, export_artists)
 from .venue_controller import (venues, search_venues, search_venues_advanced, display_venue,
                                create_venue, delete_venue, edit_venue, venue_bookings,
-                               venue_search_performer)
+                               venue_search_performer, search_venue_names, export_venues)
+from .debug_controller import pool_status, profile_status, cache_status
 
 __all__ = [
     'shows',
     'create_show',
     'search_shows',
     'search_shows_advanced',
+    'bulk_shows',
+    'export_shows',
 
     'artists',
     'search_artists',
@@ -19,6 +23,8 @@ __all__ = [
     'delete_artist',
     'artist_availability',
     'create_artist',
+    'search_artist_names',
+    'export_artists',
 
     'venues',
     'search_venues',
@@ -29,4 +35,10 @@ __all__ = [
     'edit_venue',
     'venue_bookings',
     'venue_search_performer',
+    'search_venue_names',
+    'export_venues',
+
+    'pool_status',
+    'profile_status',
+    'cache_status',
 ]
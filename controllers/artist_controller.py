@@ -2,22 +2,29 @@
 # Imports
 # ---------------------------------------------------------------------------- #
 from datetime import datetime
+from http import HTTPStatus
 from typing import Union
 
-from flask import render_template, request, flash, url_for, jsonify, Markup
+from flask import render_template, request, flash, url_for, jsonify, Markup, abort
 from flask_sqlalchemy.model import Model
 from werkzeug.datastructures import MultiDict
 
 from config import USE_ORM
 from forms import (ArtistForm, NCSSearchForm)
-from misc import EntityResult
-from misc.queries import artists_search, SEARCH_ALL, SEARCH_BASIC, SEARCH_ADVANCED
-from models import is_available_time_key, model_items
+from misc import EntityResult, print_exc_info
+from misc.availability import availability_timeline
+from misc.conditional import conditional_get
+from misc.invalidation import notify_write
+from misc.export import export_format, export_response
+from misc.queries import artists_search, artists_export, SEARCH_ALL, SEARCH_BASIC, SEARCH_ADVANCED
+from models import is_available_time_key, model_items, ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE
 from util import current_datetime
 from .artist_engine import datetime_to_str, time_to_str
 from .artist_orm import IGNORE_AVAILABILITY
+from .show_orm import AvailabilitySlot
 from .controllers_misc import (set_genre_field_options, update_result,
-                               delete_result, create_result, exists_or_404, get_availability_date, FactoryObj)
+                               delete_result, create_result, exists_or_404, get_availability_date, FactoryObj,
+                               names_search)
 
 ORM = USE_ORM
 ENGINE = not ORM
@@ -54,6 +61,7 @@ else:
     )
 
 
+@conditional_get([ARTIST_TABLE, SHOWS_TABLE])
 def artists():
     """
     List all artists
@@ -122,6 +130,20 @@ def search_artists_advanced():
     return render_artists('Fyyur | Artists Search', form, results)
 
 
+def export_artists():
+    """
+    Export the artists matching an advanced search
+
+    Request query parameters:
+    format:   export format; one of 'csv' or 'json'
+    name, city, state, genres: advanced search criteria, as for advanced search
+    """
+    fmt = export_format()
+    form = NCSSearchForm(formdata=request.args)
+    keys, rows = artists_export(form)
+    return export_response(keys, rows, fmt, 'artists')
+
+
 def availability_by_artist(artist_id: int, from_date=None, as_type=EntityResult.DICT) -> Union[dict, Model, None]:
     """
     Search for an artist's latest availability
@@ -132,9 +154,35 @@ def availability_by_artist(artist_id: int, from_date=None, as_type=EntityResult.
     if from_date is None:
         from_date = datetime.today()
 
-    return availability_by_artist_impl(artist_id, from_date, as_type=as_type)
+    if as_type == EntityResult.DICT:
+        availability = None
+        try:
+            availability = availability_timeline(artist_id).at(from_date)
+        except:
+            print_exc_info()
+            abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+    else:
+        # models are required for editing
+        availability = availability_by_artist_impl(artist_id, from_date, as_type=as_type)
+    return availability
 
 
+def availability_slot(artist_id: int, when: datetime) -> AvailabilitySlot:
+    """
+    Get an artist's availability slot on the day of a time
+    :param artist_id:  id of artist
+    :param when:       time to get slot for
+    """
+    slot = (None, None)
+    try:
+        slot = availability_timeline(artist_id).slot(when)
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+    return AvailabilitySlot(pair=slot)
+
+
+@conditional_get([SHOWS_TABLE, VENUE_TABLE], entity=(ARTIST_TABLE, 'artist_id'))
 def display_artist(artist_id: int):
     """
     Show the artist page with the given artist_id
@@ -191,6 +239,8 @@ def edit_artist(artist_id: int):
 
     if request.method == 'POST' and form.validate_on_submit():
         success, artist_name = update_artist(artist["id"], form, availability)
+        if success:
+            notify_write(ARTIST_TABLE, artist["id"])
 
         return update_result(success, artist_name, 'Artist', url_for('display_artist', artist_id=artist_id))
 
@@ -211,6 +261,10 @@ def delete_artist(artist_id: int):
     :param artist_id: id of the artist to delete
     """
     success, artist_name = delete_artist_impl(artist_id)
+    if success:
+        notify_write(ARTIST_TABLE, artist_id)
+        # the artist's shows are deleted as well
+        notify_write(SHOWS_TABLE)
 
     return delete_result(success, artist_name, 'Artist')
 
@@ -248,6 +302,8 @@ def create_artist():
         else:
             # add artist
             success, artist_name = create_artist_impl(artist, availability)
+            if success:
+                notify_write(ARTIST_TABLE)
 
             return create_result(success, artist_name, 'Artist')
 
@@ -295,3 +351,13 @@ def artist_availability(artist_id: int):
     return jsonify({
         'availability': available_times
     })
+
+
+def search_artist_names():
+    """
+    Search for artist names matching a prefix
+
+    Request query parameters:
+    q:  prefix to match
+    """
+    return names_search(ARTIST_TABLE)
@@ -14,10 +14,10 @@ from models import (ARTIST_TABLE, AVAILABILITY_TABLE, ARTIST_GENRES_TABLE,
                     equal_dict, dict_disjoint, get_entity)
 from models import is_available, get_model_property_list, SHOWS_TABLE, fq_column
 from .artist_orm import IGNORE_AVAILABILITY, IGNORE_ID_DATE
-from .controllers_misc import add_show_summary, model_property_list, IGNORE_ID_GENRES, IGNORE_ID, FactoryObj, \
+from .controllers_misc import model_property_list, IGNORE_ID_GENRES, IGNORE_ID, FactoryObj, \
     populate_genred_model
-from misc import (get_music_entity_engine, genre_changes_engine, exec_transaction_engine, print_exc_info, EntityResult,
-                  shows_by_artist)
+from misc import get_music_entity_engine, genre_changes_engine, exec_transaction_engine, print_exc_info, EntityResult
+from misc.queries import artist_with_shows
 
 
 _ARTIST_ = get_entity(ARTIST_TABLE)
@@ -67,10 +67,11 @@ def availability_by_artist_engine(artist_id: int,
         result = execute(f'SELECT {properties} FROM "{AVAILABILITY_TABLE}" '
                          f'INNER JOIN "{ARTIST_TABLE}" '
                          f'ON {_AVAILABILITY_.fq_column("artist_id")} = {_ARTIST_.fq_column("id")} '
-                         f'WHERE {_AVAILABILITY_.fq_column("artist_id")} = {artist_id} '
-                         f'AND {_AVAILABILITY_.fq_column("from_date")} < TIMESTAMP \'{from_date}\' '
+                         f'WHERE {_AVAILABILITY_.fq_column("artist_id")} = :artist_id '
+                         f'AND {_AVAILABILITY_.fq_column("from_date")} < :from_date '
                          f'ORDER BY {_AVAILABILITY_.fq_column("from_date")} DESC, '
-                         f'{_AVAILABILITY_.fq_column("id")} DESC;')
+                         f'{_AVAILABILITY_.fq_column("id")} DESC;',
+                         {"artist_id": artist_id, "from_date": from_date})
         if result.rowcount == 0:
             availability = None
         else:
@@ -88,8 +89,7 @@ def get_artist_engine(artist_id: int) -> dict:
     Show the artist page with the given artist_id
     :param artist_id:   id of artist
     """
-    artist = get_music_entity_engine(artist_id, _ARTIST_)
-    return add_show_summary(artist_id, artist, shows_by_artist)
+    return artist_with_shows(artist_id)
 
 
 def populate_artist_engine(artist: dict, form: FlaskForm):
@@ -118,34 +118,30 @@ def time_to_str(t_time: Union[datetime, time]) -> str:
     return t_time.strftime(AVAILABILITY_TIME_FMT)
 
 
-def availability_time_to_str(available_time):
-    return None if available_time is None else f"'{time_to_str(available_time)}'"
-
-
 def availability_insert_sql(artist_id: int, availability: dict):
     """
     Generate availability insert SQL
     :param artist_id:       id of the artist to update
     :param availability:    artist availability
+    :return: tuple of SQL and bound parameters
     """
     properties = model_property_list(availability, IGNORE_ID)
     value_dict = {
-        'artist_id': str(artist_id),
-        'from_date': "'" + datetime_to_str(availability["from_date"]) + "'"
+        'artist_id': artist_id,
+        'from_date': availability["from_date"]
     }
     # get non empty times
     times_to_add = [p for p in properties if p != 'artist_id' and p != 'from_date' and availability[p] is not None]
     properties_list = [p for p in value_dict.keys()] + times_to_add
 
     value_dict = {**value_dict, **{
-        p: availability_time_to_str(availability[p]) for p in times_to_add
+        p: availability[p] for p in times_to_add
     }}
-    values = [value_dict[p] for p in properties_list]
 
-    values_list = ', '.join(values)
+    values_list = ', '.join([f':{p}' for p in properties_list])
     properties_list = ', '.join(properties_list)
 
-    return f'INSERT INTO "{AVAILABILITY_TABLE}"({properties_list}) VALUES ({values_list});'
+    return f'INSERT INTO "{AVAILABILITY_TABLE}"({properties_list}) VALUES ({values_list});', value_dict
 
 
 def update_artist_engine(artist_id: int, form: FlaskForm, availability: dict) -> (Union[bool, None], str):
@@ -161,11 +157,12 @@ def update_artist_engine(artist_id: int, form: FlaskForm, availability: dict) ->
     updated_artist = populate_artist_engine(_ARTIST_.model_dict(), form)
     if not equal_dict(artist, updated_artist, IGNORE_ID):
         # change has occurred update artist
-        to_set = [f'{k}=\'{v}\'' for k, v in updated_artist.items()
-                  if k in dict_disjoint(artist, updated_artist, IGNORE_ID_GENRES)]
+        to_set = {k: v for k, v in updated_artist.items()
+                  if k in dict_disjoint(artist, updated_artist, IGNORE_ID_GENRES)}
         if len(to_set) > 0:
-            to_set = ", ".join(to_set)
-            stmts.append(f'UPDATE "{ARTIST_TABLE}" SET {to_set} WHERE id={artist_id};')
+            set_list = ", ".join([f'{k} = :{k}' for k in to_set.keys()])
+            stmts.append((f'UPDATE "{ARTIST_TABLE}" SET {set_list} WHERE id = :artist_id;',
+                          {**to_set, "artist_id": artist_id}))
 
         # update genre link table
         if updated_artist["genres"] != artist["genres"]:
@@ -203,17 +200,18 @@ def delete_artist_engine(artist_id: int) -> (bool, str):
     artist_name = None
     exists = False
     try:
-        artist = execute(f'SELECT name from "{ARTIST_TABLE}" WHERE id = {artist_id};')
+        artist = execute(f'SELECT name from "{ARTIST_TABLE}" WHERE id = :artist_id;', {"artist_id": artist_id})
         if artist.rowcount != 0:
             exists = True
             artist_name = artist.mappings().first().get('name')
 
             # when an artist is deleted, need to delete availability, genres & shows as well to keep the db consistent
+            params = {"artist_id": artist_id}
             execute_transaction([
-                f'DELETE FROM "{AVAILABILITY_TABLE}" WHERE artist_id = {artist_id};',
-                f'DELETE FROM "{SHOWS_TABLE}" WHERE artist_id = {artist_id};',
-                f'DELETE FROM "{ARTIST_GENRES_TABLE}" WHERE artist_id = {artist_id};',
-                f'DELETE FROM "{ARTIST_TABLE}" WHERE id = {artist_id};'
+                (f'DELETE FROM "{AVAILABILITY_TABLE}" WHERE artist_id = :artist_id;', params),
+                (f'DELETE FROM "{SHOWS_TABLE}" WHERE artist_id = :artist_id;', params),
+                (f'DELETE FROM "{ARTIST_GENRES_TABLE}" WHERE artist_id = :artist_id;', params),
+                (f'DELETE FROM "{ARTIST_TABLE}" WHERE id = :artist_id;', params)
             ])
             success = True
     except:
@@ -241,9 +239,11 @@ def id_name_by_unique_properties_sql(name: str, city: str, state: str):
     :param name:    artist name
     :param city:    artist city
     :param state:   artist state
+    :return: tuple of SQL and bound parameters
     """
-    return f'SELECT id, name from "{ARTIST_TABLE}" WHERE LOWER(name) = LOWER(\'{name}\') ' \
-           f'AND LOWER(city) = LOWER(\'{city}\') AND state = \'{state}\';'
+    return f'SELECT id, name from "{ARTIST_TABLE}" WHERE LOWER(name) = LOWER(:name) ' \
+           f'AND LOWER(city) = LOWER(:city) AND state = :state;', \
+           {"name": name, "city": city, "state": state}
 
 
 def existing_artist_engine(name: str, city: str, state: str):
@@ -258,7 +258,7 @@ def existing_artist_engine(name: str, city: str, state: str):
     artist_name = None
     try:
         existing = execute(
-            id_name_by_unique_properties_sql(name, city, state)
+            *id_name_by_unique_properties_sql(name, city, state)
         )
         if existing.rowcount > 0:
             hit = existing.mappings().first()
@@ -275,15 +275,15 @@ def artist_insert_sql(artist: dict):
     """
     Generate artist insert SQL
     :param artist:          artist to create
+    :return: tuple of SQL and bound parameters
     """
     properties = model_property_list(artist, IGNORE_ID_GENRES)
     properties_list = ', '.join(properties)
-    value_dict = {p: "'" + artist[p] + "'" for p in properties if p != 'seeking_venue'}
-    value_dict['seeking_venue'] = 'TRUE' if artist['seeking_venue'] else 'FALSE'
-    values = [value_dict[p] for p in properties]
-    values_list = ', '.join(values)
+    values_list = ', '.join([f':{p}' for p in properties])
+    value_dict = {p: artist[p] for p in properties}
+    value_dict['seeking_venue'] = bool(artist['seeking_venue'])
 
-    return f'INSERT INTO "{ARTIST_TABLE}"({properties_list}) VALUES ({values_list});'
+    return f'INSERT INTO "{ARTIST_TABLE}"({properties_list}) VALUES ({values_list});', value_dict
 
 
 def create_artist_engine(artist: dict, availability: dict):
@@ -295,11 +295,11 @@ def create_artist_engine(artist: dict, availability: dict):
     success = False
     artist_name = artist["name"]
     try:
-        new_artist = execute(artist_insert_sql(artist))
+        new_artist = execute(*artist_insert_sql(artist))
         if new_artist.rowcount > 0:
             # using raw sql so need to query to get new id
             new_artist = execute(
-                id_name_by_unique_properties_sql(*extract_unique_properties_engine(artist))
+                *id_name_by_unique_properties_sql(*extract_unique_properties_engine(artist))
             )
             if new_artist.rowcount > 0:
                 new_artist = new_artist.fetchone()
@@ -8,12 +8,13 @@ from typing import Union
 from flask import abort
 from flask_wtf import FlaskForm
 from sqlalchemy import and_, func
+from sqlalchemy.orm import selectinload
 
 from forms import (populate_model)
 from models import SQLAlchemyDB as db, Artist, Show, Availability, get_entity, ARTIST_TABLE, AVAILABILITY_TABLE
 from models import is_available
-from misc.queries import shows_by_artist
-from .controllers_misc import (add_show_summary, model_property_list, IGNORE_ID_GENRES,
+from misc.queries import artist_with_shows
+from .controllers_misc import (model_property_list, IGNORE_ID_GENRES,
                                IGNORE_ID, FactoryObj, populate_genred_model)
 from misc import print_exc_info, EntityResult, get_music_entity_orm
 
@@ -54,8 +55,7 @@ def get_artist_orm(artist_id: int) -> Artist:
     Get an artist
     :param artist_id:   id of artist
     """
-    artist = get_music_entity_orm(artist_id, _ARTIST_)
-    return add_show_summary(artist_id, artist, shows_by_artist)
+    return artist_with_shows(artist_id)
 
 
 def populate_artist_orm(artist: Artist, form: FlaskForm):
@@ -91,7 +91,8 @@ def update_artist_orm(artist_id: int, form: FlaskForm, availability: Availabilit
     """
     commit_change = False
 
-    artist = Artist.query.filter(Artist.id == artist_id).first_or_404()
+    # genres are compared and updated
+    artist = Artist.query.options(selectinload(Artist.genres)).filter(Artist.id == artist_id).first_or_404()
     artist_name = artist.name
 
     updated_artist = populate_artist_orm(Artist(), form)
@@ -142,18 +143,15 @@ def delete_artist_orm(artist_id: int) -> (bool, str):
     Delete an artist in ORM mode
     :param artist_id: id of the artist to delete
     """
-    artist = Artist.query.filter(Artist.id == artist_id).first_or_404()
-    artist_name = artist.name
+    artist_name = Artist.query.with_entities(Artist.name).filter(Artist.id == artist_id).first_or_404().name
     try:
-        # when an artist is deleted, need to delete availability & shows as well to keep the db consistent
-        availability = Availability.query.filter(Availability.artist_id == artist_id).all()
-        shows = Show.query.filter(Show.artist_id == artist_id).all()
-
-        for available in availability:
-            db.session.delete(available)
-        for show in shows:
-            db.session.delete(show)
-        db.session.delete(artist)
+        # when an artist is deleted, need to delete availability, genres & shows as well to keep the db consistent;
+        # set-based deletes, so the rows are not loaded
+        genre_link = _ARTIST_.orm_genre_link_column
+        Availability.query.filter(Availability.artist_id == artist_id).delete(synchronize_session=False)
+        Show.query.filter(Show.artist_id == artist_id).delete(synchronize_session=False)
+        db.session.execute(genre_link.table.delete().where(genre_link == artist_id))
+        Artist.query.filter(Artist.id == artist_id).delete(synchronize_session=False)
         db.session.commit()
         success = True
     except:
@@ -2,9 +2,9 @@ import re
 from datetime import datetime
 from enum import Enum
 from http import HTTPStatus
-from typing import Callable, Union, Any, List, AnyStr
+from typing import Union, AnyStr
 
-from flask import abort, redirect, flash, url_for
+from flask import abort, redirect, flash, url_for, request, jsonify
 from flask_sqlalchemy import Model
 from flask_wtf import FlaskForm
 from wtforms import SelectMultipleField
@@ -13,6 +13,8 @@ from forms import AVAILABILITY_FROM_DATE_FMT, set_multiselect_field_options, pop
 from misc import print_exc_info, get_genre_list
 from models import model_property_list as models_model_property_list
 from misc.queries import get_genres_options
+from misc.names import search_names
+from util import get_config
 from config import USE_ORM
 
 ORM = USE_ORM
@@ -20,13 +22,11 @@ ENGINE = not ORM
 
 if ORM:
     from misc.misc_orm import (
-        get_show_summary_orm as get_show_summary,
         exists_orm as exists_impl,
     )
 
 else:
     from misc.misc_engine import (
-        get_show_summary_engine as get_show_summary,
         exists_engine as exists_impl,
     )
 
@@ -74,23 +74,6 @@ def get_availability_date(query_date):
     return query_date
 
 
-def add_show_summary(entity_id: int, entity: dict,
-                     shows_by: Callable[[int, Any], List]):
-    """
-    Add show summary to entity
-    :param entity_id:        id of entity
-    :param entity:           entity to add to
-    :param shows_by:         function taking of type 'shows_by(entity_id, criterion) -> list'
-    """
-    past_shows, upcoming_shows = get_show_summary(entity_id, shows_by)
-    entity["past_shows"] = past_shows
-    entity["upcoming_shows"] = upcoming_shows
-    entity["past_shows_count"] = len(past_shows)
-    entity["upcoming_shows_count"] = len(upcoming_shows)
-
-    return entity
-
-
 def __flash_result(success, name, entity_type, action):
     """
     Flash result
@@ -178,3 +161,23 @@ def populate_genred_model(model: Union[Model, dict], form: FlaskForm, properties
     genres = get_genre_list(form["genres"].data)
     populate_model_property(model, "genres", genres)
     return model
+
+
+def names_search(table: str):
+    """
+    Search for artist or venue names matching a prefix, e.g. for type-ahead selection
+
+    Request query parameters:
+    q:  prefix to match
+    :param table:   name of entity table
+    """
+    results = []
+    try:
+        results = search_names(table, request.args.get('q', ''), get_config("NAME_SEARCH_LIMIT"))
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+    return jsonify({
+        'names': [{'id': entity_id, 'name': name} for entity_id, name in results]
+    })
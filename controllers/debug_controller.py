@@ -0,0 +1,41 @@
+# ---------------------------------------------------------------------------- #
+# Imports
+# ---------------------------------------------------------------------------- #
+from flask import jsonify
+
+from misc.availability import availability_cache_stats
+from misc.conditional import write_versions_stats
+from misc.fragments import fragment_cache_stats
+from misc.pool import pool_stats
+from misc.profiler import profile_history
+from misc.search_cache import search_cache_stats
+
+
+def pool_status():
+    """
+    Get the database connection pool statistics
+    """
+    return jsonify({
+        'pools': pool_stats()
+    })
+
+
+def profile_status():
+    """
+    Get the database statement profiles of recent requests
+    """
+    return jsonify({
+        'requests': profile_history()
+    })
+
+
+def cache_status():
+    """
+    Get the in-process cache statistics
+    """
+    return jsonify({
+        'search': search_cache_stats(),
+        'availability': availability_cache_stats(),
+        'write_versions': write_versions_stats(),
+        'fragments': fragment_cache_stats(),
+    })
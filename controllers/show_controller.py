@@ -1,11 +1,15 @@
 # ---------------------------------------------------------------------------- #
 # Imports
 # ---------------------------------------------------------------------------- #
+import csv
+import io
+from bisect import bisect_left
+from collections import defaultdict
 from datetime import time, timedelta, datetime
 from http import HTTPStatus
 from typing import Union
 
-from flask import render_template, flash, redirect, url_for, request, abort
+from flask import render_template, flash, redirect, url_for, request, abort, jsonify
 from flask.helpers import make_response
 from flask_sqlalchemy import Model
 from flask_wtf import FlaskForm
@@ -14,13 +18,21 @@ from forms import (populate_model, populate_model_property, set_singleselect_fie
                    AVAILABILITY_TIME_FMT, MIDNIGHT)
 from forms.forms import OTHER_DURATION, NCSSearchForm
 from misc import label_from_valuelabel_list, SEARCH_BASIC, SEARCH_ALL, SEARCH_ADVANCED
-from util import current_datetime
-from .artist_controller import availability_by_artist
+from misc.intervals import IntervalIndex
+from misc.export import export_format, export_response
+from misc.conditional import conditional_get
+from misc.invalidation import notify_write
+from misc.pagination import decode_cursor
+from misc.queries import search_cache_key
+from misc.search_cache import cached_search
+from util import current_datetime, get_config
+from .artist_controller import availability_slot
 from .controllers_misc import (model_property_list, IGNORE_ID_GENRES, FactoryObj, FILTER_ALL, FILTER_PREVIOUS,
                                FILTER_UPCOMING, set_genre_field_options
                                )
-from .venue_controller import bookings_by_venue
-from config import USE_ORM
+from config import USE_ORM, KEYSET_PAGINATION
+from models import SHOWS_TABLE, ARTIST_TABLE, VENUE_TABLE, get_entity
+from .show_orm import AvailabilitySlot, SHOWS_EXPORT_KEYS
 from .venue_engine import str_to_datetime
 
 ORM = USE_ORM
@@ -34,7 +46,12 @@ if ORM:
         extract_unique_properties_orm as extract_unique_properties,
         dow_availability_orm as dow_availability,
         create_show_orm as create_show_impl,
-        artists_and_venues_orm as artists_and_venues,
+        booking_conflicts_orm as booking_conflicts,
+        bookings_in_period_orm as bookings_in_period,
+        availabilities_by_artists_orm as availabilities_by_artists,
+        entity_names_orm as entity_names,
+        create_shows_orm as create_shows_impl,
+        export_shows_orm as export_shows_impl,
     )
 else:
     from .show_engine import (
@@ -43,7 +60,12 @@ else:
         extract_unique_properties_engine as extract_unique_properties,
         dow_availability_engine as dow_availability,
         create_show_engine as create_show_impl,
-        artists_and_venues_engine as artists_and_venues,
+        booking_conflicts_engine as booking_conflicts,
+        bookings_in_period_engine as bookings_in_period,
+        availabilities_by_artists_engine as availabilities_by_artists,
+        entity_names_engine as entity_names,
+        create_shows_engine as create_shows_impl,
+        export_shows_engine as export_shows_impl,
     )
 
 
@@ -54,6 +76,23 @@ def get_request_page() -> int:
     return page
 
 
+def get_request_keyset() -> dict:
+    """
+    Get the keyset pagination arguments for a request
+    :return: dict of 'keyset' and 'after' arguments for the shows implementation
+    """
+    after = request.args.get('after')
+    if after is not None:
+        try:
+            after = decode_cursor(after)
+        except ValueError:
+            abort(HTTPStatus.BAD_REQUEST.value)
+    return {
+        "keyset": after is not None or get_config("SHOWS_PAGINATION") == KEYSET_PAGINATION,
+        "after": after
+    }
+
+
 def get_request_filterby() -> str:
     filterby = request.args.get('filterby', FILTER_ALL)
     if filterby not in [FILTER_ALL, FILTER_PREVIOUS, FILTER_UPCOMING]:
@@ -61,21 +100,41 @@ def get_request_filterby() -> str:
     return filterby
 
 
+def shows_search(page: int, filterby: str, mode: str, form: FlaskForm, search_term: Union[str, None],
+                 keyset: bool = False, after: tuple = None) -> dict:
+    """
+    List shows, or get the cached results
+    :param page:         requested page of search results
+    :param filterby:     results filter; one of 'all', 'previous' or 'upcoming'
+    :param mode:         one of 'basic', 'advanced' or 'all'
+    :param form:         form data for advanced search
+    :param search_term:  search_term for basic search
+    :param keyset:       use keyset pagination; page is ignored
+    :param after:        keyset pagination cursor; (start_time, id) of the last show on the previous page
+    """
+    key = search_cache_key(mode, form, search_term, filterby, page, keyset, after)
+    return cached_search(SHOWS_TABLE, key,
+                         lambda: shows_impl(page, filterby, mode, form, search_term, keyset=keyset, after=after))
+
+
+@conditional_get([SHOWS_TABLE, ARTIST_TABLE, VENUE_TABLE])
 def shows():
     """
     List all shows
 
     Request query parameters:
     page:     requested page of search results
+    after:    keyset pagination cursor, results start after the show it identifies
     filterby: results filter; one of 'all', 'previous' or 'upcoming'
     """
     page = get_request_page()
+    keyset = get_request_keyset()
     filterby = get_request_filterby()
 
     form = NCSSearchForm()
     mode = SEARCH_ALL
 
-    results = shows_impl(page, filterby, mode, form, None)
+    results = shows_search(page, filterby, mode, form, None, **keyset)
     results["pagination_url"] = 'shows'
 
     return render_shows("Fyyur | Shows", form, results)
@@ -103,13 +162,16 @@ def search_shows():
 
     Request query parameters:
     mode:   search query mode; one of 'basic', 'advanced' or 'all'
+    page:   requested page of search results
+    after:  keyset pagination cursor, results start after the show it identifies
     """
     mode = request.args.get('mode', default=SEARCH_BASIC)
     page = get_request_page()
+    keyset = get_request_keyset()
 
     form = NCSSearchForm()
 
-    results = shows_impl(page, FILTER_ALL, mode, form, request.form.get('search_term', ''))
+    results = shows_search(page, FILTER_ALL, mode, form, request.form.get('search_term', ''), **keyset)
     results["pagination_url"] = 'search_shows'
 
     return render_shows('Fyyur | Shows Search', form, results)
@@ -121,6 +183,7 @@ def search_shows_advanced():
     """
     is_post = (request.method == 'POST')
     page = get_request_page()
+    keyset = get_request_keyset()
 
     form = NCSSearchForm()
 
@@ -130,11 +193,13 @@ def search_shows_advanced():
     set_genre_field_options(form.genres, genres, required=False)
 
     if is_post:
-        results = shows_impl(page, FILTER_ALL, SEARCH_ADVANCED, form, request.form.get('search_term', ''))
+        results = shows_search(page, FILTER_ALL, SEARCH_ADVANCED, form, request.form.get('search_term', ''),
+                               **keyset)
     else:
         pagination = request.args.get('pagination', 'n')
         if pagination == 'y':
-            results = shows_impl(page, FILTER_ALL, SEARCH_ADVANCED, form, request.form.get('search_term', ''))
+            results = shows_search(page, FILTER_ALL, SEARCH_ADVANCED, form, request.form.get('search_term', ''),
+                                   **keyset)
         else:
             results = {
                 "count": 0,
@@ -148,6 +213,21 @@ def search_shows_advanced():
     return render_shows('Fyyur | Shows Search', form, results)
 
 
+def export_shows():
+    """
+    Export the shows matching an advanced search
+
+    Request query parameters:
+    format:   export format; one of 'csv' or 'json'
+    filterby: results filter; one of 'all', 'previous' or 'upcoming'
+    name, city, state, genres: advanced search criteria, as for advanced search
+    """
+    fmt = export_format()
+    filterby = get_request_filterby()
+    form = NCSSearchForm(formdata=request.args)
+    return export_response(SHOWS_EXPORT_KEYS, export_shows_impl(filterby, form), fmt, 'shows')
+
+
 def populate_show(show: Union[Model, dict], form: FlaskForm):
     """
     Populate a show from a form
@@ -180,26 +260,33 @@ def verify_show(show: Union[Model, dict]):
     """
     artist_id, venue_id, start_date, start_time, end_time, as_type = extract_unique_properties(show)
 
-    booking_conflict = None
-    bookings = bookings_by_venue(venue_id, start_date)
-    if bookings is not None:
-        bookings_list = [Booking(b["name"], b["start_time"], b["duration"]) for b in bookings]
-        for booking in bookings_list:
-            if booking.start_time <= start_time < booking.end_time:
-                booking_conflict = booking
-            elif booking.start_time < end_time <= booking.end_time:
-                booking_conflict = booking
+    # shows at the venue or by the artist elsewhere which overlap the new show
+    booking_conflict = None     # venue booked
+    artist_booking = None       # artist booked at another venue
+    for conflict in booking_conflicts(artist_id, venue_id, start_time, end_time):
+        if conflict["venue_id"] == venue_id:
+            if booking_conflict is None:
+                booking_conflict = Booking(conflict["artist_name"], conflict["start_time"], conflict["duration"])
+        elif artist_booking is None:
+            artist_booking = Booking(conflict["venue_name"], conflict["start_time"], conflict["duration"])
+
+    slot = availability_slot(artist_id, start_time)
+    artist_conflict, availability = availability_conflict(slot, start_time, end_time)
 
-            if booking_conflict is not None:
-                break
+    return verification_result(booking_conflict, artist_booking, artist_conflict, availability)
 
-    availability = availability_by_artist(artist_id, start_time, as_type=as_type)
-    dow = start_time.weekday()
-    slot = dow_availability(availability, dow)
 
+def availability_conflict(slot: AvailabilitySlot, start_time: datetime, end_time: datetime) -> tuple:
+    """
+    Check a show against an artist's availability
+    :param slot:         artist's availability slot on the day of the show
+    :param start_time:   start of show
+    :param end_time:     end of show
+    :return: tuple of availability slot the show is outside of or None, and artist is available on the day flag
+    """
     artist_conflict = None  # availability & show mismatch
-    availability = slot.duration is not None  # no availability
-    if availability:
+    available = slot.duration is not None  # no availability
+    if available:
         start = datetime.combine(start_time.date(), slot.start_time)
         if slot.end_time == MIDNIGHT:
             end = datetime.combine((start_time + timedelta(days=1)).date(), time(hour=0, minute=0))
@@ -210,14 +297,52 @@ def verify_show(show: Union[Model, dict]):
         if end_time > end:
             artist_conflict = slot
 
+    return artist_conflict, available
+
+
+def verification_result(booking_conflict: Union[Booking, None], artist_booking: Union[Booking, None],
+                        artist_conflict: Union[AvailabilitySlot, None], availability: bool) -> dict:
+    """
+    Generate a show verification result
+    :param booking_conflict: venue booking the show conflicts with
+    :param artist_booking:   artist booking at another venue the show conflicts with
+    :param artist_conflict:  availability slot the show is outside of
+    :param availability:     artist is available on the day flag
+    """
     return {
-        'ok': booking_conflict is None and artist_conflict is None and availability,
+        'ok': booking_conflict is None and artist_booking is None and artist_conflict is None and availability,
         'show': booking_conflict,
+        'booking': artist_booking,
         'artist': artist_conflict,
         'availability': availability
     }
 
 
+def verification_messages(verification: dict) -> list:
+    """
+    Generate the messages describing the conflicts in a show verification result
+    :param verification: show verification result
+    """
+    def time_disp(dt): return dt.strftime(AVAILABILITY_TIME_FMT)
+
+    messages = []
+    if verification["show"] is not None:
+        err = verification["show"]
+        messages.append(f'Booking conflict. A show by {err.name} is booked from '
+                        f'{time_disp(err.start_time)} to {time_disp(err.end_time)}.')
+    if verification["booking"] is not None:
+        err = verification["booking"]
+        messages.append(f'Artist booking conflict. Artist is booked at {err.name} from '
+                        f'{time_disp(err.start_time)} to {time_disp(err.end_time)}.')
+    if verification["artist"] is not None:
+        err = verification["artist"]
+        messages.append(f'Artist availability conflict. Artist is only available from '
+                        f'{time_disp(err.start_time)} to {time_disp(err.end_time)}.')
+    if not verification["availability"]:
+        messages.append(f'Artist availability conflict. Artist is not available.')
+    return messages
+
+
 NO_SELECTION = -1
 
 
@@ -232,36 +357,34 @@ def create_show():
     A POST submits the info
     """
     is_post = (request.method == 'POST')
-    artist_id = int(request.args.get('artist', str(NO_SELECTION)))
-    venue_id = int(request.args.get('venue', str(NO_SELECTION)))
-
-    artists, venues = artists_and_venues()
-
-    artist_choices = [(a[0], a[1]) for a in artists]
-    artist_choices.insert(0, (NO_SELECTION, "Select artist"))
-    venue_choices = [(v[0], v[1]) for v in venues]
-    venue_choices.insert(0, (NO_SELECTION, "Select venue"))
 
     form = ShowForm()
     if is_post:
-        artists = form.artist_id.data
-        venues = form.venue_id.data
+        artist_id = form.artist_id.data
+        venue_id = form.venue_id.data
         start_time = form.start_time.data
     else:
-        artists = list()
-        venues = list()
+        artist_id = int(request.args.get('artist', str(NO_SELECTION)))
+        venue_id = int(request.args.get('venue', str(NO_SELECTION)))
         start_time = request.args.get('starttime', None)
         start_time = current_datetime() if start_time is None else str_to_datetime(start_time)
 
+    # only the selected artist & venue are options, others are found via the name searches as the user types
+    def selection(table, entity_id):
+        if entity_id is None or entity_id == NO_SELECTION:
+            return []
+        return list(entity_names(get_entity(table), [entity_id]).items())
+
+    artist_choices = selection(ARTIST_TABLE, artist_id)
+    artist_choices.insert(0, (NO_SELECTION, "Select artist"))
+    venue_choices = selection(VENUE_TABLE, venue_id)
+    venue_choices.insert(0, (NO_SELECTION, "Select venue"))
+
     # set choices & validators based on possible options
     set_singleselect_field_options(form.artist_id, artist_choices,
-                                   [a[0] for a in artist_choices if a[0] != NO_SELECTION], artists)
+                                   [a[0] for a in artist_choices if a[0] != NO_SELECTION], artist_id)
     set_singleselect_field_options(form.venue_id, venue_choices, [v[0] for v in venue_choices if v[0] != NO_SELECTION],
-                                   venues)
-    if artist_id != NO_SELECTION:
-        form.artist_id.data = artist_id
-    if venue_id != NO_SELECTION:
-        form.venue_id.data = venue_id
+                                   venue_id)
     if start_time is not None:
         form.start_time.data = start_time
 
@@ -280,23 +403,14 @@ def create_show():
             venue = label_from_valuelabel_list(venue_choices, form.venue_id.data)
 
             if not verification["ok"]:
-                def time_disp(dt): return dt.strftime(AVAILABILITY_TIME_FMT)
-
-                if verification["show"] is not None:
-                    err = verification["show"]
-                    flash(f'Booking conflict. A show by {err.name} is booked from '
-                          f'{time_disp(err.start_time)} to {time_disp(err.end_time)}.')
-                if verification["artist"] is not None:
-                    err = verification["artist"]
-                    flash(f'Artist availability conflict. Artist is only available from '
-                          f'{time_disp(err.start_time)} to {time_disp(err.end_time)}.')
-                if not verification["availability"]:
-                    flash(f'Artist availability conflict. Artist is not available.')
+                for message in verification_messages(verification):
+                    flash(message)
 
             else:
                 success = create_show_impl(show)
 
                 if success:
+                    notify_write(SHOWS_TABLE)
                     # on successful db insert, flash success
                     flash(f'{artist} show at {venue} successfully listed!')
                 else:
@@ -319,3 +433,180 @@ def create_show():
 
     response.status_code = status_code
     return response
+
+
+BULK_SHOW_FIELDS = ["artist_id", "venue_id", "start_time", "duration"]
+JSON_CONTENT = 'application/json'
+CSV_CONTENT = 'text/csv'
+
+
+def parse_bulk_show(entry: dict) -> tuple:
+    """
+    Parse a show in a bulk request
+    :param entry:   dict of show fields
+    :return: tuple of show dict and list of errors
+    """
+    show = {}
+    errors = []
+    if not isinstance(entry, dict):
+        return show, ['Show must be an object']
+    for field in BULK_SHOW_FIELDS:
+        value = entry.get(field)
+        if value is None or (isinstance(value, str) and len(value.strip()) == 0):
+            errors.append(f'Missing {field}')
+            continue
+        try:
+            if field == "start_time":
+                value = datetime.fromisoformat(str(value).strip())
+                if value.tzinfo is not None:
+                    raise ValueError
+            else:
+                value = int(str(value).strip())
+            show[field] = value
+        except ValueError:
+            errors.append(f'Invalid {field}: {value}')
+
+    if "start_time" in show and show["start_time"] < current_datetime():
+        errors.append(f'Invalid start_time: {show["start_time"].isoformat(sep=" ", timespec="minutes")}, '
+                      f'must not be in the past')
+    if "duration" in show and not 0 < show["duration"] <= get_config("MAX_SHOW_DURATION"):
+        errors.append(f'Invalid duration: {show["duration"]}, must be 1 to {get_config("MAX_SHOW_DURATION")} minutes')
+    return show, errors
+
+
+def get_bulk_request() -> list:
+    """
+    Get the shows in a bulk request; a JSON list of shows or object with a 'shows' list, or CSV with a header row
+    :return: list of raw show dicts
+    """
+    if request.mimetype == JSON_CONTENT:
+        entries = request.get_json(silent=True)
+        if isinstance(entries, dict):
+            entries = entries.get("shows")
+        if not isinstance(entries, list):
+            abort(HTTPStatus.BAD_REQUEST.value)
+    elif request.mimetype == CSV_CONTENT:
+        try:
+            entries = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+        except csv.Error:
+            abort(HTTPStatus.BAD_REQUEST.value)
+    else:
+        abort(HTTPStatus.UNSUPPORTED_MEDIA_TYPE.value)
+
+    if len(entries) > get_config("BULK_SHOWS_MAX"):
+        abort(HTTPStatus.REQUEST_ENTITY_TOO_LARGE.value)
+    return entries
+
+
+def verify_shows(shows: list) -> list:
+    """
+    Verify that a batch of shows can be scheduled without conflict, with existing shows or each other.
+    Existing bookings & availabilities for the whole batch are retrieved up front, and checked in memory.
+    :param shows:   list of show dicts; entries which failed parsing are None
+    :return: list of errors for each show
+    """
+    errors = [[] for _ in shows]
+    valid = [(index, show) for index, show in enumerate(shows) if show is not None]
+    if len(valid) == 0:
+        return errors
+
+    artist_ids = {show["artist_id"] for _, show in valid}
+    venue_ids = {show["venue_id"] for _, show in valid}
+    artists = entity_names(get_entity(ARTIST_TABLE), artist_ids)
+    venues = entity_names(get_entity(VENUE_TABLE), venue_ids)
+
+    def end_of(show): return show["start_time"] + timedelta(minutes=show["duration"])
+
+    period_start = min(show["start_time"] for _, show in valid)
+    period_end = max(end_of(show) for _, show in valid)
+
+    # existing bookings indexed by venue and by artist
+    venue_bookings = defaultdict(IntervalIndex)
+    artist_bookings = defaultdict(IntervalIndex)
+    for booking in bookings_in_period(artist_ids, venue_ids, period_start, period_end):
+        end_time = booking["start_time"] + timedelta(minutes=booking["duration"])
+        venue_bookings[booking["venue_id"]].add(
+            booking["start_time"], end_time,
+            Booking(booking["artist_name"], booking["start_time"], booking["duration"]))
+        artist_bookings[booking["artist_id"]].add(
+            booking["start_time"], end_time,
+            (booking["venue_id"], Booking(booking["venue_name"], booking["start_time"], booking["duration"])))
+
+    # availabilities by artist, ordered by from date
+    availabilities = defaultdict(list)
+    from_dates = defaultdict(list)
+    for artist_id, from_date, availability in availabilities_by_artists(artist_ids, period_end):
+        availabilities[artist_id].append(availability)
+        from_dates[artist_id].append(from_date)
+
+    for index, show in valid:
+        artist_id = show["artist_id"]
+        venue_id = show["venue_id"]
+        if artist_id not in artists:
+            errors[index].append(f'Unknown artist: {artist_id}')
+        if venue_id not in venues:
+            errors[index].append(f'Unknown venue: {venue_id}')
+        if len(errors[index]) > 0:
+            continue
+
+        start_time = show["start_time"]
+        end_time = end_of(show)
+        booking_conflict = next(
+            (b[2] for b in venue_bookings[venue_id].overlapping(start_time, end_time)), None)
+        artist_booking = next(
+            (b[2][1] for b in artist_bookings[artist_id].overlapping(start_time, end_time) if b[2][0] != venue_id),
+            None)
+
+        # latest availability starting before the show
+        latest = bisect_left(from_dates[artist_id], start_time) - 1
+        availability = availabilities[artist_id][latest] if latest >= 0 else None
+        artist_conflict, available = availability_conflict(dow_availability(availability, start_time.weekday()),
+                                                           start_time, end_time)
+
+        errors[index].extend(verification_messages(
+            verification_result(booking_conflict, artist_booking, artist_conflict, available)))
+
+        # subsequent shows in the batch must not conflict with this one
+        venue_bookings[venue_id].add(start_time, end_time,
+                                     Booking(artists[artist_id], start_time, show["duration"]))
+        artist_bookings[artist_id].add(start_time, end_time,
+                                       (venue_id, Booking(venues[venue_id], start_time, show["duration"])))
+
+    return errors
+
+
+def bulk_shows():
+    """
+    List a batch of shows. Either all the shows are listed, or none are if any are invalid or conflict.
+
+    Request body is JSON or CSV, see get_bulk_request(). Each show has 'artist_id', 'venue_id',
+    'start_time' (ISO 8601, e.g. 'YYYY-MM-DD HH:MM') and 'duration' (minutes).
+    """
+    entries = get_bulk_request()
+
+    shows_list = []
+    errors = []
+    for entry in entries:
+        show, show_errors = parse_bulk_show(entry)
+        shows_list.append(show if len(show_errors) == 0 else None)
+        errors.append(show_errors)
+
+    for show_errors, verify_errors in zip(errors, verify_shows(shows_list)):
+        show_errors.extend(verify_errors)
+
+    errors = [{"row": index + 1, "errors": show_errors}
+              for index, show_errors in enumerate(errors) if len(show_errors) > 0]
+    if len(errors) > 0:
+        return jsonify({
+            "success": False,
+            "errors": errors
+        }), HTTPStatus.UNPROCESSABLE_ENTITY.value
+
+    success = len(shows_list) == 0 or create_shows_impl(shows_list)
+    if success and len(shows_list) > 0:
+        notify_write(SHOWS_TABLE)
+
+    return jsonify({
+        "success": success,
+        "created": len(shows_list) if success else 0
+    }), HTTPStatus.CREATED.value if success else HTTPStatus.INTERNAL_SERVER_ERROR.value
@@ -10,15 +10,17 @@ from flask_sqlalchemy import Pagination
 from flask_wtf import FlaskForm
 
 from misc import (print_exc_info, EntityResult, ncsg_search_clauses, entity_search_clauses,
-                  OR_CONJUNC, AND_CONJUNC, SearchParams, entity_search_expression, SP_GENRES
+                  OR_CONJUNC, AND_CONJUNC, SearchParams, entity_search_expression, SEARCH_ADVANCED
                   )
 from util import get_config
-from misc.engine import execute
+from misc.engine import execute, stream
+from misc.pagination import KeysetPagination
 from misc.queries_engine import join_engine
-from models import ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE, get_entity, fq_column, GENRES_TABLE
-from .artist_engine import datetime_to_str
+from models import (ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE, AVAILABILITY_TABLE, get_entity,
+                    Entity, get_model_property_list)
 from .controllers_misc import IGNORE_ID, model_property_list, FactoryObj, FILTER_PREVIOUS, FILTER_UPCOMING
-from .show_orm import SHOWS_KEYS, AvailabilitySlot
+from .show_orm import SHOWS_KEYS, AvailabilitySlot, show_keyset, BOOKING_CONFLICT_KEYS, conflict_window, \
+    conflict_end
 
 # keys to extract data for db results
 SHOWS_DICT = {p: p for p in SHOWS_KEYS}
@@ -47,7 +49,7 @@ def show_factory_engine(obj_type: FactoryObj) -> Union[dict, str, None]:
 _FIELDS_LIST_ = ", ".join([
     _SHOWS_.fq_column("venue_id"), _SHOWS_.fq_column("artist_id"), _SHOWS_.fq_column("start_time"),
     f'{_VENUE_.fq_column("name")} as venue_name', f'{_ARTIST_.fq_column("name")} as artist_name',
-    f'{_ARTIST_.fq_column("image_link")} as artist_image_link'
+    f'{_ARTIST_.fq_column("image_link")} as artist_image_link', _SHOWS_.fq_id()
 ])
 # ((inner join 'shows table' and 'venue table')
 #       inner join 'artist table')
@@ -55,34 +57,10 @@ _BASIC_FROM_JOIN_ = \
     join_engine(
         join_engine(_SHOWS_.eng_table, _VENUE_.eng_table, _SHOWS_.fq_column("venue_id"), _VENUE_.fq_id()),
         _ARTIST_.eng_table, _SHOWS_.fq_column("artist_id"), _ARTIST_.fq_id())
-# ((((((inner join 'shows table' and 'venue table')
-#       inner join 'artist table')
-#           inner join 'venue genre table')
-#               inner join 'artist genre table')
-#                   inner join 'genre table')
-#                       inner join aliased 'genre table')
-_ALIAS_GENRE_TABLE_ = f'alias{GENRES_TABLE}'
-_GENRE_FROM_JOIN_ = \
-    join_engine(
-        join_engine(
-            join_engine(
-                join_engine(
-                    join_engine(
-                        join_engine(_SHOWS_.eng_table, _VENUE_.eng_table,
-                                    _SHOWS_.fq_column("venue_id"), _VENUE_.fq_id()),
-                        _ARTIST_.eng_table,
-                        _SHOWS_.fq_column("artist_id"), _ARTIST_.fq_id()),
-                    _VENUE_.eng_genre_link_table,
-                    fq_column(_VENUE_.eng_genre_link_table, "venue_id"), _VENUE_.fq_id()),
-                _ARTIST_.eng_genre_link_table,
-                fq_column(_ARTIST_.eng_genre_link_table, "artist_id"), _ARTIST_.fq_id()),
-            GENRES_TABLE,
-            fq_column(_VENUE_.eng_genre_link_table, "genre_id"), fq_column(GENRES_TABLE, "id")),
-        f'"{GENRES_TABLE}" as {_ALIAS_GENRE_TABLE_}',
-        fq_column(_ARTIST_.eng_genre_link_table, "genre_id"), f'{_ALIAS_GENRE_TABLE_}.id')
-
-
-def shows_engine(page: int, filterby: str, mode: str, form: FlaskForm, search_term: str) -> dict:
+
+
+def shows_engine(page: int, filterby: str, mode: str, form: FlaskForm, search_term: str,
+                 keyset: bool = False, after: tuple = None) -> dict:
     """
     List all shows
     :param page:         requested page of search results
@@ -90,54 +68,24 @@ def shows_engine(page: int, filterby: str, mode: str, form: FlaskForm, search_te
     :param mode:         one of 'basic', 'advanced' or 'all'
     :param form:         form data for advanced search
     :param search_term:  search_term for basic search
+    :param keyset:       use keyset pagination; page is ignored
+    :param after:        keyset pagination cursor; (start_time, id) of the last show on the previous page
     """
     shows_list = []
     pagination = Pagination(None, page, SHOWS_PER_PAGE, 0, shows_list)
     # advanced search on Venue & Artist, joining class clauses with 'and' and the result of those with 'or'
     # e.g. if have 'name' do same search on Venue & Artist and 'or' their results
-    search = \
-        SearchParams([_VENUE_, _ARTIST_], conjunction=[OR_CONJUNC, AND_CONJUNC],
-                     genre_aliases=[None, _ALIAS_GENRE_TABLE_]).load_form(form)
+    search = SearchParams([_VENUE_, _ARTIST_], conjunction=[OR_CONJUNC, AND_CONJUNC]).load_form(form)
     search.simple_search_term = search_term
     try:
-        if filterby == FILTER_PREVIOUS:
-            time_filter = f'"{SHOWS_TABLE}".start_time < \'{datetime_to_str(datetime.today())}\''
-        elif filterby == FILTER_UPCOMING:
-            time_filter = f'"{SHOWS_TABLE}".start_time > \'{datetime_to_str(datetime.today())}\''
-        else:
-            time_filter = None
-
-        # get search terms and clauses for both Venue & Artist
-        ncsg_search_clauses(mode, search)
-
-        from_term = _GENRE_FROM_JOIN_ if search.searching_on[SP_GENRES] else _BASIC_FROM_JOIN_
+        # genre criteria are semi-joins, so the basic join yields each show once
+        from_term = _BASIC_FROM_JOIN_
+        filters = _shows_filters(filterby, mode, search)
 
-        if len(search.clauses) > 0:
-            search_filter = entity_search_clauses('', search, entity_search_expression)
+        if keyset:
+            pagination = _keyset_page(from_term, filters, search, after)
         else:
-            search_filter = None
-
-        filters = _combine_filters(search_filter, time_filter)
-
-        # get total count
-        sql = f'SELECT COUNT("{SHOWS_TABLE}".venue_id) FROM {from_term}{filters};'
-        total = execute(sql).scalar()
-
-        if total > 0:
-            offset = SHOWS_PER_PAGE * (page - 1)
-            if offset >= total:
-                abort(HTTPStatus.BAD_REQUEST.value)
-        else:
-            offset = 0
-
-        # get items for this request
-        sql = f'SELECT {_FIELDS_LIST_} FROM {from_term}{filters} ' \
-              f'ORDER BY "{SHOWS_TABLE}".start_time LIMIT {SHOWS_PER_PAGE} OFFSET {offset};'
-
-        shows_list = execute(sql).fetchall()
-        total = len(shows_list)
-
-        pagination = Pagination(None, page, SHOWS_PER_PAGE, total, shows_list)
+            pagination = _offset_page(from_term, filters, search, page)
         shows_list = pagination.items
 
     except:
@@ -145,8 +93,7 @@ def shows_engine(page: int, filterby: str, mode: str, form: FlaskForm, search_te
         abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
 
     # [{'venue_id': ?, 'artist_id' ?, ...}, {}, ...] }
-    data = [{k: show[v] if k != 'start_time' else show[v].isoformat() for k, v in SHOWS_DICT.items()}
-            for show in shows_list]
+    data = [{k: show[v] for k, v in SHOWS_DICT.items()} for show in shows_list]
 
     return {
         "count": pagination.total,
@@ -157,6 +104,105 @@ def shows_engine(page: int, filterby: str, mode: str, form: FlaskForm, search_te
     }
 
 
+def _shows_filters(filterby: str, mode: str, search: SearchParams) -> str:
+    """
+    Get the where clause for shows matching a search
+    :param filterby:     results filter; one of 'all', 'previous' or 'upcoming'
+    :param mode:         one of 'basic', 'advanced' or 'all'
+    :param search:       search parameters for Venue & Artist
+    """
+    if filterby == FILTER_PREVIOUS:
+        time_filter = f'"{SHOWS_TABLE}".start_time < {search.bind(datetime.today())}'
+    elif filterby == FILTER_UPCOMING:
+        time_filter = f'"{SHOWS_TABLE}".start_time > {search.bind(datetime.today())}'
+    else:
+        time_filter = None
+
+    # get search terms and clauses for both Venue & Artist
+    ncsg_search_clauses(mode, search)
+
+    if len(search.clauses) > 0:
+        search_filter = entity_search_clauses('', search, entity_search_expression)
+    else:
+        search_filter = None
+
+    return _combine_filters(search_filter, time_filter)
+
+
+_EXPORT_FIELDS_LIST_ = ", ".join([
+    _SHOWS_.fq_id(), _SHOWS_.fq_column("start_time"), _SHOWS_.fq_column("duration"),
+    _SHOWS_.fq_column("venue_id"), f'{_VENUE_.fq_column("name")} as venue_name',
+    _SHOWS_.fq_column("artist_id"), f'{_ARTIST_.fq_column("name")} as artist_name'
+])
+
+
+def export_shows_engine(filterby: str, form: FlaskForm):
+    """
+    Export the shows matching an advanced search
+    :param filterby:     results filter; one of 'all', 'previous' or 'upcoming'
+    :param form:         form data for advanced search
+    :return: iterator of result rows in SHOWS_EXPORT_KEYS order, which fetches the rows from the database in batches
+    """
+    search = SearchParams([_VENUE_, _ARTIST_], conjunction=[OR_CONJUNC, AND_CONJUNC]).load_form(form)
+    filters = _shows_filters(filterby, SEARCH_ADVANCED, search)
+    sql = f'SELECT {_EXPORT_FIELDS_LIST_} FROM {_BASIC_FROM_JOIN_}{filters} ' \
+          f'ORDER BY "{SHOWS_TABLE}".start_time, "{SHOWS_TABLE}".id;'
+    return stream(sql, search.params, get_config("EXPORT_BATCH_SIZE"))
+
+
+def _offset_page(from_term: str, filters: str, search: SearchParams, page: int) -> Pagination:
+    """
+    Get a page of shows using limit/offset pagination
+    :param from_term:  from clause
+    :param filters:    where clause
+    :param search:     search parameters
+    :param page:       requested page
+    """
+    # get total count
+    sql = f'SELECT COUNT("{SHOWS_TABLE}".venue_id) FROM {from_term}{filters};'
+    total = execute(sql, search.params).scalar()
+
+    if total > 0:
+        offset = SHOWS_PER_PAGE * (page - 1)
+        if offset >= total:
+            abort(HTTPStatus.BAD_REQUEST.value)
+    else:
+        offset = 0
+
+    # get items for this request
+    sql = f'SELECT {_FIELDS_LIST_} FROM {from_term}{filters} ' \
+          f'ORDER BY "{SHOWS_TABLE}".start_time, "{SHOWS_TABLE}".id LIMIT :limit OFFSET :offset;'
+
+    shows_list = execute(sql, {**search.params, "limit": SHOWS_PER_PAGE, "offset": offset}).fetchall()
+
+    return Pagination(None, page, SHOWS_PER_PAGE, total, shows_list)
+
+
+def _keyset_page(from_term: str, filters: str, search: SearchParams, after: tuple) -> KeysetPagination:
+    """
+    Get a page of shows using keyset pagination
+    :param from_term:  from clause
+    :param filters:    where clause
+    :param search:     search parameters
+    :param after:      (start_time, id) of the last show on the previous page, or None for the first page
+    """
+    total = None
+    if get_config("SHOWS_KEYSET_COUNT"):
+        sql = f'SELECT COUNT("{SHOWS_TABLE}".venue_id) FROM {from_term}{filters};'
+        total = execute(sql, search.params).scalar()
+
+    if after is not None:
+        filters = _combine_filters(
+            filters, f'("{SHOWS_TABLE}".start_time, "{SHOWS_TABLE}".id) > ({search.bind(after[0])}, {search.bind(after[1])})')
+
+    # fetch one more than a page to determine if there is a following page
+    sql = f'SELECT {_FIELDS_LIST_} FROM {from_term}{filters} ' \
+          f'ORDER BY "{SHOWS_TABLE}".start_time, "{SHOWS_TABLE}".id LIMIT :limit;'
+    shows_list = execute(sql, {**search.params, "limit": SHOWS_PER_PAGE + 1}).fetchall()
+
+    return KeysetPagination(after, SHOWS_PER_PAGE, shows_list, show_keyset, total=total)
+
+
 def _combine_filters(search_filter: str, time_filter: str):
     sql = ''
     if search_filter is not None:
@@ -177,6 +223,134 @@ def extract_unique_properties_engine(show: dict) -> tuple:
            show["start_time"] + timedelta(minutes=show["duration"]), EntityResult.DICT
 
 
+def booking_conflicts_engine(artist_id: int, venue_id: int, start_time: datetime, end_time: datetime) -> list:
+    """
+    Search for shows at a venue or by an artist which overlap a time slot
+    :param artist_id:  id of artist
+    :param venue_id:   id of venue
+    :param start_time: start of time slot
+    :param end_time:   end of time slot
+    :return: list of conflicting shows ordered by start time
+    """
+    conflicts = []
+    try:
+        # bounding start_time on both sides allows the (venue_id, start_time) & (artist_id, start_time) indices
+        # to be used, so only shows in the window are examined
+        conflicts = execute(
+            f'SELECT "{SHOWS_TABLE}".start_time, "{SHOWS_TABLE}".duration, '
+            f'"{SHOWS_TABLE}".venue_id, "{VENUE_TABLE}".name AS venue_name, '
+            f'"{SHOWS_TABLE}".artist_id, "{ARTIST_TABLE}".name AS artist_name '
+            f'FROM (("{SHOWS_TABLE}" '
+            f'INNER JOIN "{VENUE_TABLE}" ON "{SHOWS_TABLE}".venue_id = "{VENUE_TABLE}".id) '
+            f'INNER JOIN "{ARTIST_TABLE}" ON "{SHOWS_TABLE}".artist_id = "{ARTIST_TABLE}".id) '
+            f'WHERE ("{SHOWS_TABLE}".venue_id = :venue_id OR "{SHOWS_TABLE}".artist_id = :artist_id) '
+            f'AND "{SHOWS_TABLE}".start_time > :window_start AND "{SHOWS_TABLE}".start_time < :end_time '
+            f'AND "{SHOWS_TABLE}".start_time + make_interval(mins => "{SHOWS_TABLE}".duration) > :start_time '
+            f'ORDER BY "{SHOWS_TABLE}".start_time;', {
+                "venue_id": venue_id, "artist_id": artist_id, "window_start": conflict_window(start_time),
+                "start_time": start_time, "end_time": conflict_end(start_time, end_time)
+            }).fetchall()
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+    # [{'start_time': ?, 'duration' ?, ...}, {}, ...] }
+    return [{k: show[k] for k in BOOKING_CONFLICT_KEYS} for show in conflicts]
+
+
+def bookings_in_period_engine(artist_ids: list, venue_ids: list, start_time: datetime, end_time: datetime) -> list:
+    """
+    Search for shows at any of a list of venues or by any of a list of artists which may overlap a period
+    :param artist_ids: ids of artists
+    :param venue_ids:  ids of venues
+    :param start_time: start of period
+    :param end_time:   end of period
+    :return: list of shows ordered by start time
+    """
+    bookings = []
+    try:
+        bookings = execute(
+            f'SELECT "{SHOWS_TABLE}".start_time, "{SHOWS_TABLE}".duration, '
+            f'"{SHOWS_TABLE}".venue_id, "{VENUE_TABLE}".name AS venue_name, '
+            f'"{SHOWS_TABLE}".artist_id, "{ARTIST_TABLE}".name AS artist_name '
+            f'FROM (("{SHOWS_TABLE}" '
+            f'INNER JOIN "{VENUE_TABLE}" ON "{SHOWS_TABLE}".venue_id = "{VENUE_TABLE}".id) '
+            f'INNER JOIN "{ARTIST_TABLE}" ON "{SHOWS_TABLE}".artist_id = "{ARTIST_TABLE}".id) '
+            f'WHERE ("{SHOWS_TABLE}".venue_id = ANY(:venue_ids) OR "{SHOWS_TABLE}".artist_id = ANY(:artist_ids)) '
+            f'AND "{SHOWS_TABLE}".start_time > :window_start AND "{SHOWS_TABLE}".start_time < :end_time '
+            f'ORDER BY "{SHOWS_TABLE}".start_time;', {
+                "venue_ids": list(venue_ids), "artist_ids": list(artist_ids),
+                "window_start": conflict_window(start_time), "end_time": end_time
+            }).fetchall()
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+    # [{'start_time': ?, 'duration' ?, ...}, {}, ...] }
+    return [{k: show[k] for k in BOOKING_CONFLICT_KEYS} for show in bookings]
+
+
+def availabilities_by_artists_engine(artist_ids: list, before: datetime) -> list:
+    """
+    Search for the availabilities of artists
+    :param artist_ids: ids of artists
+    :param before:     only availabilities starting before this are selected
+    :return: list of tuples of artist id, from date and availability, ordered by artist, from date and id
+    """
+    availabilities = []
+    try:
+        properties = ', '.join([f'"{AVAILABILITY_TABLE}".{p}' for p in get_model_property_list(AVAILABILITY_TABLE)])
+        availabilities = execute(
+            f'SELECT {properties} FROM "{AVAILABILITY_TABLE}" '
+            f'WHERE "{AVAILABILITY_TABLE}".artist_id = ANY(:artist_ids) AND "{AVAILABILITY_TABLE}".from_date < :before '
+            f'ORDER BY "{AVAILABILITY_TABLE}".artist_id, "{AVAILABILITY_TABLE}".from_date, "{AVAILABILITY_TABLE}".id;',
+            {"artist_ids": list(artist_ids), "before": before}).mappings().all()
+        availabilities = [(a["artist_id"], a["from_date"], dict(a)) for a in availabilities]
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+    return availabilities
+
+
+def entity_names_engine(entity: Entity, ids: list) -> dict:
+    """
+    Get the names of entities
+    :param entity: entity to get names for
+    :param ids:    ids of entities
+    :return: dict of id to name for entities which exist
+    """
+    names = {}
+    try:
+        names = {e["id"]: e["name"] for e in execute(
+            f'SELECT id, name FROM "{entity.eng_table}" WHERE id = ANY(:ids);', {"ids": list(ids)}).fetchall()}
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+    return names
+
+
+def create_shows_engine(shows: list) -> bool:
+    """
+    Create shows in ENGINE mode, using a single multi-row insert
+    :param shows:   list of dicts of show properties
+    """
+    success = False
+    try:
+        # unnest parallel arrays so the statement text is the same regardless of the number of shows
+        new_shows = execute(
+            f'INSERT INTO "{SHOWS_TABLE}"(venue_id, artist_id, start_time, duration) '
+            f'SELECT * FROM unnest(CAST(:venue_id AS INTEGER[]), CAST(:artist_id AS INTEGER[]), '
+            f'CAST(:start_time AS TIMESTAMP[]), CAST(:duration AS INTEGER[]));',
+            {k: [show[k] for show in shows] for k in ["venue_id", "artist_id", "start_time", "duration"]})
+        success = new_shows.rowcount == len(shows)
+    except:
+        print_exc_info()
+
+    return success
+
+
 __DOW_TIMES__ = [
     # start_time, end_time
     ("mon_from", "mon_to"),  # monday
@@ -208,13 +382,13 @@ def show_insert_sql(show: dict):
     """
     Generate show insert SQL
     :param show:   show to create
+    :return: tuple of SQL and bound parameters
     """
     properties = model_property_list(show, IGNORE_ID)
     properties_list = ', '.join(properties)
-    value_dict = {p: str(show[p]) if p != 'start_time' else f"'{datetime_to_str(show[p])}'" for p in properties}
-    values = [value_dict[p] for p in properties]
-    values_list = ', '.join(values)
-    return f'INSERT INTO "{SHOWS_TABLE}"({properties_list}) VALUES ({values_list});'
+    values_list = ', '.join([f':{p}' for p in properties])
+    value_dict = {p: show[p] for p in properties}
+    return f'INSERT INTO "{SHOWS_TABLE}"({properties_list}) VALUES ({values_list});', value_dict
 
 
 def create_show_engine(show: dict):
@@ -224,28 +398,9 @@ def create_show_engine(show: dict):
     """
     success = False
     try:
-        new_show = execute(show_insert_sql(show))
+        new_show = execute(*show_insert_sql(show))
         success = new_show.rowcount > 0
     except:
         print_exc_info()
 
     return success
-
-
-def artists_and_venues_engine():
-    """
-    Get artists and venues for show listing
-    """
-    artists = []
-    venues = []
-    try:
-        artists = execute(f'SELECT id, name FROM "{ARTIST_TABLE}" ORDER BY name;') \
-            .fetchall()
-        artists = [(a["id"], a["name"]) for a in artists]
-        venues = execute(f'SELECT id, name FROM "{VENUE_TABLE}" ORDER BY name;') \
-            .fetchall()
-        venues = [(a["id"], a["name"]) for a in venues]
-    except:
-        print_exc_info()
-
-    return artists, venues
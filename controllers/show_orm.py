@@ -1,27 +1,35 @@
 # ---------------------------------------------------------------------------- #
 # Imports
 # ---------------------------------------------------------------------------- #
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from http import HTTPStatus
 from typing import Union, Any
 
 from flask import abort
 from flask_sqlalchemy import Pagination
 from flask_wtf import FlaskForm
+from sqlalchemy import tuple_, or_, func, insert
 
 from forms import MIDNIGHT
 from misc import (print_exc_info, EntityResult, ncsg_search_clauses, entity_search_clauses,
-                  OR_CONJUNC, AND_CONJUNC, SearchParams, entity_search_expression
+                  OR_CONJUNC, AND_CONJUNC, SearchParams, entity_search_expression, SEARCH_ADVANCED
                   )
+from misc.pagination import KeysetPagination
 from util import get_config
 from models import SQLAlchemyDB as db, Venue, Artist, Show, Availability, get_entity, ARTIST_TABLE, VENUE_TABLE, \
-    SHOWS_TABLE
+    SHOWS_TABLE, Entity
 from .controllers_misc import FactoryObj, FILTER_PREVIOUS, FILTER_UPCOMING
 
-SHOWS_KEYS = ['venue_id', 'artist_id', 'start_time', 'venue_name', 'artist_name', 'artist_image_link']
+SHOWS_KEYS = ['venue_id', 'artist_id', 'start_time', 'venue_name', 'artist_name', 'artist_image_link', 'id']
 # indices to extract data for db results
 SHOWS_DICT = {SHOWS_KEYS[p]: p for p in range(len(SHOWS_KEYS))}
 
+SHOWS_EXPORT_KEYS = ['id', 'start_time', 'duration', 'venue_id', 'venue_name', 'artist_id', 'artist_name']
+
+BOOKING_CONFLICT_KEYS = ['start_time', 'duration', 'venue_id', 'venue_name', 'artist_id', 'artist_name']
+# indices to extract data for db results
+BOOKING_CONFLICT_DICT = {BOOKING_CONFLICT_KEYS[p]: p for p in range(len(BOOKING_CONFLICT_KEYS))}
+
 SHOWS_PER_PAGE = get_config("SHOWS_PER_PAGE")
 
 _ARTIST_ = get_entity(ARTIST_TABLE)
@@ -43,7 +51,8 @@ def show_factory_orm(obj_type: FactoryObj) -> Union[Show, object, None]:
     return result
 
 
-def shows_orm(page: int, filterby: str, mode: str, form: FlaskForm, search_term: str) -> dict:
+def shows_orm(page: int, filterby: str, mode: str, form: FlaskForm, search_term: str,
+              keyset: bool = False, after: tuple = None) -> dict:
     """
     List all shows
     :param page:         requested page of search results
@@ -51,6 +60,8 @@ def shows_orm(page: int, filterby: str, mode: str, form: FlaskForm, search_term:
     :param mode:         one of 'basic', 'advanced' or 'all'
     :param form:         form data for advanced search
     :param search_term:  search_term for basic search
+    :param keyset:       use keyset pagination; page is ignored
+    :param after:        keyset pagination cursor; (start_time, id) of the last show on the previous page
     """
     shows_list = []
     pagination = Pagination(None, page, SHOWS_PER_PAGE, 0, shows_list)
@@ -59,24 +70,22 @@ def shows_orm(page: int, filterby: str, mode: str, form: FlaskForm, search_term:
     search = SearchParams([_ARTIST_, _VENUE_], conjunction=[OR_CONJUNC, AND_CONJUNC]).load_form(form)
     search.simple_search_term = search_term
     try:
-        shows_list = Show.query\
-            .join(Venue, Show.venue_id == Venue.id) \
-            .join(Artist, Show.artist_id == Artist.id) \
-            .with_entities(Show.venue_id, Show.artist_id, Show.start_time,
-                           Venue.name, Artist.name, Artist.image_link)
-        if filterby == FILTER_PREVIOUS:
-            shows_list = shows_list.filter(Show.start_time < datetime.today())
-        elif filterby == FILTER_UPCOMING:
-            shows_list = shows_list.filter(Show.start_time > datetime.today())
-
-        # get search terms and clauses for both Venue & Artist
-        ncsg_search_clauses(mode, search)
-        if len(search.clauses) > 0:
-            shows_list = entity_search_clauses(shows_list, search, entity_search_expression)
-
-        pagination = shows_list \
-            .order_by(Show.start_time) \
-            .paginate(page=page, per_page=SHOWS_PER_PAGE)
+        shows_list = _shows_query(filterby, mode, search,
+                                  Show.venue_id, Show.artist_id, Show.start_time,
+                                  Venue.name, Artist.name, Artist.image_link, Show.id)
+
+        if keyset:
+            total = shows_list.count() if get_config("SHOWS_KEYSET_COUNT") else None
+            if after is not None:
+                shows_list = shows_list.filter(tuple_(Show.start_time, Show.id) > tuple_(*after))
+            pagination = KeysetPagination(
+                after, SHOWS_PER_PAGE,
+                shows_list.order_by(Show.start_time, Show.id).limit(SHOWS_PER_PAGE + 1).all(),
+                show_keyset, total=total)
+        else:
+            pagination = shows_list \
+                .order_by(Show.start_time, Show.id) \
+                .paginate(page=page, per_page=SHOWS_PER_PAGE)
         shows_list = pagination.items
 
     except:
@@ -84,8 +93,7 @@ def shows_orm(page: int, filterby: str, mode: str, form: FlaskForm, search_term:
         abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
 
     # [{'venue_id': ?, 'artist_id' ?, ...}, {}, ...] }
-    data = [{k: show[v] if k != 'start_time' else show[v].isoformat() for k, v in SHOWS_DICT.items()}
-            for show in shows_list]
+    data = [{k: show[v] for k, v in SHOWS_DICT.items()} for show in shows_list]
 
     return {
         "count": pagination.total,
@@ -96,6 +104,54 @@ def shows_orm(page: int, filterby: str, mode: str, form: FlaskForm, search_term:
     }
 
 
+def _shows_query(filterby: str, mode: str, search: SearchParams, *columns):
+    """
+    Get the query for shows matching a search
+    :param filterby:     results filter; one of 'all', 'previous' or 'upcoming'
+    :param mode:         one of 'basic', 'advanced' or 'all'
+    :param search:       search parameters for Venue & Artist
+    :param columns:      columns to select
+    """
+    query = Show.query\
+        .join(Venue, Show.venue_id == Venue.id) \
+        .join(Artist, Show.artist_id == Artist.id) \
+        .with_entities(*columns)
+    if filterby == FILTER_PREVIOUS:
+        query = query.filter(Show.start_time < datetime.today())
+    elif filterby == FILTER_UPCOMING:
+        query = query.filter(Show.start_time > datetime.today())
+
+    # get search terms and clauses for both Venue & Artist
+    ncsg_search_clauses(mode, search)
+    if len(search.clauses) > 0:
+        query = entity_search_clauses(query, search, entity_search_expression)
+    return query
+
+
+def export_shows_orm(filterby: str, form: FlaskForm):
+    """
+    Export the shows matching an advanced search
+    :param filterby:     results filter; one of 'all', 'previous' or 'upcoming'
+    :param form:         form data for advanced search
+    :return: iterator of result rows in SHOWS_EXPORT_KEYS order, which fetches the rows from the database in batches
+    """
+    search = SearchParams([_ARTIST_, _VENUE_], conjunction=[OR_CONJUNC, AND_CONJUNC]).load_form(form)
+    query = _shows_query(filterby, SEARCH_ADVANCED, search,
+                         Show.id, Show.start_time, Show.duration,
+                         Show.venue_id, Venue.name, Show.artist_id, Artist.name)
+    # generator, so the query is executed when the first row is requested
+    yield from query.order_by(Show.start_time, Show.id).yield_per(get_config("EXPORT_BATCH_SIZE"))
+
+
+def show_keyset(show) -> tuple:
+    """
+    Get the keyset pagination key of a show listing result
+    :param show:   show result
+    :return: tuple of (start_time, id)
+    """
+    return show[SHOWS_DICT['start_time']], show[SHOWS_DICT['id']]
+
+
 def extract_unique_properties_orm(show: Show) -> tuple:
     """
     Extract the properties to uniquely find a show
@@ -105,6 +161,138 @@ def extract_unique_properties_orm(show: Show) -> tuple:
     return show.artist_id, show.venue_id, show.start_date, show.start_time, show.end_time, EntityResult.MODEL
 
 
+def conflict_window(start_time: datetime) -> datetime:
+    """
+    Get the earliest start time of a show which may overlap a time slot
+    :param start_time: start of time slot
+    """
+    return start_time - timedelta(minutes=get_config("MAX_SHOW_DURATION"))
+
+
+def conflict_end(start_time: datetime, end_time: datetime) -> datetime:
+    """
+    Get the time before which a show must start to overlap a time slot; a zero duration slot still conflicts with a
+    show starting at the same time
+    :param start_time: start of time slot
+    :param end_time:   end of time slot
+    """
+    return max(end_time, start_time + timedelta(minutes=1))
+
+
+def booking_conflicts_orm(artist_id: int, venue_id: int, start_time: datetime, end_time: datetime) -> list:
+    """
+    Search for shows at a venue or by an artist which overlap a time slot
+    :param artist_id:  id of artist
+    :param venue_id:   id of venue
+    :param start_time: start of time slot
+    :param end_time:   end of time slot
+    :return: list of conflicting shows ordered by start time
+    """
+    conflicts = []
+    try:
+        # bounding start_time on both sides allows the (venue_id, start_time) & (artist_id, start_time) indices
+        # to be used, so only shows in the window are examined
+        conflicts = Show.query.join(Venue, Show.venue_id == Venue.id) \
+            .join(Artist, Show.artist_id == Artist.id) \
+            .with_entities(Show.start_time, Show.duration, Show.venue_id, Venue.name, Show.artist_id, Artist.name) \
+            .filter(or_(Show.venue_id == venue_id, Show.artist_id == artist_id),
+                    Show.start_time > conflict_window(start_time),
+                    Show.start_time < conflict_end(start_time, end_time),
+                    Show.start_time + func.make_interval(0, 0, 0, 0, 0, Show.duration) > start_time) \
+            .order_by(Show.start_time) \
+            .all()
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+    # [{'start_time': ?, 'duration' ?, ...}, {}, ...] }
+    return [{k: show[v] for k, v in BOOKING_CONFLICT_DICT.items()} for show in conflicts]
+
+
+def bookings_in_period_orm(artist_ids: list, venue_ids: list, start_time: datetime, end_time: datetime) -> list:
+    """
+    Search for shows at any of a list of venues or by any of a list of artists which may overlap a period
+    :param artist_ids: ids of artists
+    :param venue_ids:  ids of venues
+    :param start_time: start of period
+    :param end_time:   end of period
+    :return: list of shows ordered by start time
+    """
+    bookings = []
+    try:
+        bookings = Show.query.join(Venue, Show.venue_id == Venue.id) \
+            .join(Artist, Show.artist_id == Artist.id) \
+            .with_entities(Show.start_time, Show.duration, Show.venue_id, Venue.name, Show.artist_id, Artist.name) \
+            .filter(or_(Show.venue_id.in_(venue_ids), Show.artist_id.in_(artist_ids)),
+                    Show.start_time > conflict_window(start_time), Show.start_time < end_time) \
+            .order_by(Show.start_time) \
+            .all()
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+    # [{'start_time': ?, 'duration' ?, ...}, {}, ...] }
+    return [{k: show[v] for k, v in BOOKING_CONFLICT_DICT.items()} for show in bookings]
+
+
+def availabilities_by_artists_orm(artist_ids: list, before: datetime) -> list:
+    """
+    Search for the availabilities of artists
+    :param artist_ids: ids of artists
+    :param before:     only availabilities starting before this are selected
+    :return: list of tuples of artist id, from date and availability, ordered by artist, from date and id
+    """
+    availabilities = []
+    try:
+        availabilities = Availability.query \
+            .filter(Availability.artist_id.in_(artist_ids), Availability.from_date < before) \
+            .order_by(Availability.artist_id, Availability.from_date, Availability.id) \
+            .all()
+        availabilities = [(a.artist_id, a.from_date, a) for a in availabilities]
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+    return availabilities
+
+
+def entity_names_orm(entity: Entity, ids: list) -> dict:
+    """
+    Get the names of entities
+    :param entity: entity to get names for
+    :param ids:    ids of entities
+    :return: dict of id to name for entities which exist
+    """
+    names = {}
+    try:
+        model = entity.orm_model
+        names = {e[0]: e[1] for e in model.query.with_entities(model.id, model.name).filter(model.id.in_(ids)).all()}
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+    return names
+
+
+def create_shows_orm(shows: list) -> bool:
+    """
+    Create shows in ORM mode, using a single multi-row insert
+    :param shows:   list of dicts of show properties
+    """
+    try:
+        db.session.execute(insert(Show).values(shows))
+        db.session.commit()
+        success = True
+    except:
+        db.session.rollback()
+        print_exc_info()
+        success = False
+    finally:
+        db.session.close()
+
+    return success
+
+
 class AvailabilitySlot:
     """ Class representing an availability slot """
 
@@ -169,18 +357,3 @@ def create_show_orm(show: Show):
         db.session.close()
 
     return success
-
-
-def artists_and_venues_orm():
-    """
-    Get artists and venues for show listing
-    """
-    artists = []
-    venues = []
-    try:
-        artists = Artist.query.with_entities(Artist.id, Artist.name).order_by(Artist.name).all()
-        venues = Venue.query.with_entities(Venue.id, Venue.name).order_by(Venue.name).all()
-    except:
-        print_exc_info()
-
-    return artists, venues
@@ -8,9 +8,13 @@ from werkzeug.datastructures import MultiDict
 
 from controllers.controllers_misc import (set_genre_field_options, update_result,
                                           delete_result, create_result, get_availability_date, exists_or_404,
-                                          FactoryObj)
+                                          FactoryObj, names_search)
 from forms import (VenueForm, NCSSearchForm, BookArtistForm)
-from misc.queries import SEARCH_BASIC, venues_search, SEARCH_ADVANCED, artists_search
+from misc.conditional import conditional_get
+from misc.invalidation import notify_write
+from misc.export import export_format, export_response
+from misc.queries import SEARCH_BASIC, venues_search, venues_export, SEARCH_ADVANCED, artists_search
+from models import VENUE_TABLE, ARTIST_TABLE, SHOWS_TABLE
 from util import current_datetime
 from .venue_engine import time_to_str, datetime_to_str
 from config import USE_ORM
@@ -48,6 +52,7 @@ else:
     )
 
 
+@conditional_get([VENUE_TABLE, SHOWS_TABLE])
 def venues():
     """
     List all venues
@@ -119,6 +124,20 @@ def search_venues_advanced():
     return render_venues('Fyyur | Venues Search', form, results)
 
 
+def export_venues():
+    """
+    Export the venues matching an advanced search
+
+    Request query parameters:
+    format:   export format; one of 'csv' or 'json'
+    name, city, state, genres: advanced search criteria, as for advanced search
+    """
+    fmt = export_format()
+    form = NCSSearchForm(formdata=request.args)
+    keys, rows = venues_export(form)
+    return export_response(keys, rows, fmt, 'venues')
+
+
 def render_venue(venue, form: BookArtistForm, results=None):
     """
     Render the venue page
@@ -149,6 +168,7 @@ def __display_venue(venue_id: int, form: BookArtistForm, results=None):
     return render_venue(venue=venue, form=form, results=results)
 
 
+@conditional_get([SHOWS_TABLE, ARTIST_TABLE], entity=(VENUE_TABLE, 'venue_id'))
 def display_venue(venue_id: int):
     """
     Show the venue page with the given venue_id
@@ -191,6 +211,8 @@ def edit_venue(venue_id: int):
     if request.method == 'POST' and form.validate_on_submit():
 
         success, venue_name = update_venue(venue["id"], form)
+        if success:
+            notify_write(VENUE_TABLE, venue["id"])
 
         return update_result(success, venue_name, 'Venue', url_for('display_venue', venue_id=venue_id))
 
@@ -211,6 +233,10 @@ def delete_venue(venue_id: int):
     :param venue_id: id of the venue to delete
     """
     success, venue_name = delete_venue_impl(venue_id)
+    if success:
+        notify_write(VENUE_TABLE, venue_id)
+        # the venue's shows are deleted as well
+        notify_write(SHOWS_TABLE)
 
     return delete_result(success, venue_name, 'Venue')
 
@@ -244,6 +270,8 @@ def create_venue():
         else:
             # add venue
             success, venue_name = create_venue_impl(venue)
+            if success:
+                notify_write(VENUE_TABLE)
 
             return create_result(success, venue_name, 'Venue')
 
@@ -291,3 +319,13 @@ def venue_bookings(venue_id: int):
     return jsonify({
         'bookings': bookings_list
     })
+
+
+def search_venue_names():
+    """
+    Search for venue names matching a prefix
+
+    Request query parameters:
+    q:  prefix to match
+    """
+    return names_search(VENUE_TABLE)
@@ -12,12 +12,12 @@ from forms import (APP_DATETIME_FMT, APP_DATE_FMT, APP_TIME_FMT)
 from misc import EntityResult, print_exc_info
 from misc import get_music_entity_engine, genre_changes_engine, exec_transaction_engine
 from misc.engine import execute, execute_transaction
-from misc.queries import entity_shows_count, shows_by_venue
+from misc.queries import venue_with_shows
 from models import (VENUE_TABLE, SHOWS_TABLE, VENUE_GENRES_TABLE,
-                    dict_disjoint, equal_dict, ARTIST_TABLE, get_entity)
-from .controllers_misc import add_show_summary, model_property_list, IGNORE_ID_GENRES, IGNORE_ID, FactoryObj, \
+                    dict_disjoint, equal_dict, ARTIST_TABLE, get_entity, fq_column)
+from .controllers_misc import model_property_list, IGNORE_ID_GENRES, IGNORE_ID, FactoryObj, \
     populate_genred_model
-from .venue_orm import BOOKING_BY_VENUE_KEYS
+from .venue_orm import BOOKING_BY_VENUE_KEYS, group_venues_by_area, day_range
 
 # keys to extract data for db results
 BOOKING_BY_VENUE_DICT = {p: p for p in BOOKING_BY_VENUE_KEYS}
@@ -45,17 +45,17 @@ def venues_engine():
     """
     venues = []
     try:
-        cities_states = execute(f'SELECT DISTINCT state, city from "{VENUE_TABLE}";')
-        for city_state in cities_states:
-            city = city_state["city"]
-            state = city_state["state"]
-            venue_list = execute(
-                f'SELECT DISTINCT id, name from "{VENUE_TABLE}" WHERE state = \'{state}\' AND city = \'{city}\';')
-            venues.append({
-                "state": state,
-                "city": city,
-                "venues": entity_shows_count(venue_list, _VENUE_)
-            })
+        # venues with their upcoming shows count, in a single query
+        venue_list = execute(
+            f'SELECT {_VENUE_.fq_column("state")}, {_VENUE_.fq_column("city")}, {_VENUE_.fq_id()}, '
+            f'{_VENUE_.fq_column("name")}, COUNT({fq_column(SHOWS_TABLE, "id")}) FROM "{VENUE_TABLE}" '
+            f'LEFT OUTER JOIN "{SHOWS_TABLE}" ON {_VENUE_.fq_id()} = {fq_column(SHOWS_TABLE, "venue_id")} '
+            f'AND {fq_column(SHOWS_TABLE, "start_time")} > CURRENT_TIMESTAMP '
+            f'GROUP BY {_VENUE_.fq_column("state")}, {_VENUE_.fq_column("city")}, {_VENUE_.fq_id()}, '
+            f'{_VENUE_.fq_column("name")} '
+            f'ORDER BY {_VENUE_.fq_column("state")}, {_VENUE_.fq_column("city")}, {_VENUE_.fq_id()};')
+
+        venues = group_venues_by_area(venue_list)
     except:
         print_exc_info()
         abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
@@ -68,8 +68,7 @@ def get_venue_engine(venue_id: int):
     Get a venue
     :param venue_id:   id of venue
     """
-    venue = get_music_entity_engine(venue_id, _VENUE_)
-    return add_show_summary(venue_id, venue, shows_by_venue)
+    return venue_with_shows(venue_id)
 
 
 def populate_venue_engine(venue: dict, form: FlaskForm):
@@ -94,11 +93,12 @@ def update_venue_engine(venue_id: int, form: FlaskForm) -> (Union[bool, None], s
     updated_venue = populate_venue_engine(_VENUE_.model_dict(), form)
     if not equal_dict(venue, updated_venue, IGNORE_ID):
         # change has occurred update venue
-        to_set = [f'{k}=\'{v}\'' for k, v in updated_venue.items()
-                  if k in dict_disjoint(venue, updated_venue, IGNORE_ID_GENRES)]
+        to_set = {k: v for k, v in updated_venue.items()
+                  if k in dict_disjoint(venue, updated_venue, IGNORE_ID_GENRES)}
         if len(to_set) > 0:
-            to_set = ", ".join(to_set)
-            stmts.append(f'UPDATE "{VENUE_TABLE}" SET {to_set} WHERE id={venue_id};')
+            set_list = ", ".join([f'{k} = :{k}' for k in to_set.keys()])
+            stmts.append((f'UPDATE "{VENUE_TABLE}" SET {set_list} WHERE id = :venue_id;',
+                          {**to_set, "venue_id": venue_id}))
 
         # update genre link table
         if updated_venue["genres"] != venue["genres"]:
@@ -127,16 +127,17 @@ def delete_venue_engine(venue_id: int) -> (bool, str):
     venue_name = None
     exists = False
     try:
-        venue = execute(f'SELECT name from "{VENUE_TABLE}" WHERE id = {venue_id};')
+        venue = execute(f'SELECT name from "{VENUE_TABLE}" WHERE id = :venue_id;', {"venue_id": venue_id})
         if venue.rowcount != 0:
             exists = True
             venue_name = venue.mappings().first().get('name')
 
             # when an venue is deleted, need to delete genres & shows as well to keep the db consistent
+            params = {"venue_id": venue_id}
             execute_transaction([
-                f'DELETE FROM "{SHOWS_TABLE}" WHERE venue_id = {venue_id};',
-                f'DELETE FROM "{VENUE_GENRES_TABLE}" WHERE venue_id = {venue_id};',
-                f'DELETE FROM "{VENUE_TABLE}" WHERE id = {venue_id};'
+                (f'DELETE FROM "{SHOWS_TABLE}" WHERE venue_id = :venue_id;', params),
+                (f'DELETE FROM "{VENUE_GENRES_TABLE}" WHERE venue_id = :venue_id;', params),
+                (f'DELETE FROM "{VENUE_TABLE}" WHERE id = :venue_id;', params)
             ])
             success = True
     except:
@@ -165,10 +166,12 @@ def id_name_by_unique_properties_sql(name: str, address: str, city: str, state:
     :param address: venue address
     :param city:    venue city
     :param state:   venue state
+    :return: tuple of SQL and bound parameters
     """
-    return f'SELECT id, name from "{VENUE_TABLE}" WHERE LOWER(name) = LOWER(\'{name}\') ' \
-           f'AND LOWER(address) = LOWER(\'{address}\') ' \
-           f'AND LOWER(city) = LOWER(\'{city}\') AND state = \'{state}\';'
+    return f'SELECT id, name from "{VENUE_TABLE}" WHERE LOWER(name) = LOWER(:name) ' \
+           f'AND LOWER(address) = LOWER(:address) ' \
+           f'AND LOWER(city) = LOWER(:city) AND state = :state;', \
+           {"name": name, "address": address, "city": city, "state": state}
 
 
 def existing_venue_engine(name: str, address: str, city: str, state: str):
@@ -184,7 +187,7 @@ def existing_venue_engine(name: str, address: str, city: str, state: str):
     venue_name = None
     try:
         existing = execute(
-            id_name_by_unique_properties_sql(name, address, city, state)
+            *id_name_by_unique_properties_sql(name, address, city, state)
         )
         if existing.rowcount > 0:
             hit = existing.mappings().first()
@@ -201,15 +204,15 @@ def venue_insert_sql(venue: dict):
     """
     Generate venue insert SQL
     :param venue: venue to create
+    :return: tuple of SQL and bound parameters
     """
     properties = model_property_list(venue, IGNORE_ID_GENRES)
     properties_list = ', '.join(properties)
-    value_dict = {p: "'" + venue[p] + "'" for p in properties if p != 'seeking_talent'}
-    value_dict['seeking_talent'] = 'TRUE' if venue['seeking_talent'] else 'FALSE'
-    values = [value_dict[p] for p in properties]
-    values_list = ', '.join(values)
+    values_list = ', '.join([f':{p}' for p in properties])
+    value_dict = {p: venue[p] for p in properties}
+    value_dict['seeking_talent'] = bool(venue['seeking_talent'])
 
-    return f'INSERT INTO "{VENUE_TABLE}"({properties_list}) VALUES ({values_list});'
+    return f'INSERT INTO "{VENUE_TABLE}"({properties_list}) VALUES ({values_list});', value_dict
 
 
 def create_venue_engine(venue: dict):
@@ -220,11 +223,11 @@ def create_venue_engine(venue: dict):
     success = False
     venue_name = venue["name"]
     try:
-        new_venue = execute(venue_insert_sql(venue))
+        new_venue = execute(*venue_insert_sql(venue))
         if new_venue.rowcount > 0:
             # using raw sql so need to query to get new id
             new_venue = execute(
-                id_name_by_unique_properties_sql(*extract_unique_properties_engine(venue))
+                *id_name_by_unique_properties_sql(*extract_unique_properties_engine(venue))
             )
             if new_venue.rowcount > 0:
                 new_venue = new_venue.fetchone()
@@ -271,14 +274,17 @@ def bookings_by_venue_engine(venue_id: int, query_date: datetime):
               f'FROM (("{SHOWS_TABLE}" ' \
               f'INNER JOIN "{VENUE_TABLE}" ON "{SHOWS_TABLE}".venue_id = "{VENUE_TABLE}".id) ' \
               f'INNER JOIN "{ARTIST_TABLE}" ON "{SHOWS_TABLE}".artist_id = "{ARTIST_TABLE}".id) ' \
-              f'WHERE "{SHOWS_TABLE}".venue_id = {venue_id}'
+              f'WHERE "{SHOWS_TABLE}".venue_id = :venue_id'
+        params = {"venue_id": venue_id}
         if query_date is not None:
-            sql = f'{sql} AND DATE("{SHOWS_TABLE}".start_time) = \'{date_to_str(query_date)}\''
+            # range on start_time rather than DATE(start_time) so the (venue_id, start_time) index may be used
+            sql = f'{sql} AND "{SHOWS_TABLE}".start_time >= :day_start AND "{SHOWS_TABLE}".start_time < :day_end'
+            params["day_start"], params["day_end"] = day_range(query_date)
         else:
             sql = f'{sql} ORDER BY "{SHOWS_TABLE}".start_time'
         sql = sql + ';'
 
-        bookings = execute(sql).fetchall()
+        bookings = execute(sql, params).fetchall()
 
     except:
         print_exc_info()
@@ -1,20 +1,22 @@
 # ---------------------------------------------------------------------------- #
 # Imports
 # ---------------------------------------------------------------------------- #
-from datetime import datetime
+from datetime import datetime, date, time, timedelta
 from http import HTTPStatus
+from itertools import groupby
 from typing import Union
 
 from flask import abort
 from flask_wtf import FlaskForm
-from sqlalchemy import func, and_, cast, Date
+from sqlalchemy import func, and_
+from sqlalchemy.orm import selectinload
 
-from .controllers_misc import (add_show_summary, model_property_list, IGNORE_ID_GENRES,
+from .controllers_misc import (model_property_list, IGNORE_ID_GENRES,
                                IGNORE_ID, FactoryObj, populate_genred_model
                                )
 from misc import get_music_entity_orm
 from misc import EntityResult, print_exc_info
-from misc.queries import entity_shows_count, shows_by_venue
+from misc.queries import venue_with_shows
 from models import SQLAlchemyDB as db, Venue, Artist, Show, get_entity, VENUE_TABLE
 
 BOOKING_BY_VENUE_KEYS = ['start_time', 'duration', 'name']
@@ -44,17 +46,15 @@ def venues_orm() -> list:
     """
     venues = []
     try:
-        cities_states = Venue.query.with_entities(Venue.state, Venue.city).distinct().all()
-        for city_state in cities_states:
-            venue_list = Venue.query.with_entities(Venue.id, Venue.name) \
-                .filter(and_(Venue.state == city_state.state, Venue.city == city_state.city)) \
-                .all()
-
-            venues.append({
-                "state": city_state[0],
-                "city": city_state[1],
-                "venues": entity_shows_count(venue_list, _VENUE_)
-            })
+        # venues with their upcoming shows count, in a single query
+        venue_list = Venue.query \
+            .outerjoin(Show, and_(Show.venue_id == Venue.id, Show.start_time > datetime.now())) \
+            .with_entities(Venue.state, Venue.city, Venue.id, Venue.name, func.count(Show.id)) \
+            .group_by(Venue.state, Venue.city, Venue.id, Venue.name) \
+            .order_by(Venue.state, Venue.city, Venue.id) \
+            .all()
+
+        venues = group_venues_by_area(venue_list)
     except:
         print_exc_info()
         abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
@@ -62,13 +62,32 @@ def venues_orm() -> list:
     return venues
 
 
+def group_venues_by_area(venue_list) -> list:
+    """
+    Group venues by area
+    :param venue_list: list of (state, city, id, name, num_upcoming_shows) ordered by state and city
+    :return: list of {"state": ?, "city": ?, "venues": [{"id": ?, "name": ?, "num_upcoming_shows": ?}, ...]}
+    """
+    venues = []
+    for (state, city), area_venues in groupby(venue_list, key=lambda v: (v[0], v[1])):
+        venues.append({
+            "state": state,
+            "city": city,
+            "venues": [{
+                "id": v[2],
+                "name": v[3],
+                "num_upcoming_shows": v[4]
+            } for v in area_venues]
+        })
+    return venues
+
+
 def get_venue_orm(venue_id: int) -> Venue:
     """
     Get a venue
     :param venue_id:   id of venue
     """
-    venue = get_music_entity_orm(venue_id, _VENUE_)
-    return add_show_summary(venue_id, venue, shows_by_venue)
+    return venue_with_shows(venue_id)
 
 
 def populate_venue_orm(venue: Venue, form: FlaskForm):
@@ -89,7 +108,8 @@ def update_venue_orm(venue_id: int, form: FlaskForm) -> (bool, str):
     """
     commit_change = False
 
-    venue = Venue.query.filter(Venue.id == venue_id).first_or_404()
+    # genres are compared and updated
+    venue = Venue.query.options(selectinload(Venue.genres)).filter(Venue.id == venue_id).first_or_404()
     venue_name = venue.name
 
     updated_venue = populate_venue_orm(Venue(), form)
@@ -129,15 +149,14 @@ def delete_venue_orm(venue_id: int):
     Delete an venue in ORM mode
     :param venue_id: id of the venue to delete
     """
-    venue = Venue.query.filter(Venue.id == venue_id).first_or_404()
-    venue_name = venue.name
+    venue_name = Venue.query.with_entities(Venue.name).filter(Venue.id == venue_id).first_or_404().name
     try:
-        # when an venue is deleted, need to delete shows as well to keep the db consistent
-        shows = Show.query.filter(Show.venue_id == venue_id).all()
-
-        for show in shows:
-            db.session.delete(show)
-        db.session.delete(venue)
+        # when an venue is deleted, need to delete genres & shows as well to keep the db consistent;
+        # set-based deletes, so the rows are not loaded
+        genre_link = _VENUE_.orm_genre_link_column
+        Show.query.filter(Show.venue_id == venue_id).delete(synchronize_session=False)
+        db.session.execute(genre_link.table.delete().where(genre_link == venue_id))
+        Venue.query.filter(Venue.id == venue_id).delete(synchronize_session=False)
         db.session.commit()
         success = True
     except:
@@ -209,6 +228,16 @@ def create_venue_orm(venue: Venue):
     return success, venue_name
 
 
+def day_range(query_date: Union[datetime, date]) -> tuple:
+    """
+    Get the start and end of the day containing a date
+    :param query_date: date to get day for
+    :return: tuple of start of day and start of following day
+    """
+    day_start = datetime.combine(query_date.date() if isinstance(query_date, datetime) else query_date, time.min)
+    return day_start, day_start + timedelta(days=1)
+
+
 def bookings_by_venue_orm(venue_id: int, query_date: datetime) -> list:
     """
     Search for a venue's bookings
@@ -221,8 +250,10 @@ def bookings_by_venue_orm(venue_id: int, query_date: datetime) -> list:
             .join(Artist, Show.artist_id == Artist.id) \
             .with_entities(Show.start_time, Show.duration, Artist.name)
         if query_date is not None:
+            # range on start_time rather than start_date so the (venue_id, start_time) index may be used
+            day_start, day_end = day_range(query_date)
             query = query.filter(
-                and_(Show.venue_id == venue_id, Show.start_date == cast(query_date, Date)))
+                and_(Show.venue_id == venue_id, Show.start_time >= day_start, Show.start_time < day_end))
         else:
             query = query.filter(Show.venue_id == venue_id) \
                 .order_by(Show.start_date)
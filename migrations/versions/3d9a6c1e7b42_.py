@@ -0,0 +1,75 @@
+"""add indexes for show, availability, genre and search queries
+
+Revision ID: 3d9a6c1e7b42
+Revises: f8fe5c0c244c
+Create Date: 2026-10-18 09:12:27.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d9a6c1e7b42'
+down_revision = 'f8fe5c0c244c'
+branch_labels = None
+depends_on = None
+
+# tables and columns searched with "LOWER(column) LIKE LOWER('%value%')"
+SEARCH_COLUMNS = [
+    ('Venue', 'name'),
+    ('Venue', 'city'),
+    ('Artist', 'name'),
+    ('Artist', 'city'),
+]
+
+
+def search_index_name(table: str, column: str) -> str:
+    return f'ix_{table}_lower_{column}'
+
+
+def trigram_available(bind) -> bool:
+    """
+    Check if the pg_trgm extension is installed or may be installed
+    """
+    return bind.execute(
+        sa.text("SELECT COUNT(*) FROM pg_available_extensions WHERE name = 'pg_trgm'")).scalar() > 0
+
+
+def upgrade():
+    # show listings, bookings and summaries filter by artist/venue and start time
+    op.create_index('ix_Shows_artist_id_start_time', 'Shows', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_Shows_venue_id_start_time', 'Shows', ['venue_id', 'start_time'], unique=False)
+    # show listings ordered by start time, and keyset pagination on (start_time, id)
+    op.create_index('ix_Shows_start_time_id', 'Shows', ['start_time', 'id'], unique=False)
+    # availability lookups find the latest entry for an artist before a date
+    op.create_index('ix_Availability_artist_id_from_date', 'Availability', ['artist_id', 'from_date'],
+                    unique=False)
+    # genre searches join from genre; primary keys only cover (entity id, genre_id)
+    op.create_index('ix_artist_genres_genre_id', 'artist_genres', ['genre_id'], unique=False)
+    op.create_index('ix_venue_genres_genre_id', 'venue_genres', ['genre_id'], unique=False)
+
+    # name/city searches; trigram indexes support '%value%' patterns, plain lower() indexes only support
+    # equality and prefix patterns, so are a fallback if pg_trgm is not available
+    bind = op.get_bind()
+    if trigram_available(bind):
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table, column in SEARCH_COLUMNS:
+            op.execute(f'CREATE INDEX "{search_index_name(table, column)}" ON "{table}" '
+                       f'USING gin (LOWER({column}) gin_trgm_ops)')
+    else:
+        for table, column in SEARCH_COLUMNS:
+            op.execute(f'CREATE INDEX "{search_index_name(table, column)}" ON "{table}" '
+                       f'(LOWER({column}) text_pattern_ops)')
+
+
+def downgrade():
+    for table, column in SEARCH_COLUMNS:
+        op.drop_index(search_index_name(table, column), table_name=table)
+
+    op.drop_index('ix_venue_genres_genre_id', table_name='venue_genres')
+    op.drop_index('ix_artist_genres_genre_id', table_name='artist_genres')
+    op.drop_index('ix_Availability_artist_id_from_date', table_name='Availability')
+    op.drop_index('ix_Shows_start_time_id', table_name='Shows')
+    op.drop_index('ix_Shows_venue_id_start_time', table_name='Shows')
+    op.drop_index('ix_Shows_artist_id_start_time', table_name='Shows')
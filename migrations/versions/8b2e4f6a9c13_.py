@@ -0,0 +1,39 @@
+"""add full text search indexes for artist and venue searches
+
+Revision ID: 8b2e4f6a9c13
+Revises: 3d9a6c1e7b42
+Create Date: 2026-10-18 14:05:51.207731
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4f6a9c13'
+down_revision = '3d9a6c1e7b42'
+branch_labels = None
+depends_on = None
+
+# tables and columns searched with "to_tsvector('simple', column) @@ to_tsquery('simple', query)"; the
+# expression must match entity_search_fulltext_orm/engine() for the indexes to be used
+SEARCH_COLUMNS = [
+    ('Venue', 'name'),
+    ('Venue', 'city'),
+    ('Artist', 'name'),
+    ('Artist', 'city'),
+]
+
+
+def search_index_name(table: str, column: str) -> str:
+    return f'ix_{table}_fts_{column}'
+
+
+def upgrade():
+    for table, column in SEARCH_COLUMNS:
+        op.execute(f'CREATE INDEX "{search_index_name(table, column)}" ON "{table}" '
+                   f"USING gin (to_tsvector('simple', {column}))")
+
+
+def downgrade():
+    for table, column in SEARCH_COLUMNS:
+        op.drop_index(search_index_name(table, column), table_name=table)
@@ -1,9 +1,9 @@
-from .misc import label_from_valuelabel_list, get_genre_list
+from .misc import label_from_valuelabel_list, get_genre_list, get_latest_lists
 from .common import EntityResult, print_exc_info, SP_NAME, SP_CITY, SP_STATE, SP_GENRES, SearchParams
-from .misc_engine import (get_music_entity_engine, get_show_summary_engine, genre_changes_engine,
+from .misc_engine import (get_music_entity_engine, genre_changes_engine,
                           exec_transaction_engine, exists_engine, latest_lists_engine
                           )
-from .misc_orm import get_music_entity_orm, get_show_summary_orm, exists_orm, latest_lists_orm
+from .misc_orm import get_music_entity_orm, exists_orm, latest_lists_orm
 from .queries import (ncsg_search_clauses, entity_search_clauses, entity_search_execute,
                       SEARCH_ADVANCED, SEARCH_ALL, SEARCH_BASIC, shows_by_artist, shows_by_venue,
                       entity_search_expression
@@ -13,6 +13,7 @@ from .queries_orm import AND_CONJUNC, OR_CONJUNC
 __all__ = [
     'label_from_valuelabel_list',
     'get_genre_list',
+    'get_latest_lists',
 
     'EntityResult',
     'print_exc_info',
@@ -23,14 +24,12 @@ __all__ = [
     'SearchParams',
 
     'get_music_entity_engine',
-    'get_show_summary_engine',
     'genre_changes_engine',
     'exec_transaction_engine',
     'exists_engine',
     'latest_lists_engine',
 
     'get_music_entity_orm',
-    'get_show_summary_orm',
     'exists_orm',
     'latest_lists_orm',
 
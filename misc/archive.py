@@ -0,0 +1,86 @@
+import threading
+from datetime import datetime, timedelta
+from time import sleep
+
+import click
+from flask import Flask
+
+from config import USE_ORM
+from models import SHOWS_TABLE
+from util import get_config
+from .common import print_exc_info
+from .invalidation import notify_write
+
+ORM = USE_ORM
+ENGINE = not ORM
+
+if ORM:
+    from .queries_orm import archive_shows_orm as archive_shows_impl
+else:
+    from .queries_engine import archive_shows_engine as archive_shows_impl
+
+__ARCHIVER__ = None
+__ARCHIVER_LOCK__ = threading.Lock()
+
+
+def archive_shows(days: int) -> int:
+    """
+    Move past shows to the shows archive, a batch at a time so the shows table is never locked for long
+    :param days: archive shows which started more than this number of days ago
+    :return: number of shows archived
+    """
+    before = datetime.today() - timedelta(days=days)
+    batch_size = get_config("SHOW_ARCHIVE_BATCH_SIZE")
+    total = 0
+    count = batch_size
+    while count == batch_size:
+        count = archive_shows_impl(before, batch_size)
+        total = total + count
+    if total > 0:
+        notify_write(SHOWS_TABLE)
+    return total
+
+
+def _archiver(app: Flask):
+    while True:
+        with app.app_context():
+            try:
+                count = archive_shows(get_config("SHOW_ARCHIVE_DAYS"))
+                if count > 0:
+                    app.logger.info(f'Archived {count} shows')
+            except:
+                print_exc_info()
+        sleep(get_config("SHOW_ARCHIVE_INTERVAL"))
+
+
+def start_archiver(app: Flask):
+    """
+    Start the background show archiver, if not already started
+    :param app: application
+    """
+    global __ARCHIVER__
+    with __ARCHIVER_LOCK__:
+        if __ARCHIVER__ is None:
+            __ARCHIVER__ = threading.Thread(target=_archiver, args=(app,), name='show-archiver', daemon=True)
+            __ARCHIVER__.start()
+
+
+def init_archiver(app: Flask):
+    """
+    Add the 'archive-shows' command, and if SHOW_ARCHIVE_DAYS is set, start the background show archiver when the
+    first request is received
+    :param app: application
+    """
+    @app.cli.command('archive-shows')
+    @click.option('--days', type=int, default=None,
+                  help='archive shows which started more than this number of days ago; default SHOW_ARCHIVE_DAYS')
+    def archive_shows_command(days):
+        """Move past shows to the shows archive."""
+        if days is None:
+            days = get_config("SHOW_ARCHIVE_DAYS")
+        if days is None:
+            raise click.UsageError('Specify --days or set SHOW_ARCHIVE_DAYS')
+        click.echo(f'Archived {archive_shows(days)} shows')
+
+    if get_config("SHOW_ARCHIVE_DAYS") is not None:
+        app.before_first_request(lambda: start_archiver(app))
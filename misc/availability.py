@@ -0,0 +1,107 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime, time
+from typing import Union
+
+from config import USE_ORM
+from models import ARTIST_TABLE, AVAILABILITY_TABLE
+from .cache import LRUCache
+from .invalidation import on_write
+
+ORM = USE_ORM
+ENGINE = not ORM
+
+if ORM:
+    from .queries_orm import get_availabilities_orm as get_availabilities_impl
+else:
+    from .queries_engine import get_availabilities_engine as get_availabilities_impl
+
+# availability time keys in day of the week order, monday first
+AVAILABILITY_TIME_KEYS = [f'{day}_{end}' for day in ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+                          for end in ['from', 'to']]
+# packed value for no time
+_NO_TIME_ = -1
+
+
+def _pack(value: Union[time, None]) -> int:
+    return _NO_TIME_ if value is None else value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _unpack(value: int) -> Union[time, None]:
+    return None if value == _NO_TIME_ else time(hour=value // 3600, minute=(value // 60) % 60, second=value % 60)
+
+
+class AvailabilityTimeline:
+    """
+    Class representing an artist's availability over time; a sequence of segments each starting at the from date of
+    an availability, with its weekly slots packed as seconds since midnight
+    :param artist_id:       id of artist
+    :param availabilities:  list of availability dicts ordered by from date and id
+    """
+    def __init__(self, artist_id: int, availabilities: list):
+        self.artist_id = artist_id
+        self.ids = array('l', [a["id"] for a in availabilities])
+        self.from_dates = [a["from_date"] for a in availabilities]
+        self.slots = array('l', [_pack(a[k]) for a in availabilities for k in AVAILABILITY_TIME_KEYS])
+
+    def at(self, when: datetime) -> Union[dict, None]:
+        """
+        Get the availability at a time, i.e. the latest availability starting before it
+        :param when:    time to get availability at
+        :return: availability dict or None if no availability
+        """
+        index = bisect_left(self.from_dates, when) - 1
+        if index < 0:
+            return None
+        offset = index * len(AVAILABILITY_TIME_KEYS)
+        availability = {
+            "id": self.ids[index],
+            "artist_id": self.artist_id,
+            "from_date": self.from_dates[index],
+        }
+        for position, key in enumerate(AVAILABILITY_TIME_KEYS):
+            availability[key] = _unpack(self.slots[offset + position])
+        return availability
+
+    def slot(self, when: datetime) -> tuple:
+        """
+        Get the availability slot on the day of a time
+        :param when:    time to get slot for
+        :return: tuple of from & to times, which are None if not available
+        """
+        index = bisect_left(self.from_dates, when) - 1
+        if index < 0:
+            return None, None
+        offset = index * len(AVAILABILITY_TIME_KEYS) + when.weekday() * 2
+        return _unpack(self.slots[offset]), _unpack(self.slots[offset + 1])
+
+
+__TIMELINES__ = LRUCache("AVAILABILITY_CACHE_SIZE", ttl="AVAILABILITY_CACHE_TTL")
+
+
+def availability_timeline(artist_id: int) -> AvailabilityTimeline:
+    """
+    Get an artist's availability timeline
+    :param artist_id:  id of artist
+    """
+    return __TIMELINES__.get(artist_id,
+                             lambda: AvailabilityTimeline(artist_id, get_availabilities_impl(artist_id)))
+
+
+def invalidate_availability(table: str, artist_id: int = None):
+    """
+    Invalidate the availability timeline for an artist, e.g. after its availability is written
+    :param table:     name of table written
+    :param artist_id: id of artist; None to invalidate all artists
+    """
+    __TIMELINES__.invalidate(artist_id)
+
+
+def availability_cache_stats() -> dict:
+    """
+    Get the availability timeline cache statistics
+    """
+    return __TIMELINES__.stats()
+
+
+on_write([ARTIST_TABLE, AVAILABILITY_TABLE], invalidate_availability)
@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Callable, Any, Union, Hashable
+
+from util import get_config
+
+
+class CachedValue:
+    """
+    Class representing a process-wide cached value, which is reloaded when it expires or is invalidated
+    :param loader:  function to load the value
+    :param ttl:     time to live in seconds, or name of the config option specifying it; 0 or None for no expiry
+    """
+    def __init__(self, loader: Callable[[], Any], ttl: Union[int, float, str, None] = None):
+        self.loader = loader
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.value = None
+        self.expires = None
+        self.loaded = False
+
+    def _ttl(self):
+        return get_config(self.ttl) if isinstance(self.ttl, str) else self.ttl
+
+    def get(self) -> Any:
+        """
+        Get the cached value, loading it if necessary
+        """
+        with self.lock:
+            if not self.loaded or (self.expires is not None and monotonic() >= self.expires):
+                # loader exceptions propagate and leave the cache empty
+                self.value = self.loader()
+                self.loaded = True
+                ttl = self._ttl()
+                self.expires = monotonic() + ttl if ttl else None
+            return self.value
+
+    def invalidate(self):
+        """
+        Discard the cached value, it will be reloaded on next access
+        """
+        with self.lock:
+            self.value = None
+            self.expires = None
+            self.loaded = False
+
+
+class LRUCache:
+    """
+    Class representing a process-wide cache of values by key, which discards the least recently used values when full.
+    Values are reloaded when they expire or are invalidated.
+    :param max_size: max number of values, or name of the config option specifying it
+    :param ttl:      time to live in seconds, or name of the config option specifying it; 0 or None for no expiry
+    """
+    def __init__(self, max_size: Union[int, str], ttl: Union[int, float, str, None] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.values = OrderedDict()     # key: (value, expires)
+        self.generation = 0             # incremented on invalidation, so values loaded concurrently aren't stored
+        self.hits = 0
+        self.misses = 0
+
+    def _config(self, setting):
+        return get_config(setting) if isinstance(setting, str) else setting
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Get a cached value, loading it if necessary
+        :param key:     key of value
+        :param loader:  function to load the value
+        """
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is not None and (entry[1] is None or monotonic() < entry[1]):
+                self.values.move_to_end(key)
+                self.hits = self.hits + 1
+                return entry[0]
+            self.misses = self.misses + 1
+            generation = self.generation
+
+        # load outside the lock so other keys aren't blocked; loader exceptions propagate and nothing is cached
+        value = loader()
+        ttl = self._config(self.ttl)
+        with self.lock:
+            if generation == self.generation:
+                self.values[key] = (value, monotonic() + ttl if ttl else None)
+                self.values.move_to_end(key)
+                while len(self.values) > self._config(self.max_size):
+                    self.values.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Hashable = None):
+        """
+        Discard a cached value, or all values
+        :param key: key of value to discard; None to discard all
+        """
+        with self.lock:
+            self.generation = self.generation + 1
+            if key is None:
+                self.values.clear()
+            else:
+                self.values.pop(key, None)
+
+    def stats(self) -> dict:
+        """
+        Get the cache statistics
+        """
+        with self.lock:
+            return {
+                "size": len(self.values),
+                "max_size": self._config(self.max_size),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
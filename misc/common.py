@@ -38,12 +38,10 @@ class SearchParams:
     :param state:           state
     :param genres:          list of genres
     :param simple_search_term:  search term for basic search
-    :param genre_aliases:   list of aliases for genre table
     """
     def __init__(self, entities: ListOfOrEntity, conjunction: Union[str, list] = None,
                  name: str = None, city: str = None, state: str = None, genres: list = None,
-                 simple_search_term: str = None,
-                 genre_aliases: list = None):
+                 simple_search_term: str = None):
         if not isinstance(entities, list):
             self.entities = [entities]
         else:
@@ -57,12 +55,24 @@ class SearchParams:
         self.search_terms = []
         self.clauses = []
         self.searching_on = {SP_NAME: False, SP_CITY: False, SP_STATE: False, SP_GENRES: False}
+        # relevance rank expressions of full text clauses, used to order results
+        self.ranks = []
+        # relevance scores of entities matched by in-process index clauses, keyed by id
+        self.scores = {}
 
         # following are specific to engine mode
-        # customisation of 'from' in basic query, used in engine mode
-        self.customisation = None
-        # alias name for genre table
-        self.genre_aliases = genre_aliases if genre_aliases is not None else []
+        # bound parameters for clauses
+        self.params = {}
+
+    def bind(self, value) -> str:
+        """
+        Add a bound parameter for use in engine mode clauses
+        :param value: parameter value
+        :return: parameter placeholder
+        """
+        name = f'sp{len(self.params)}'
+        self.params[name] = value
+        return f':{name}'
 
     def load_form(self, form: FlaskForm):
         data = load_form(form)
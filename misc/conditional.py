@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone
+from functools import wraps
+from http import HTTPStatus
+from time import time
+from typing import Callable, Union
+
+from flask import request, session, make_response, current_app
+
+from models import ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE, AVAILABILITY_TABLE
+from util import get_config
+from .invalidation import on_write
+
+# identifies this process, so tags issued by another process, or before a restart, don't match
+_PROCESS_TAG_ = os.urandom(8).hex()
+_STARTED_ = time()
+
+
+class WriteVersions:
+    """
+    Class tracking the last write of tables and entities, as notified by notify_write()
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.tables = {}        # table: (sequence, time) of last write
+        self.unknown = {}       # table: (sequence, time) of last write of an unknown entity
+        self.entities = {}      # (table, id): (sequence, time) of last write
+
+    def written(self, table: str, entity_id: int = None):
+        """
+        Record a write
+        :param table:     name of table written
+        :param entity_id: id of entity written, or None if unknown
+        """
+        with self.lock:
+            self.sequence = self.sequence + 1
+            stamp = (self.sequence, time())
+            self.tables[table] = stamp
+            if entity_id is None:
+                self.unknown[table] = stamp
+            else:
+                self.entities[(table, entity_id)] = stamp
+
+    def stamps(self, tables: list, entity: tuple = None) -> list:
+        """
+        Get the last write stamps of tables and an entity
+        :param tables: names of tables
+        :param entity: tuple of (table, id) of entity
+        :return: list of (sequence, time) stamps, (0, 0) for tables or entity not written
+        """
+        unwritten = (0, 0)
+        with self.lock:
+            stamps = [self.tables.get(table, unwritten) for table in tables]
+            if entity is not None:
+                stamps.append(self.unknown.get(entity[0], unwritten))
+                stamps.append(self.entities.get(entity, unwritten))
+        return stamps
+
+
+__VERSIONS__ = WriteVersions()
+
+
+def _page_tag(stamps: list, period: int) -> str:
+    """
+    Generate the tag of a page
+    :param stamps: write stamps of the data displayed
+    :param period: index of the current HTTP_CACHE_PERIOD
+    """
+    # pages embed a csrf token tied to the session
+    csrf_token = session.get(current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token"), '')
+    key = f'{_PROCESS_TAG_}:{period}:{",".join(str(s[0]) for s in stamps)}:{csrf_token}'
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def conditional_get(tables: Union[str, list], entity: tuple = None):
+    """
+    Decorator for views which answer conditional GETs, using the writes to the data they display.
+    Responses get ETag & Last-Modified headers, and a request whose If-None-Match, or If-Modified-Since, matches the
+    current data gets a '304 Not Modified' response without calling the view.
+    :param tables: name(s) of table(s) whose writes affect the page
+    :param entity: tuple of (table, view argument name) identifying an entity whose writes affect the page
+    """
+    if not isinstance(tables, list):
+        tables = [tables]
+
+    def decorator(view: Callable):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # pages with flashed messages are displayed once
+            if not get_config("HTTP_CACHE") or request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            # stamps are taken before the view queries the data, so a concurrent write changes the next tag
+            stamps = __VERSIONS__.stamps(
+                tables, entity=(entity[0], kwargs.get(entity[1])) if entity is not None else None)
+            period_secs = get_config("HTTP_CACHE_PERIOD")
+            period = int(time() // period_secs) if period_secs else 0
+            last_modified = int(max([s[1] for s in stamps] +
+                                    [_STARTED_, period * period_secs if period_secs else 0]))
+
+            tag = _page_tag(stamps, period)
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(tag)
+            elif request.if_modified_since is not None:
+                not_modified = request.if_modified_since.replace(tzinfo=timezone.utc).timestamp() >= last_modified
+            else:
+                not_modified = False
+
+            if not_modified:
+                response = make_response('', HTTPStatus.NOT_MODIFIED.value)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != HTTPStatus.OK.value:
+                    return response
+                # rendering may have created the session csrf token
+                tag = _page_tag(stamps, period)
+
+            response.set_etag(tag, weak=True)
+            response.last_modified = datetime.fromtimestamp(last_modified, timezone.utc)
+            # pages include the session's csrf token, so may only be stored by the browser
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def write_versions_stats() -> dict:
+    """
+    Get the write version statistics
+    """
+    with __VERSIONS__.lock:
+        return {
+            "sequence": __VERSIONS__.sequence,
+            "tables": {table: stamp[0] for table, stamp in __VERSIONS__.tables.items()},
+            "entities": len(__VERSIONS__.entities),
+        }
+
+
+def _record_write(table: str, entity_id: int = None):
+    __VERSIONS__.written(table, entity_id)
+
+
+on_write([ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE, AVAILABILITY_TABLE], _record_write)
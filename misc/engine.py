@@ -1,17 +1,23 @@
 import contextlib
+from functools import lru_cache
 from http import HTTPStatus
+from typing import Union
 
-from flask import abort
+from flask import abort, g, has_app_context
 from sqlalchemy import create_engine
-from sqlalchemy.sql.expression import text
+from sqlalchemy.sql.expression import text, TextClause
 
-from config import SQLALCHEMY_DATABASE_URI
+from config import SQLALCHEMY_DATABASE_URI, STATEMENT_CACHE_SIZE
 from util.app_cfg import get_config
 from .common import print_exc_info
+from .pool import engine_options
 
 engine = None
 ENGINE = False
 
+# name of request context attribute holding the request's connection
+_REQUEST_CONNECTION_ = '_engine_connection'
+
 
 def setup():
     """
@@ -20,7 +26,7 @@ def setup():
     global engine, ENGINE
     ENGINE = get_config("USE_ENGINE")
     if ENGINE:
-        engine = create_engine(SQLALCHEMY_DATABASE_URI)
+        engine = create_engine(SQLALCHEMY_DATABASE_URI, **engine_options())
 
 
 def config_check():
@@ -31,22 +37,69 @@ def config_check():
         raise EnvironmentError('Application not configured for Engine')
 
 
-def stmt_text(stmt):
-    stmttext = text(stmt)
+def connect():
+    """
+    Get a database connection.
+    Within a request the same connection is used for all statements, and is released at the end of the request
+    """
+    if has_app_context():
+        connection = g.get(_REQUEST_CONNECTION_, None)
+        if connection is None or connection.closed:
+            connection = engine.connect()
+            setattr(g, _REQUEST_CONNECTION_, connection)
+        context = contextlib.nullcontext(connection)
+    else:
+        context = engine.connect()
+    return context
+
+
+def release_connection(exception=None):
+    """
+    Release the request's connection back to the pool
+    :param exception: exception which ended the request, if any
+    """
+    connection = g.pop(_REQUEST_CONNECTION_, None)
+    if connection is not None:
+        connection.close()
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def compiled_text(stmt: str) -> TextClause:
+    """
+    Get the textual SQL construct for a statement.
+    Constructs are cached by statement text, so statements using bound parameters are only parsed once
+    :param stmt:   SQL statement
+    """
+    return text(stmt)
+
+
+def stmt_text(stmt: str, params: dict = None):
+    stmttext = compiled_text(stmt)
     if get_config("PRINT_SQL"):
         print(f' SQL> {stmttext}')
+        if params:
+            print(f' SQL> {params}')
     return stmttext
 
 
-def execute(stmt: str):
+def stmt_and_params(stmt: Union[str, tuple]) -> tuple:
+    """
+    Split a statement into SQL and bound parameters
+    :param stmt:   SQL statement, or tuple of SQL statement and dict of bound parameters
+    """
+    return stmt if isinstance(stmt, tuple) else (stmt, None)
+
+
+def execute(stmt: str, params: dict = None):
     """
     Execute an SQL statement 
     :param stmt:   SQL statement
+    :param params: bound parameters for statement
     """
     config_check()
     try:
-        with engine.connect() as connection:
-            result = connection.execute(stmt_text(stmt))
+        with connect() as connection:
+            result = connection.execute(stmt_text(stmt, params), params or {})
     except:
         print_exc_info()
         abort(HTTPStatus.SERVICE_UNAVAILABLE.value)
@@ -54,6 +107,27 @@ def execute(stmt: str):
     return result
 
 
+def stream(stmt: str, params: dict = None, batch_size: int = 1000):
+    """
+    Execute an SQL query using a server-side cursor, so results are fetched in batches rather than all at once
+    :param stmt:       SQL statement
+    :param params:     bound parameters for statement
+    :param batch_size: number of rows to fetch at a time
+    :return: iterator of result rows
+    """
+    config_check()
+    with connect() as connection:
+        try:
+            result = connection.execution_options(stream_results=True, max_row_buffer=batch_size) \
+                .execute(stmt_text(stmt, params), params or {})
+        except:
+            print_exc_info()
+            abort(HTTPStatus.SERVICE_UNAVAILABLE.value)
+
+        for batch in result.partitions(batch_size):
+            yield from batch
+
+
 @contextlib.contextmanager
 def transaction(connection):
     """
@@ -69,15 +143,17 @@ def transaction(connection):
 def execute_transaction(stmts: list):
     """
     Execute a transaction
-    :param stmts:  list if SQL statements which form transaction
+    :param stmts:  list of SQL statements which form transaction, each entry is either an SQL statement or a
+                   tuple of SQL statement and dict of bound parameters
     """
     config_check()
     results = []
     try:
-        with engine.connect() as connection:
+        with connect() as connection:
             with transaction(connection):  # open a transaction
                 for stmt in stmts:
-                    results.append(connection.execute(stmt_text(stmt)))
+                    sql, params = stmt_and_params(stmt)
+                    results.append(connection.execute(stmt_text(sql, params), params or {}))
     except:
         print_exc_info()
         abort(HTTPStatus.SERVICE_UNAVAILABLE.value)
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+from datetime import date, time
+from http import HTTPStatus
+from itertools import chain
+from typing import Iterator, Iterable
+
+from flask import Response, abort, request, stream_with_context
+from werkzeug.exceptions import HTTPException
+
+from .common import print_exc_info
+from util import get_config
+
+CSV_EXPORT = 'csv'
+JSON_EXPORT = 'json'
+EXPORT_MIMETYPES = {
+    CSV_EXPORT: 'text/csv',
+    JSON_EXPORT: 'application/json',
+}
+
+
+def export_format() -> str:
+    """
+    Get the export format requested by the 'format' query parameter; one of 'csv' or 'json'
+    """
+    fmt = request.args.get('format', CSV_EXPORT)
+    if fmt not in EXPORT_MIMETYPES:
+        abort(HTTPStatus.BAD_REQUEST.value)
+    return fmt
+
+
+def _csv_value(value):
+    if value is None:
+        value = ''
+    elif isinstance(value, list):
+        value = ','.join(value)
+    elif isinstance(value, (date, time)):
+        value = value.isoformat()
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def csv_chunks(keys: list, rows: Iterable, batch_size: int) -> Iterator[str]:
+    """
+    Generate CSV text for rows, a batch of rows at a time
+    :param keys:       column names, in the order of the row values
+    :param rows:       rows to output
+    :param batch_size: number of rows per chunk
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        count = count + 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def json_chunks(keys: list, rows: Iterable, batch_size: int) -> Iterator[str]:
+    """
+    Generate a JSON array of objects for rows, a batch of rows at a time
+    :param keys:       object keys, in the order of the row values
+    :param rows:       rows to output
+    :param batch_size: number of rows per chunk
+    """
+    chunk = ['[']
+    separator = ''
+    for row in rows:
+        chunk.append(separator)
+        chunk.append(json.dumps(dict(zip(keys, row)), default=_json_default))
+        separator = ','
+        if len(chunk) > batch_size * 2:
+            yield ''.join(chunk)
+            chunk = []
+    chunk.append(']')
+    yield ''.join(chunk)
+
+
+def export_response(keys: list, rows: Iterator, fmt: str, filename: str) -> Response:
+    """
+    Generate a response streaming rows as they are read from the database
+    :param keys:     column names, in the order of the row values
+    :param rows:     iterator of rows, which is consumed as the response is sent
+    :param fmt:      export format; one of 'csv' or 'json'
+    :param filename: download filename, without extension
+    """
+    # start the query before responding, so errors still result in an error response
+    first = None
+    try:
+        first = next(rows, None)
+    except HTTPException:
+        raise
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+    rows = chain([first], rows) if first is not None else iter([])
+
+    batch_size = get_config("EXPORT_BATCH_SIZE")
+    chunks = csv_chunks(keys, rows, batch_size) if fmt == CSV_EXPORT else json_chunks(keys, rows, batch_size)
+    return Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'})
@@ -0,0 +1,214 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Union
+
+from flask import Flask, render_template, current_app, has_app_context
+from markupsafe import Markup
+
+from models import ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE
+from util import get_config
+from .invalidation import on_write
+
+try:
+    import redis
+    _BACKEND_ERROR_ = redis.RedisError
+except ImportError:     # the shared backend is optional
+    redis = None
+    _BACKEND_ERROR_ = ConnectionError
+
+_LOGGER_ = logging.getLogger(__name__)
+
+# prefix of shared backend keys
+_KEY_PREFIX_ = 'fyyur:fragment'
+
+
+class FragmentCache:
+    """
+    Class representing a process-wide cache of rendered template fragments, by the entity they display.
+    Each entity's fragment is stored with its version, i.e. the data it was rendered from, and is re-rendered if the
+    version doesn't match, so fragments are never stale. The least recently used fragments are discarded when the size
+    of the fragments exceeds the memory budget.
+    :param max_bytes: memory budget in bytes, or name of the config option specifying it
+    """
+    def __init__(self, max_bytes: Union[int, str]):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.fragments = OrderedDict()  # (table, id, template): (version, html)
+        self.size = 0                   # total length of html
+        self.templates = {}             # table: set of templates of table's fragments
+        self.shared = None              # shared backend client
+        self.hits = 0
+        self.misses = 0
+
+    def _max_bytes(self):
+        return get_config(self.max_bytes) if isinstance(self.max_bytes, str) else self.max_bytes
+
+    def _pop(self, key: tuple):
+        entry = self.fragments.pop(key, None)
+        if entry is not None:
+            self.size = self.size - len(entry[1])
+
+    def _get_local(self, key: tuple, version: str) -> Union[str, None]:
+        with self.lock:
+            entry = self.fragments.get(key)
+            if entry is not None and entry[0] == version:
+                self.fragments.move_to_end(key)
+                return entry[1]
+        return None
+
+    def _put_local(self, key: tuple, version: str, html: str):
+        max_bytes = self._max_bytes()
+        with self.lock:
+            self._pop(key)
+            if len(html) > max_bytes:
+                return
+            self.fragments[key] = (version, html)
+            self.size = self.size + len(html)
+            while self.size > max_bytes:
+                self._pop(next(iter(self.fragments)))
+
+    def get(self, template: str, table: str, entity_id: int, **context) -> Markup:
+        """
+        Get a rendered fragment, rendering it if necessary
+        :param template:  name of fragment template
+        :param table:     name of table of the entity displayed
+        :param entity_id: id of the entity displayed
+        :param context:   variables to render the template with; all the data displayed, as they are its version
+        """
+        if not self._max_bytes():
+            return Markup(render_template(template, **context))
+
+        key = (table, entity_id, template)
+        version = repr(sorted(context.items()))
+        html = self._get_local(key, version)
+        if html is None and self.shared is not None:
+            html = self._get_shared(key, version)
+            if html is not None:
+                self._put_local(key, version, html)
+
+        hit = html is not None
+        if not hit:
+            html = render_template(template, **context)
+            self._put_local(key, version, html)
+            if self.shared is not None:
+                self._put_shared(key, version, html)
+
+        with self.lock:
+            if hit:
+                self.hits = self.hits + 1
+            else:
+                self.misses = self.misses + 1
+                self.templates.setdefault(table, set()).add(template)
+        return Markup(html)
+
+    def invalidate(self, table: str, entity_id: int):
+        """
+        Discard the fragments of an entity
+        :param table:     name of table of entity
+        :param entity_id: id of entity
+        """
+        with self.lock:
+            keys = [(table, entity_id, template) for template in self.templates.get(table, set())]
+            for key in keys:
+                self._pop(key)
+
+        if self.shared is not None and len(keys) > 0:
+            try:
+                self.shared.delete(*[_shared_key(key) for key in keys])
+            except _BACKEND_ERROR_ as e:
+                _logger().warning(f'Fragment cache backend delete failed: {e}')
+
+    def _get_shared(self, key: tuple, version: str) -> Union[str, None]:
+        try:
+            value = self.shared.get(_shared_key(key))
+        except _BACKEND_ERROR_ as e:
+            _logger().warning(f'Fragment cache backend get failed: {e}')
+            return None
+        if value is None:
+            return None
+        shared_version, html = json.loads(value)
+        return html if shared_version == version else None
+
+    def _put_shared(self, key: tuple, version: str, html: str):
+        try:
+            self.shared.set(_shared_key(key), json.dumps([version, html]), ex=get_config("FRAGMENT_CACHE_TTL") or None)
+        except _BACKEND_ERROR_ as e:
+            _logger().warning(f'Fragment cache backend set failed: {e}')
+
+    def stats(self) -> dict:
+        """
+        Get the cache statistics
+        """
+        with self.lock:
+            return {
+                "size": len(self.fragments),
+                "bytes": self.size,
+                "max_bytes": self._max_bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared is not None,
+            }
+
+
+def _shared_key(key: tuple) -> str:
+    table, entity_id, template = key
+    return f'{_KEY_PREFIX_}:{table}:{entity_id}:{template}'
+
+
+def _logger():
+    return current_app.logger if has_app_context() else _LOGGER_
+
+
+__FRAGMENTS__ = FragmentCache("FRAGMENT_CACHE_MAX_BYTES")
+
+
+def cached_fragment(template: str, table: str, entity_id: int, **context) -> Markup:
+    """
+    Get a rendered fragment, rendering it if necessary; available in templates as 'cached_fragment'
+    :param template:  name of fragment template
+    :param table:     name of table of the entity displayed
+    :param entity_id: id of the entity displayed
+    :param context:   variables to render the template with
+    """
+    return __FRAGMENTS__.get(template, table, entity_id, **context)
+
+
+def invalidate_fragments(table: str, entity_id: int = None):
+    """
+    Invalidate the fragments of an entity after it is written
+    :param table:     name of table written
+    :param entity_id: id of entity written; if None, the entity's fragments are replaced when their version changes
+    """
+    if entity_id is not None:
+        __FRAGMENTS__.invalidate(table, entity_id)
+
+
+def fragment_cache_stats() -> dict:
+    """
+    Get the fragment cache statistics
+    """
+    return __FRAGMENTS__.stats()
+
+
+def init_fragment_cache(app: Flask, shared: Any = None):
+    """
+    Initialise the fragment cache
+    :param app:    application
+    :param shared: shared backend client, with the redis get/set/delete interface; default is a redis client for
+                   FRAGMENT_CACHE_REDIS_URL if set
+    """
+    url = app.config.get("FRAGMENT_CACHE_REDIS_URL")
+    if shared is None and url:
+        if redis is None:
+            app.logger.warning('FRAGMENT_CACHE_REDIS_URL is set but redis is not installed, fragments are only '
+                               'cached in-process')
+        else:
+            shared = redis.Redis.from_url(url)
+    __FRAGMENTS__.shared = shared
+    app.jinja_env.globals.update(cached_fragment=cached_fragment,
+                                 ARTIST_TABLE=ARTIST_TABLE, VENUE_TABLE=VENUE_TABLE, SHOWS_TABLE=SHOWS_TABLE)
+
+
+on_write([ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE], invalidate_fragments)
@@ -0,0 +1,62 @@
+from time import monotonic
+
+from config import USE_ORM
+from util import get_config
+from .cache import CachedValue
+
+ORM = USE_ORM
+ENGINE = not ORM
+
+if ORM:
+    from .queries_orm import get_genres_orm as get_genres_impl
+else:
+    from .queries_engine import get_genres_engine as get_genres_impl
+
+# genre which is always listed last in the options
+OTHER_GENRE = 'Other'
+
+
+class GenreCatalogue:
+    """
+    Class representing the genres in the database
+    :param genres: list of (id, name) of genres, ordered by name
+    """
+    def __init__(self, genres: list):
+        self.ids = {g[1]: g[0] for g in genres}
+        self.options = [(g[1], g[1]) for g in genres if g[1] != OTHER_GENRE]
+        self.options.append((OTHER_GENRE, OTHER_GENRE))
+        self.values = [g[0] for g in self.options]
+        self.loaded = monotonic()
+
+
+__GENRES__ = CachedValue(lambda: GenreCatalogue(get_genres_impl()), ttl="GENRE_CACHE_TTL")
+
+
+def genre_catalogue() -> GenreCatalogue:
+    """
+    Get the genre catalogue
+    """
+    return __GENRES__.get()
+
+
+def genre_ids(names: list) -> dict:
+    """
+    Get the ids of the specified genres
+    :param names:   genre names
+    :return: dict of name to id for genres which exist
+    """
+    catalogue = genre_catalogue()
+    if any(name not in catalogue.ids for name in names) and \
+            monotonic() - catalogue.loaded >= get_config("GENRE_RELOAD_INTERVAL"):
+        # may have been added since catalogue was loaded, so reload once; at most every GENRE_RELOAD_INTERVAL seconds,
+        # as names come from requests, e.g. export criteria, so may never exist
+        invalidate_genres()
+        catalogue = genre_catalogue()
+    return {name: catalogue.ids[name] for name in names if name in catalogue.ids}
+
+
+def invalidate_genres():
+    """
+    Invalidate the genre catalogue, e.g. after genres are added
+    """
+    __GENRES__.invalidate()
@@ -0,0 +1,40 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Any
+
+
+class IntervalIndex:
+    """
+    Class representing a set of time intervals, ordered by start, supporting overlap queries
+    """
+    def __init__(self):
+        self.max_length = timedelta(0)  # length of longest interval; bounds how far back overlap queries look
+        self.starts = []
+        self.entries = []   # list of (start, end, item) in the same order as starts
+
+    def add(self, start: datetime, end: datetime, item: Any = None):
+        """
+        Add an interval
+        :param start: start of interval
+        :param end:   end of interval
+        :param item:  item associated with interval
+        """
+        self.max_length = max(self.max_length, end - start)
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.entries.insert(index, (start, end, item))
+
+    def overlapping(self, start: datetime, end: datetime) -> list:
+        """
+        Get the intervals which overlap an interval; intervals which only touch are not overlapping
+        :param start: start of interval
+        :param end:   end of interval
+        :return: list of (start, end, item) ordered by start
+        """
+        # only intervals starting in (start - max_length, end) can overlap
+        lo = bisect_right(self.starts, start - self.max_length)
+        hi = bisect_left(self.starts, end)
+        return [entry for entry in self.entries[lo:hi] if entry[1] > start]
+
+    def __len__(self):
+        return len(self.starts)
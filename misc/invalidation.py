@@ -0,0 +1,31 @@
+import threading
+from typing import Callable, Union
+
+# listeners to notify of writes, keyed by table name
+__LISTENERS__ = {}
+__LISTENERS_LOCK__ = threading.Lock()
+
+
+def on_write(tables: Union[str, list], listener: Callable[[str, Union[int, None]], None]):
+    """
+    Register a listener to be notified of writes to tables
+    :param tables:   name(s) of table(s) to listen to
+    :param listener: function called with the table name and id of the entity written, or None if unknown
+    """
+    if not isinstance(tables, list):
+        tables = [tables]
+    with __LISTENERS_LOCK__:
+        for table in tables:
+            __LISTENERS__.setdefault(table, []).append(listener)
+
+
+def notify_write(table: str, entity_id: int = None):
+    """
+    Notify listeners of a successful write (create, update or delete) to a table
+    :param table:     name of table written to
+    :param entity_id: id of entity written, or None if unknown
+    """
+    with __LISTENERS_LOCK__:
+        listeners = list(__LISTENERS__.get(table, []))
+    for listener in listeners:
+        listener(table, entity_id)
@@ -4,8 +4,11 @@ from typing import Union
 from flask_sqlalchemy import Model
 from werkzeug.exceptions import abort
 
+from .cache import CachedValue
 from .common import print_exc_info
+from .invalidation import on_write
 from config import USE_ORM
+from models import ARTIST_TABLE, VENUE_TABLE
 
 ORM = USE_ORM
 ENGINE = not ORM
@@ -13,11 +16,13 @@ ENGINE = not ORM
 if ORM:
     from .misc_orm import (
         genre_list_orm as genre_list,
+        latest_lists_orm as latest_lists_impl,
     )
 
 else:
     from .misc_engine import (
         genre_list_engine as genre_list,
+        latest_lists_engine as latest_lists_impl,
     )
 
 
@@ -49,6 +54,25 @@ def get_genre_list(names: list) -> Union[Model, list[str]]:
     return genres
 
 
+def _load_latest_lists() -> (list, list):
+    latest_artists, latest_venues = latest_lists_impl()
+    return [{'id': a.id, 'name': a.name} for a in latest_artists], \
+           [{'id': v.id, 'name': v.name} for v in latest_venues]
+
+
+__LATEST_LISTS__ = CachedValue(_load_latest_lists, ttl="LATEST_CACHE_TTL")
+
+on_write([ARTIST_TABLE, VENUE_TABLE], lambda table, entity_id: __LATEST_LISTS__.invalidate())
+
+
+def get_latest_lists() -> (list, list):
+    """
+    Get the latest artists and venues
+    :return: tuple of lists of {'id': ?, 'name': ?} for artists and venues
+    """
+    return __LATEST_LISTS__.get()
+
+
 def str_or_none(value: str):
     """
     Return trimmed non-whitespace string or None
@@ -1,12 +1,13 @@
 from http import HTTPStatus
-from typing import Callable, Union, Any, List, AnyStr
+from typing import Union, AnyStr
 
 from flask import abort
 from werkzeug.datastructures import MultiDict
 
 from .engine import execute, execute_transaction
 from .common import EntityResult, print_exc_info
-from models import SHOWS_TABLE, GENRES_TABLE, ARTIST_TABLE, VENUE_TABLE, Entity
+from .genres import genre_ids
+from models import GENRES_TABLE, ARTIST_TABLE, VENUE_TABLE, Entity
 from util import get_config
 
 
@@ -28,10 +29,10 @@ def get_music_entity_engine(entity_id: int, entity: Entity,
         instance = execute(f'SELECT *, ARRAY('
                            f'SELECT g.name FROM "{entity.eng_genre_link_table}" gl '
                            f'JOIN "{GENRES_TABLE}" g ON (gl.genre_id = g.id) '
-                           f'WHERE gl.{entity.eng_genre_link_column} = {entity_id}) as genres'
+                           f'WHERE gl.{entity.eng_genre_link_column} = :entity_id) as genres'
                            f' from "{entity.eng_table}" '
-                           f'WHERE {entity.fq_column("id")} = {entity_id};'
-                           )
+                           f'WHERE {entity.fq_column("id")} = :entity_id;',
+                           {"entity_id": entity_id})
         if instance.rowcount != 0:
             exists = True
 
@@ -50,21 +51,6 @@ def get_music_entity_engine(entity_id: int, entity: Entity,
     return data
 
 
-def get_show_summary_engine(entity_id: int, shows_by: Callable[[int, Any], List]) -> tuple:
-    """
-    Get the show summary for the given entity_id
-    :param entity_id:        id of entity
-    :param shows_by:         function taking of type 'shows_by(entity_id, criterion) -> list'
-    """
-    past_criterion = f'"{SHOWS_TABLE}".start_time < CURRENT_TIMESTAMP'
-    future_criterion = f'"{SHOWS_TABLE}".start_time >= CURRENT_TIMESTAMP'
-
-    past_shows = shows_by(entity_id, past_criterion)
-    upcoming_shows = shows_by(entity_id, future_criterion)
-
-    return past_shows, upcoming_shows
-
-
 def genre_changes_engine(base: list, update: list, entity_id: int, entity: Entity) -> list:
     """
     Get the list of SQL statements to update genre setting from 'base' to 'update'
@@ -83,15 +69,17 @@ def genre_changes_engine(base: list, update: list, entity_id: int, entity: Entit
     # to add
     for g in update:
         if g not in base:
-            stmts.append(
-                f'INSERT INTO "{table}"({column}, genre_id) VALUES ({entity_id}, {genre_id(g)});'
-            )
+            stmts.append((
+                f'INSERT INTO "{table}"({column}, genre_id) VALUES (:entity_id, :genre_id);',
+                {"entity_id": entity_id, "genre_id": genre_id(g)}
+            ))
     # to remove
     for g in base:
         if g not in update:
-            stmts.append(
-                f'DELETE FROM "{table}" WHERE {column}={entity_id} AND genre_id={genre_id(g)};'
-            )
+            stmts.append((
+                f'DELETE FROM "{table}" WHERE {column} = :entity_id AND genre_id = :genre_id;',
+                {"entity_id": entity_id, "genre_id": genre_id(g)}
+            ))
 
     return stmts
 
@@ -123,7 +111,7 @@ def exists_engine(entity: AnyStr, entity_id: int):
     """
     exists = False
     try:
-        venue = execute(f'SELECT name from "{entity}" WHERE id = {entity_id};')
+        venue = execute(f'SELECT name from "{entity}" WHERE id = :entity_id;', {"entity_id": entity_id})
         exists = (venue.rowcount != 0)
     except:
         print_exc_info()
@@ -146,16 +134,8 @@ def genre_objs_engine(names: list):
     Get the genres corresponding to the specified list
     :param names:   Genre names
     """
-    in_list = ["'" + g + "'" for g in names]
-    in_list = ", ".join(in_list)
-
-    # genres is list of names
-    genres = execute(f'SELECT * FROM "{GENRES_TABLE}" WHERE "{GENRES_TABLE}".name IN ({in_list});')
-    keys = [k for k in genres.keys()]
-    results = [g for g in genres]
-    genre_objs = [{k: g[k] for k in keys} for g in results]
-
-    return genre_objs
+    # genres is list of names, ids come from the genre catalogue
+    return [{"id": genre_id, "name": name} for name, genre_id in genre_ids(names).items()]
 
 
 def latest_lists_engine() -> (list, list):
@@ -163,8 +143,10 @@ def latest_lists_engine() -> (list, list):
     latest_artists = []
     latest_venues = []
     try:
-        latest_artists = execute(f'SELECT id, name FROM "{ARTIST_TABLE}" ORDER BY id DESC LIMIT {num_latest};')
-        latest_venues = execute(f'SELECT id, name FROM "{VENUE_TABLE}" ORDER BY id DESC LIMIT {num_latest};')
+        latest_artists = execute(f'SELECT id, name FROM "{ARTIST_TABLE}" ORDER BY id DESC LIMIT :num_latest;',
+                                 {"num_latest": num_latest}).fetchall()
+        latest_venues = execute(f'SELECT id, name FROM "{VENUE_TABLE}" ORDER BY id DESC LIMIT :num_latest;',
+                                {"num_latest": num_latest}).fetchall()
     except:
         print_exc_info()
         abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
@@ -1,13 +1,13 @@
-from datetime import datetime
 from http import HTTPStatus
-from typing import Callable, Any, List
 
 from flask import abort
 from flask_sqlalchemy import Model
+from sqlalchemy.orm import make_transient_to_detached, selectinload
 from werkzeug.datastructures import MultiDict
 
-from models import Show, Genre, Artist, Venue, Entity
+from models import SQLAlchemyDB as db, Genre, Artist, Venue, Entity
 from .common import EntityResult, print_exc_info
+from .genres import genre_ids
 from util import get_config
 
 
@@ -28,7 +28,8 @@ def get_music_entity_orm(entity_id: int, entity: Entity,
         data = None
     try:
         model_class = entity.orm_model
-        instance = model_class.query.filter(model_class.id == entity_id).first()
+        instance = model_class.query.options(selectinload(model_class.genres)) \
+            .filter(model_class.id == entity_id).first()
         if instance is not None:
             exists = True
             if result_type == EntityResult.DICT:
@@ -47,21 +48,6 @@ def get_music_entity_orm(entity_id: int, entity: Entity,
     return data
 
 
-def get_show_summary_orm(entity_id: int, shows_by: Callable[[int, Any], List]) -> tuple:
-    """
-    Get the show summary for the given entity_id
-    :param entity_id:        id of entity
-    :param shows_by:         function taking of type 'shows_by(entity_id, criterion) -> list'
-    """
-    past_criterion = Show.start_time < datetime.now()
-    future_criterion = Show.start_time >= datetime.now()
-
-    past_shows = shows_by(entity_id, past_criterion)
-    upcoming_shows = shows_by(entity_id, future_criterion)
-
-    return past_shows, upcoming_shows
-
-
 def exists_orm(entity: Model, entity_id: int):
     """
     Check if entity exists
@@ -88,7 +74,13 @@ def genre_list_orm(names: list):
     Get the genres corresponding to the specified list
     :param names:   Genre names
     """
-    return Genre.query.filter(Genre.name.in_(names)).all()
+    genres = []
+    for name, genre_id in genre_ids(names).items():
+        # ids come from the genre catalogue, so add to session as persistent without loading from the database
+        genre = Genre(id=genre_id, name=name)
+        make_transient_to_detached(genre)
+        genres.append(db.session.merge(genre, load=False))
+    return genres
 
 
 def latest_lists_orm() -> (list, list):
@@ -99,11 +91,13 @@ def latest_lists_orm() -> (list, list):
         latest_artists = Artist.query \
             .with_entities(Artist.id, Artist.name) \
             .order_by(Artist.id.desc()) \
-            .limit(num_latest)
+            .limit(num_latest) \
+            .all()
         latest_venues = Venue.query \
             .with_entities(Venue.id, Venue.name) \
             .order_by(Venue.id.desc()) \
-            .limit(num_latest)
+            .limit(num_latest) \
+            .all()
     except:
         print_exc_info()
         abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
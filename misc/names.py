@@ -0,0 +1,108 @@
+from bisect import bisect_left
+from heapq import nsmallest
+
+from config import USE_ORM
+from models import ARTIST_TABLE, VENUE_TABLE, get_entity
+from .cache import CachedValue
+from .invalidation import on_write
+from util import get_config
+
+ORM = USE_ORM
+ENGINE = not ORM
+
+if ORM:
+    from .queries_orm import get_names_orm as get_names_impl
+else:
+    from .queries_engine import get_names_engine as get_names_impl
+
+
+def _normalise(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+
+def _by_name(matches, limit: int) -> list:
+    return nsmallest(limit, matches, key=lambda r: (r[1].lower(), r[0]))
+
+
+class NameIndex:
+    """
+    Class representing a prefix index of names; a name matches a prefix of any of its words onwards,
+    e.g. 'The Musical Hop' matches 'the mu', 'musical' and 'hop'
+    :param names:      list of (id, name)
+    :param top_limit:  number of matches to precompute for short prefixes
+    :param top_length: max length of prefixes whose matches are precomputed
+    """
+    def __init__(self, names: list, top_limit: int = 0, top_length: int = 0):
+        entries = []
+        for entity_id, name in names:
+            words = _normalise(name).split(' ')
+            for index in range(len(words)):
+                entries.append((' '.join(words[index:]), entity_id, name))
+        entries.sort()
+        self.keys = [e[0] for e in entries]
+        self.names = [(e[1], e[2]) for e in entries]
+
+        # short prefixes match a large part of the index, so their first matches by name are found up front,
+        # rather than scanning all their matches on each search
+        self.top_limit = top_limit
+        self.top_length = top_length if top_limit > 0 else 0
+        self.top = {}
+        for length in range(1, self.top_length + 1):
+            matches = {}
+            for key, (entity_id, name) in zip(self.keys, self.names):
+                if len(key) >= length:
+                    matches.setdefault(key[:length], {}).setdefault(entity_id, name)
+            self.top.update({prefix: _by_name(m.items(), top_limit) for prefix, m in matches.items()})
+
+    def search(self, prefix: str, limit: int) -> list:
+        """
+        Search for names matching a prefix
+        :param prefix: prefix to match
+        :param limit:  max number of results
+        :return: list of (id, name) ordered by name
+        """
+        prefix = _normalise(prefix)
+        if 0 < len(prefix) <= self.top_length and limit <= self.top_limit:
+            return self.top.get(prefix, [])[:limit]
+
+        results = {}
+        if len(prefix) > 0:
+            index = bisect_left(self.keys, prefix)
+            while index < len(self.keys) and self.keys[index].startswith(prefix):
+                entity_id, name = self.names[index]
+                results.setdefault(entity_id, name)
+                index = index + 1
+        # all matches are ordered by name before limiting, as entries are ordered by the matched word
+        return _by_name(results.items(), limit)
+
+
+__NAME_INDICES__ = {
+    table: CachedValue(lambda entity=get_entity(table): NameIndex(get_names_impl(entity),
+                                                                  top_limit=get_config("NAME_SEARCH_LIMIT"),
+                                                                  top_length=get_config("NAME_INDEX_PREFIX_LENGTH")),
+                       ttl="NAME_INDEX_CACHE_TTL")
+    for table in [ARTIST_TABLE, VENUE_TABLE]
+}
+
+
+def search_names(table: str, prefix: str, limit: int) -> list:
+    """
+    Search for artist or venue names matching a prefix
+    :param table:  name of entity table
+    :param prefix: prefix to match
+    :param limit:  max number of results
+    :return: list of (id, name) ordered by name
+    """
+    return __NAME_INDICES__[table].get().search(prefix, limit)
+
+
+def invalidate_names(table: str, entity_id: int = None):
+    """
+    Invalidate the name index for an entity, e.g. after it is written
+    :param table:     name of entity table
+    :param entity_id: id of entity written
+    """
+    __NAME_INDICES__[table].invalidate()
+
+
+on_write([ARTIST_TABLE, VENUE_TABLE], invalidate_names)
@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Callable, Optional
+
+# separator between the start time and id in a keyset cursor
+_CURSOR_SEP = '_'
+
+
+def encode_cursor(start_time: datetime, show_id: int) -> str:
+    """
+    Encode a keyset cursor
+    :param start_time: start time of the last item on a page
+    :param show_id:    id of the last item on a page
+    """
+    return f'{start_time.isoformat()}{_CURSOR_SEP}{show_id}'
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decode a keyset cursor
+    :param cursor: cursor to decode
+    :return: tuple of (start_time, id)
+    :raises ValueError: if the cursor is invalid
+    """
+    start_time, sep, show_id = cursor.rpartition(_CURSOR_SEP)
+    if len(sep) == 0:
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return datetime.fromisoformat(start_time), int(show_id)
+
+
+class KeysetPagination:
+    """
+    Class representing a page of keyset paginated results
+    :param after:     (start_time, id) keyset the page starts after, or None for the first page
+    :param per_page:  number of items per page
+    :param items:     items for this page; a surplus item indicates that there is a following page
+    :param key:       function to get the (start_time, id) keyset of an item
+    :param total:     total number of items, or None if not counted
+    """
+    keyset = True
+
+    def __init__(self, after: Optional[tuple], per_page: int, items: list, key: Callable, total: int = None):
+        self.after = after
+        self.per_page = per_page
+        self.has_next = len(items) > per_page
+        self.items = items[:per_page]
+        self.total = total
+        self.next_cursor = encode_cursor(*key(self.items[-1])) if self.has_next else None
+
+    @property
+    def has_prev(self) -> bool:
+        """ Previous pages are only reachable by returning to the first page """
+        return self.after is not None
@@ -0,0 +1,84 @@
+import threading
+import weakref
+from time import perf_counter
+
+from sqlalchemy.pool import QueuePool
+
+from util import get_config
+
+__POOLS__ = weakref.WeakSet()
+
+
+class PoolStats:
+    """
+    Class representing the usage statistics of a connection pool
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, wait: float):
+        """
+        Record a connection checkout
+        :param wait: time in seconds spent waiting for the connection
+        """
+        with self.lock:
+            self.checkouts = self.checkouts + 1
+            self.total_wait = self.total_wait + wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {
+                "checkouts": self.checkouts,
+                "total_wait_ms": round(self.total_wait * 1000, 3),
+                "avg_wait_ms": round(self.total_wait * 1000 / self.checkouts, 3) if self.checkouts > 0 else 0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    Queue pool recording the time spent waiting for connections
+    """
+    def __init__(self, creator, **kw):
+        super().__init__(creator, **kw)
+        self.stats = PoolStats()
+        __POOLS__.add(self)
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.record_wait(perf_counter() - start)
+
+
+def engine_options() -> dict:
+    """
+    Get the SQLAlchemy engine options for the configured connection pool
+    """
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": get_config("DB_POOL_SIZE"),
+        "max_overflow": get_config("DB_POOL_MAX_OVERFLOW"),
+        "pool_timeout": get_config("DB_POOL_TIMEOUT"),
+        "pool_recycle": get_config("DB_POOL_RECYCLE"),
+        "pool_pre_ping": get_config("DB_POOL_PRE_PING"),
+    }
+
+
+def pool_stats() -> list:
+    """
+    Get the statistics for all active connection pools
+    """
+    return [{
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **pool.stats.as_dict()
+    } for pool in list(__POOLS__)]
@@ -0,0 +1,177 @@
+import logging
+import re
+import threading
+from collections import Counter, deque
+from time import perf_counter
+
+from flask import Flask, g, has_request_context, has_app_context, current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from util import get_config
+
+# name of request context attribute holding the request's profile
+_REQUEST_PROFILE_ = '_query_profile'
+# name of connection info key holding statement start times
+_START_TIMES_ = 'query_start_times'
+
+_LOGGER_ = logging.getLogger(__name__)
+
+# literals which are replaced to get the shape of a statement
+_NUMBER_LITERAL_ = re.compile(r'\b\d+(\.\d+)?\b')
+_STRING_LITERAL_ = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE_ = re.compile(r'\s+')
+
+__HISTORY__ = deque()
+__HISTORY_LOCK__ = threading.Lock()
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Get the shape of a statement, i.e. the statement with literals replaced and whitespace collapsed
+    :param statement: SQL statement
+    """
+    shape = _STRING_LITERAL_.sub('?', statement)
+    shape = _NUMBER_LITERAL_.sub('?', shape)
+    return _WHITESPACE_.sub(' ', shape).strip()
+
+
+class RequestProfile:
+    """
+    Class representing the database statements executed while handling a request
+    """
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = []    # list of (duration, statement)
+        self.shapes = Counter()
+
+    def record(self, statement: str, duration: float):
+        """
+        Record an executed statement
+        :param statement: SQL statement
+        :param duration:  execution time in seconds
+        """
+        self.count = self.count + 1
+        self.total_time = self.total_time + duration
+        self.statements.append((duration, statement))
+        self.shapes[statement_shape(statement)] += 1
+
+    def slowest(self, num: int) -> list:
+        """
+        Get the slowest statements
+        :param num: max number of statements to get
+        """
+        return sorted(self.statements, key=lambda s: s[0], reverse=True)[:num]
+
+    def repeated(self, threshold: int) -> dict:
+        """
+        Get the statement shapes which were repeated, indicating a possible N+1 query pattern
+        :param threshold: min number of executions to be considered repeated
+        """
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": _ms(self.total_time),
+            "slowest": [{"ms": _ms(duration), "statement": statement}
+                        for duration, statement in self.slowest(get_config("PROFILE_SLOWEST"))],
+            "repeated": self.repeated(get_config("PROFILE_REPEAT_THRESHOLD")),
+        }
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _logger():
+    return current_app.logger if has_app_context() else _LOGGER_
+
+
+def request_profile() -> RequestProfile:
+    """
+    Get the profile for the current request, or None if not in a request
+    """
+    profile = None
+    if has_request_context():
+        profile = g.get(_REQUEST_PROFILE_, None)
+        if profile is None:
+            profile = RequestProfile()
+            setattr(g, _REQUEST_PROFILE_, profile)
+    return profile
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_TIMES_, []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get(_START_TIMES_)
+    if not start_times:
+        return
+    duration = perf_counter() - start_times.pop()
+
+    profile = request_profile()
+    if profile is not None:
+        profile.record(statement, duration)
+
+    if has_app_context():
+        threshold = get_config("SLOW_QUERY_MS")
+        if threshold is not None and duration * 1000 >= threshold:
+            _logger().warning(f'Slow query ({_ms(duration)}ms): {statement_shape(statement)}'
+                              f'{"" if executemany else f" {parameters}"}')
+
+
+def _handle_error(exception_context):
+    # statement failed so after_cursor_execute will not be called
+    connection = exception_context.connection
+    if connection is not None:
+        start_times = connection.info.get(_START_TIMES_)
+        if start_times:
+            start_times.pop()
+
+
+def _after_request(response):
+    profile = request_profile()
+    if request.endpoint != 'static':
+        repeated = profile.repeated(get_config("PROFILE_REPEAT_THRESHOLD"))
+        for shape, count in repeated.items():
+            _logger().warning(f'Possible N+1 query, executed {count} times in {request.method} {request.path}: '
+                              f'{shape}')
+
+        if get_config("PROFILE_HEADERS"):
+            response.headers['X-DB-Queries'] = str(profile.count)
+            response.headers['X-DB-Time-ms'] = str(_ms(profile.total_time))
+            response.headers['X-DB-Repeated'] = str(len(repeated))
+
+        with __HISTORY_LOCK__:
+            __HISTORY__.append({
+                "method": request.method,
+                "path": request.full_path.rstrip('?'),
+                "status": response.status_code,
+                **profile.as_dict()
+            })
+            while len(__HISTORY__) > get_config("PROFILE_HISTORY"):
+                __HISTORY__.popleft()
+    return response
+
+
+def init_profiler(app: Flask):
+    """
+    Enable profiling of the database statements executed by all engines
+    :param app: application
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+    app.after_request(_after_request)
+
+
+def profile_history() -> list:
+    """
+    Get the profiles of the most recent requests, newest first
+    """
+    with __HISTORY_LOCK__:
+        return list(reversed(__HISTORY__))
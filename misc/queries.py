@@ -12,11 +12,15 @@ from flask_wtf import FlaskForm
 from sqlalchemy import Column
 
 from config import USE_ORM
-from forms import NO_STATE_SELECTED
-from models import Entity, get_entity, VENUE_TABLE, ARTIST_TABLE
+from forms import NO_STATE_SELECTED, load_form
+from models import Entity, get_entity, VENUE_TABLE, ARTIST_TABLE, get_model_property_list
+from .genres import genre_catalogue, genre_ids
+from .search import prefix_tsquery, use_fulltext, use_local, local_search
+from .search_cache import cached_search
 from .common import SP_NAME, SP_CITY, SP_STATE, SP_GENRES, SearchParams
 from .misc import print_exc_info, str_or_none, check_no_list_in_list
-from .queries_orm import AND_CONJUNC
+from .queries_orm import AND_CONJUNC, SHOWS_BY_KEYS, SHOW_SUMMARY_PAST, SHOW_SUMMARY_COUNT
+from util import get_config
 
 ORM = USE_ORM
 ENGINE = not ORM
@@ -25,31 +29,39 @@ if ORM:
     from .queries_orm import (
         entity_search_all_orm as entity_search_all,
         entity_search_like_orm as entity_search_like,
+        entity_search_fulltext_orm as entity_search_fulltext,
+        entity_search_ids_orm as entity_search_ids,
         entity_search_state_orm as entity_search_state,
         entity_search_genres_orm as entity_search_genres,
         entity_search_clauses_orm as entity_search_clauses,
         conjunction_op_orm as conjunction_op,
         entity_search_execute_orm as entity_search_execute,
+        entity_export_columns_orm as entity_export_columns,
+        entity_export_rows_orm as entity_export_rows,
         entity_shows_count_query_orm as entity_shows_count_query,
         shows_by_orm as shows_by,
         shows_by_artist_fields_orm as shows_by_artist_fields,
         shows_by_venue_fields_orm as shows_by_venue_fields,
-        get_genres_options_orm as get_genres_options_impl,
+        entity_with_shows_orm as entity_with_shows_impl,
 )
 else:
     from .queries_engine import (
         entity_search_all_engine as entity_search_all,
         entity_search_like_engine as entity_search_like,
+        entity_search_fulltext_engine as entity_search_fulltext,
+        entity_search_ids_engine as entity_search_ids,
         entity_search_state_engine as entity_search_state,
         entity_search_genres_engine as entity_search_genres,
         entity_search_clauses_engine as entity_search_clauses,
         conjunction_op_engine as conjunction_op,
         entity_search_execute_engine as entity_search_execute,
+        entity_export_columns_engine as entity_export_columns,
+        entity_export_rows_engine as entity_export_rows,
         entity_shows_count_query_engine as entity_shows_count_query,
         shows_by_engine as shows_by,
         shows_by_artist_fields_engine as shows_by_artist_fields,
         shows_by_venue_fields_engine as shows_by_venue_fields,
-        get_genres_options_engine as get_genres_options_impl,
+        entity_with_shows_engine as entity_with_shows_impl,
     )
 
 CITY_STATE_SEARCH_SEPARATOR = ','
@@ -120,6 +132,30 @@ def ncsg_search_terms(search: SearchParams) -> tuple:
     return name, city, state, genres, mode
 
 
+def entity_search_text(entity: Entity, prop: str, value: str, search: SearchParams):
+    """
+    Text criteria, using the configured search backend
+    :param entity:      entity to search
+    :parameter prop:    property to apply criteria to
+    :parameter value:   value for criteria
+    :param search:      search parameters for advanced search
+    """
+    tsquery = prefix_tsquery(value)
+    if tsquery is None:
+        # no words to match, e.g. only punctuation
+        clause = entity_search_like(entity, prop, value, search)
+    elif use_fulltext():
+        clause = entity_search_fulltext(entity, prop, tsquery, search)
+    elif use_local():
+        scores = local_search(entity, prop, value)
+        for entity_id, score in scores.items():
+            search.scores[entity_id] = search.scores.get(entity_id, 0) + score
+        clause = entity_search_ids(entity, list(scores.keys()), search)
+    else:
+        clause = entity_search_like(entity, prop, value, search)
+    return clause
+
+
 def search_clauses(search: SearchParams) -> SearchParams:
     """
     Determine search clauses
@@ -129,34 +165,37 @@ def search_clauses(search: SearchParams) -> SearchParams:
     search_terms = []
     clauses: list[list] = []
     record_term = True
+    # genres are matched by id; unknown genres match nothing
+    search_genre_ids = list(genre_ids(search.genres).values()) \
+        if search.genres is not None and len(search.genres) > 0 else []
 
     for entity in search.entities:
         sub_clauses = []
 
         if search.name is not None:
             sub_clauses.append(
-                entity_search_like(entity, SP_NAME, search.name))
+                entity_search_text(entity, SP_NAME, search.name, search))
             if record_term:
                 search_terms.append(f'name: {search.name}')
                 search.searching_on[SP_NAME] = True
 
         if search.city is not None:
             sub_clauses.append(
-                entity_search_like(entity, SP_CITY, search.city))
+                entity_search_text(entity, SP_CITY, search.city, search))
             if record_term:
                 search_terms.append(f'city: {search.city}')
                 search.searching_on[SP_CITY] = True
 
         if search.state is not None and search.state != NO_STATE_SELECTED:
             sub_clauses.append(
-                entity_search_state(entity, search.state))
+                entity_search_state(entity, search.state, search))
             if record_term:
                 search_terms.append(f'state: {search.state}')
                 search.searching_on[SP_STATE] = True
 
         if search.genres is not None and len(search.genres) > 0:
             sub_clauses.append(
-                entity_search_genres(entity, search.genres, search))
+                entity_search_genres(entity, search_genre_ids, search))
             if record_term:
                 search_terms.append(f'genres: {" or ".join(search.genres)}')
                 search.searching_on[SP_GENRES] = True
@@ -207,9 +246,29 @@ def ncsg_search_clauses(mode: str, search: SearchParams) -> SearchParams:
     return search_clauses(search)
 
 
+def search_cache_key(mode: str, form: FlaskForm, simple_search_term: str = None, *extra) -> tuple:
+    """
+    Get the canonical form of a search, for caching its results
+    :param mode:        one of 'basic', 'advanced' or 'all'
+    :param form:        form data
+    :param simple_search_term:  search term for basic search
+    :param extra:       additional search arguments, e.g. requested page
+    """
+    if mode == SEARCH_BASIC:
+        terms = (str_or_none(simple_search_term),)
+    elif mode == SEARCH_ADVANCED:
+        data = load_form(form)
+        state = data["state"] if data["state"] != NO_STATE_SELECTED else None
+        terms = (str_or_none(data["name"]), str_or_none(data["city"]), str_or_none(state),
+                 tuple(sorted(set(data["genres"] if data["genres"] is not None else []))))
+    else:
+        terms = ()
+    return (mode,) + terms + extra
+
+
 def ncsg_search(mode: str, form: FlaskForm, entity: Entity, simple_search_term: str = None) -> dict:
     """
-    Perform a search
+    Perform a search, or get its cached results
     :param mode:        one of 'basic', 'advanced' or 'all'
     :param form:        form data
     :param entity:      entity to search for
@@ -219,6 +278,19 @@ def ncsg_search(mode: str, form: FlaskForm, entity: Entity, simple_search_term:
     if mode not in [SEARCH_BASIC, SEARCH_ADVANCED, SEARCH_ALL]:
         abort(HTTPStatus.BAD_REQUEST.value)
 
+    return cached_search(entity.eng_table, search_cache_key(mode, form, simple_search_term),
+                         lambda: _ncsg_search(mode, form, entity, simple_search_term))
+
+
+def _ncsg_search(mode: str, form: FlaskForm, entity: Entity, simple_search_term: str = None) -> dict:
+    """
+    Perform a search
+    :param mode:        one of 'basic', 'advanced' or 'all'
+    :param form:        form data
+    :param entity:      entity to search for
+    :param simple_search_term:  search term for basic search
+    :return dict with "count", "data", "search_term", "mode"
+    """
     # advanced search on only one class, joining with 'and'
     search = SearchParams(entity, conjunction=AND_CONJUNC).load_form(form)
     search.simple_search_term = simple_search_term
@@ -232,11 +304,15 @@ def ncsg_search(mode: str, form: FlaskForm, entity: Entity, simple_search_term:
 
     entities = []
     try:
-        entities = entity_search_execute(query)
+        entities = entity_search_execute(query, search)
     except:
         print_exc_info()
         abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
 
+    if len(search.scores) > 0:
+        # most relevant first
+        entities = sorted(entities, key=lambda e: (-search.scores.get(e.id, 0), e.name, e.id))
+
     data = entity_shows_count(entities, entity)
 
     return {
@@ -283,6 +359,39 @@ def artists_search(mode: str, form: FlaskForm, simple_search_term: str = None) -
     return ncsg_search(mode, form, get_entity(ARTIST_TABLE), simple_search_term=simple_search_term)
 
 
+def entity_export(form: FlaskForm, entity: Entity) -> tuple:
+    """
+    Export the entities matching an advanced search
+    :param form:    form data
+    :param entity:  entity to export
+    :return: tuple of list of keys and iterator of rows, which fetches the rows from the database in batches
+    """
+    search = SearchParams(entity, conjunction=AND_CONJUNC).load_form(form)
+    ncsg_search_clauses(SEARCH_ADVANCED, search)
+
+    properties = get_model_property_list(entity.eng_table)
+    query = entity_search_all(entity, search, columns=entity_export_columns(entity, properties))
+    query = entity_search_clauses(query, search, entity_search_expression)
+
+    return properties + ['genres'], entity_export_rows(entity, query, search, get_config("EXPORT_BATCH_SIZE"))
+
+
+def venues_export(form: FlaskForm) -> tuple:
+    """
+    Export the venues matching an advanced search
+    :param form:   form data
+    """
+    return entity_export(form, get_entity(VENUE_TABLE))
+
+
+def artists_export(form: FlaskForm) -> tuple:
+    """
+    Export the artists matching an advanced search
+    :param form:   form data
+    """
+    return entity_export(form, get_entity(ARTIST_TABLE))
+
+
 def _shows_by(entity_id: int, entity: Entity, link_field: Column, keys: dict, key_prefix: str, *criterion):
     """
     Select shows for the specified entity
@@ -301,14 +410,10 @@ def _shows_by(entity_id: int, entity: Entity, link_field: Column, keys: dict, ke
         abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
 
     # key is 'prefix_key' or 'start_time'
-    # value is value or isoformat() for start_time
     def kval(k):
         return f'{key_prefix}_{k}' if k != "start_time" else k
 
-    def vval(k, v):
-        return v if k != "start_time" else v.isoformat()
-
-    return [{kval(k): vval(k, show[v]) for k, v in keys.items()} for show in shows]
+    return [{kval(k): show[v] for k, v in keys.items()} for show in shows]
 
 
 def shows_by_artist(artist_id: int, *criterion):
@@ -329,20 +434,75 @@ def shows_by_venue(venue_id: int, *criterion):
     return _shows_by(venue_id, *shows_by_venue_fields(), "artist", *criterion)
 
 
+def _entity_with_shows(entity_id: int, entity: Entity, shows_entity: Entity, link_field: Column,
+                       key_prefix: str) -> dict:
+    """
+    Get an entity with its past and upcoming shows
+    :param entity_id:    id of entity
+    :param entity:       entity to get
+    :param shows_entity: entity at the other side of the shows, e.g. venue for an artist's shows
+    :param link_field:   show field linking show and entity
+    :param key_prefix:   prefix to combine with keys to generate show result fields
+    """
+    data = None
+    shows = []
+    try:
+        data, shows = entity_with_shows_impl(entity_id, entity, shows_entity, link_field,
+                                             max_past=get_config("MAX_PAST_SHOWS"))
+    except:
+        print_exc_info()
+        abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+    if data is None:
+        abort(HTTPStatus.NOT_FOUND.value)
+
+    past_shows = []
+    upcoming_shows = []
+    counts = {True: 0, False: 0}
+    for show in shows:
+        is_past = show[SHOW_SUMMARY_PAST]
+        counts[is_past] = show[SHOW_SUMMARY_COUNT]
+        (past_shows if is_past else upcoming_shows).append({
+            f'{key_prefix}_{k}' if k != "start_time" else k: show[v] for k, v in SHOWS_BY_KEYS.items()
+        })
+
+    data["past_shows"] = past_shows
+    data["upcoming_shows"] = upcoming_shows
+    # counts include any past shows not returned
+    data["past_shows_count"] = counts[True]
+    data["upcoming_shows_count"] = counts[False]
+    return data
+
+
+def artist_with_shows(artist_id: int) -> dict:
+    """
+    Get an artist with its past and upcoming shows
+    :param artist_id:  id of artist
+    """
+    return _entity_with_shows(artist_id, get_entity(ARTIST_TABLE), *shows_by_artist_fields()[:2], "venue")
+
+
+def venue_with_shows(venue_id: int) -> dict:
+    """
+    Get a venue with its past and upcoming shows
+    :param venue_id:   id of venue
+    """
+    return _entity_with_shows(venue_id, get_entity(VENUE_TABLE), *shows_by_venue_fields()[:2], "artist")
+
+
 def get_genres_options():
     """
     Generate a list of possible genre options
     """
-    genres = []
+    catalogue = None
     try:
-        genres = get_genres_options_impl()
+        catalogue = genre_catalogue()
     except:
         print_exc_info()
         abort(HTTPStatus.INTERNAL_SERVER_ERROR.value)
 
-    options = [(g[0], g[0]) for g in genres if g[0] != 'Other']
-    options.append(('Other', 'Other'))
-    return options, [g[0] for g in options]
+    # copies, as the catalogue is shared
+    return list(catalogue.options), list(catalogue.values)
 
 
 def entity_search_expression(terms: list, conjunction: Union[str, list[str]]):
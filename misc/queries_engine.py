@@ -1,15 +1,17 @@
 # ---------------------------------------------------------------------------- #
 # Imports
 # ---------------------------------------------------------------------------- #
+from datetime import datetime
 from typing import Callable
 
 from config import USE_ORM
-from models import ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE, GENRES_TABLE, Entity, fq_column, get_entity
-from .engine import execute
+from models import (ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE, GENRES_TABLE, AVAILABILITY_TABLE, SHOWS_ARCHIVE_TABLE,
+                    Entity, fq_column, get_entity, get_model_property_list)
+from .engine import execute, execute_transaction, stream
 # ---------------------------------------------------------------------------- #
 # Models.
 # ---------------------------------------------------------------------------- #
-from .queries_orm import SHOWS_BY_KEYS, AND_CONJUNC, OR_CONJUNC
+from .queries_orm import SHOWS_BY_KEYS, AND_CONJUNC, TS_CONFIG
 from .common import SearchParams
 
 ORM = USE_ORM
@@ -19,30 +21,61 @@ SHOWS_BY_ARTIST_KEYS = {k: f'venue_{k}' if k == 'id' else k for k in SHOWS_BY_KE
 SHOWS_BY_VENUE_KEYS = {k: f'artist_{k}' if k == 'id' else k for k in SHOWS_BY_KEYS}
 
 
-def entity_search_all_engine(entity: Entity, search: SearchParams) -> str:
+def entity_search_all_engine(entity: Entity, search: SearchParams, columns: list = None) -> str:
     """
     Basic 'all' mode query
-    :param entity: entity to search
+    :param entity:  entity to search
     :param search:  search parameters for advanced search
+    :param columns: columns to select; default is id and name
     """
-    from_term = search.customisation if search.customisation is not None else f'"{entity.eng_table}"'
-    return f'SELECT {entity.fq_id()}, {entity.fq_column("name")} FROM {from_term}'
+    if columns is None:
+        columns = [entity.fq_id(), entity.fq_column("name")]
+    return f'SELECT {", ".join(columns)} FROM "{entity.eng_table}"'
 
 
-def entity_search_like_engine(entity: Entity, prop: str, value: str) -> str:
+def entity_search_like_engine(entity: Entity, prop: str, value: str, search: SearchParams) -> str:
     """
     Like criteria
     :param entity:      entity to search
     :parameter prop:    property to apply 'like' criteria to
     :parameter value:   value for 'like' criteria
+    :param search:      search parameters for advanced search
     """
     if prop in ['name', 'city']:
-        like = f'LOWER({fq_column(entity.eng_table, prop)}) LIKE LOWER(\'%{value}%\')'
+        like = f'LOWER({fq_column(entity.eng_table, prop)}) LIKE LOWER({search.bind(f"%{value}%")})'
     else:
         like = None
     return like
 
 
+def entity_search_fulltext_engine(entity: Entity, prop: str, tsquery: str, search: SearchParams) -> str:
+    """
+    Full text criteria
+    :param entity:      entity to search
+    :parameter prop:    property to apply full text criteria to
+    :parameter tsquery: full text search query
+    :param search:      search parameters for advanced search
+    """
+    if prop in ['name', 'city']:
+        vector = f"to_tsvector('{TS_CONFIG}', {fq_column(entity.eng_table, prop)})"
+        query = f"to_tsquery('{TS_CONFIG}', {search.bind(tsquery)})"
+        search.ranks.append(f'ts_rank({vector}, {query})')
+        match = f'{vector} @@ {query}'
+    else:
+        match = None
+    return match
+
+
+def entity_search_ids_engine(entity: Entity, ids: list, search: SearchParams) -> str:
+    """
+    Ids criteria
+    :param entity:  entity to search
+    :param ids:     ids of entities to match
+    :param search:  search parameters for advanced search
+    """
+    return f'{entity.fq_id()} = ANY({search.bind(ids)})'
+
+
 def join_engine(left: str, right: str, left_col: str, right_col: str, join_type: str = 'INNER') -> str:
     if 'JOIN' not in left:
         join_to = f'"{left}"'
@@ -55,39 +88,27 @@ def join_engine(left: str, right: str, left_col: str, right_col: str, join_type:
     return f'({join_to} {join_type} JOIN {joiner} ON {left_col} = {right_col}) '
 
 
-def entity_search_state_engine(entity: Entity, value: str) -> str:
+def entity_search_state_engine(entity: Entity, value: str, search: SearchParams) -> str:
     """
     State criteria
     :param entity:    entity to search
     :parameter value: value for criteria
+    :param search:    search parameters for advanced search
     """
-    return f'UPPER({fq_column(entity.eng_table, "state")}) = UPPER(\'{value}\')'
+    return f'UPPER({fq_column(entity.eng_table, "state")}) = UPPER({search.bind(value)})'
 
 
-def entity_search_genres_engine(entity: Entity, values: list, search: SearchParams) -> str:
+def entity_search_genres_engine(entity: Entity, ids: list, search: SearchParams) -> str:
     """
     Genres criteria
     :param entity:  entity to search
-    :param values:  values for criteria
+    :param ids:     ids of genres to match; entities with any of the genres match
     :param search:  search parameters for advanced search
     """
-    genre_term = f'{fq_column(GENRES_TABLE, "name")}'
-    idx = search.entities.index(entity)
-    if len(search.genre_aliases) > idx:
-        if search.genre_aliases[idx] is not None:
-            genre_term = f'{search.genre_aliases[idx]}.name'
-
-    terms = [f'{genre_term} = \'{g}\'' for g in values]
-    # ((inner join 'entity table' and 'genre link table')
-    #       inner join 'genres table')
-    search.customisation = \
-        join_engine(
-            join_engine(entity.eng_table, entity.eng_genre_link_table,
-                        entity.fq_genre_link(), entity.fq_id()),
-            GENRES_TABLE,
-            fq_column(entity.eng_genre_link_table, "genre_id"), fq_column(GENRES_TABLE, "id"))
-
-    return conjunction_op_engine(OR_CONJUNC, *terms)
+    # semi-join on the genre link table, so entities with multiple matching genres aren't repeated
+    return f'EXISTS (SELECT 1 FROM "{entity.eng_genre_link_table}" ' \
+           f'WHERE {entity.fq_genre_link()} = {entity.fq_id()} ' \
+           f'AND {fq_column(entity.eng_genre_link_table, "genre_id")} = ANY({search.bind(ids)}))'
 
 
 def entity_search_clauses_engine(query: str, search: SearchParams, entity_search_expression: Callable):
@@ -114,12 +135,42 @@ def conjunction_op_engine(conjunction: str, *terms: list):
     return f"({joined})"
 
 
-def entity_search_execute_engine(query: str):
+def entity_search_execute_engine(query: str, search: SearchParams):
     """
     Execute query
     :param query:           query to execute
+    :param search:          search parameters for advanced search
+    """
+    if len(search.ranks) > 0:
+        # most relevant first
+        entity = search.entities[0]
+        query = f'{query} ORDER BY {" + ".join(search.ranks)} DESC, {entity.fq_column("name")}, {entity.fq_id()}'
+    return execute(query + ";", search.params)
+
+
+def entity_export_columns_engine(entity: Entity, properties: list) -> list:
+    """
+    Get the columns to select to export entities
+    :param entity:      entity to export
+    :param properties:  properties to export, followed by genres
+    :return: list of columns
     """
-    return execute(query + ";")
+    genres = f'ARRAY(SELECT g.name FROM "{entity.eng_genre_link_table}" gl ' \
+             f'JOIN "{GENRES_TABLE}" g ON (gl.genre_id = g.id) ' \
+             f'WHERE gl.{entity.eng_genre_link_column} = {entity.fq_id()} ORDER BY g.name) as genres'
+    return [entity.fq_column(p) for p in properties] + [genres]
+
+
+def entity_export_rows_engine(entity: Entity, query: str, search: SearchParams, batch_size: int):
+    """
+    Execute an export query, fetching results in batches
+    :param entity:      entity to export
+    :param query:       query to execute
+    :param search:      search parameters for advanced search
+    :param batch_size:  number of rows to fetch at a time
+    :return: iterator of result rows
+    """
+    return stream(f'{query} ORDER BY {entity.fq_id()};', search.params, batch_size)
 
 
 def entity_shows_count_query_engine(entities: list, entity: Entity):
@@ -128,20 +179,22 @@ def entity_shows_count_query_engine(entities: list, entity: Entity):
     :param entities:    list of entities whose shows to search for
     :param entity:      entity to search for
     """
-    data = []
-    for instance in entities:
+    entities = list(entities)
+    ids = [instance["id"] for instance in entities]
+    counts = {}
+    if len(ids) > 0:
+        # single grouped count for all entities, entities with no upcoming shows are absent from the result
+        show_column = entity.eng_show_column
         shows = execute(
-            f'SELECT COUNT(id) FROM "{SHOWS_TABLE}" WHERE {entity.eng_show_column} = {instance["id"]} '
-            f'AND start_time > CURRENT_TIMESTAMP;')
-        shows = shows.scalar()
-
-        data.append({
-            "id": instance.id,
-            "name": instance.name,
-            "num_upcoming_shows": shows
-        })
+            f'SELECT {show_column}, COUNT(id) FROM "{SHOWS_TABLE}" WHERE {show_column} = ANY(:ids) '
+            f'AND start_time > CURRENT_TIMESTAMP GROUP BY {show_column};', {"ids": ids})
+        counts = {row[0]: row[1] for row in shows}
 
-    return data
+    return [{
+        "id": instance.id,
+        "name": instance.name,
+        "num_upcoming_shows": counts.get(instance.id, 0)
+    } for instance in entities]
 
 
 def shows_by_engine(entity_id, entity: Entity, link_column: str, *criterion):
@@ -156,11 +209,61 @@ def shows_by_engine(entity_id, entity: Entity, link_column: str, *criterion):
     shows = execute(f'SELECT {show_column}, {fq_column(SHOWS_TABLE, "start_time")}, '
                     f'{fq_column(entity.eng_table, "name")}, {fq_column(entity.eng_table, "image_link")} FROM "{SHOWS_TABLE}" '
                     f'INNER JOIN "{entity.eng_table}" ON {show_column} = {fq_column(entity.eng_table, "id")} '
-                    f'WHERE {link_column} = {entity_id} AND {" AND ".join(criterion)} '
-                    f'ORDER BY "{SHOWS_TABLE}".start_time;')
+                    f'WHERE {link_column} = :entity_id AND {" AND ".join(criterion)} '
+                    f'ORDER BY "{SHOWS_TABLE}".start_time;', {"entity_id": entity_id})
     return shows.fetchall()
 
 
+# fields of show results in entity_with_shows, in the order of SHOWS_BY_KEYS then SHOW_SUMMARY_PAST and
+# SHOW_SUMMARY_COUNT
+_SHOW_SUMMARY_FIELDS_ = ["show_id", "show_start_time", "show_name", "show_image_link", "show_past", "show_count"]
+
+
+def entity_with_shows_engine(entity_id: int, entity: Entity, shows_entity: Entity, link_column: str,
+                             max_past: int = None) -> tuple:
+    """
+    Select an entity and its shows in a single query
+    :param entity_id:    id of entity
+    :param entity:       entity to select
+    :param shows_entity: entity at the other side of the shows, e.g. venue for an artist's shows
+    :param link_column:  show column linking show and entity
+    :param max_past:     max number of most recent past shows to select; None for all
+    :return: tuple of entity dict or None if not found, and list of show results ordered by start time,
+             with SHOW_SUMMARY_PAST and SHOW_SUMMARY_COUNT fields
+    """
+    show_column = shows_entity.eng_show_column  # foreign key column in show model linking show and shows_entity
+    is_past = f'"{SHOWS_TABLE}".start_time < CURRENT_TIMESTAMP'
+    params = {"entity_id": entity_id}
+    if max_past is None:
+        on_clause = 'TRUE'
+    else:
+        on_clause = 'NOT shows.show_past OR shows.show_rank <= :max_past'
+        params["max_past"] = max_past
+    # rank shows within past/upcoming and count them, so past shows may be limited but still counted
+    # genres is list of names
+    results = execute(
+        f'SELECT "{entity.eng_table}".*, ARRAY('
+        f'SELECT g.name FROM "{entity.eng_genre_link_table}" gl '
+        f'JOIN "{GENRES_TABLE}" g ON (gl.genre_id = g.id) '
+        f'WHERE gl.{entity.eng_genre_link_column} = {entity.fq_id()}) as genres, '
+        f'{", ".join([f"shows.{f}" for f in _SHOW_SUMMARY_FIELDS_])} '
+        f'FROM "{entity.eng_table}" LEFT OUTER JOIN LATERAL ('
+        f'SELECT {show_column} AS show_id, "{SHOWS_TABLE}".start_time AS show_start_time, '
+        f'{shows_entity.fq_column("name")} AS show_name, {shows_entity.fq_column("image_link")} AS show_image_link, '
+        f'{is_past} AS show_past, COUNT(*) OVER (PARTITION BY {is_past}) AS show_count, '
+        f'ROW_NUMBER() OVER (PARTITION BY {is_past} ORDER BY "{SHOWS_TABLE}".start_time DESC) AS show_rank '
+        f'FROM "{SHOWS_TABLE}" INNER JOIN "{shows_entity.eng_table}" ON {show_column} = {shows_entity.fq_id()} '
+        f'WHERE {link_column} = {entity.fq_id()}'
+        f') shows ON ({on_clause}) '
+        f'WHERE {entity.fq_id()} = :entity_id '
+        f'ORDER BY shows.show_start_time;', params).mappings().all()
+
+    data = None
+    if len(results) > 0:
+        data = {k: v for k, v in results[0].items() if k not in _SHOW_SUMMARY_FIELDS_}
+    return data, [[r[f] for f in _SHOW_SUMMARY_FIELDS_] for r in results if r["show_id"] is not None]
+
+
 def shows_by_artist_fields_engine() -> (Entity, str, list[str]):
     """
     Select shows for the specified artist
@@ -181,8 +284,64 @@ def shows_by_venue_fields_engine() -> (Entity, str, list[str]):
     return get_entity(ARTIST_TABLE), get_entity(VENUE_TABLE).eng_show_column, SHOWS_BY_VENUE_KEYS
 
 
-def get_genres_options_engine():
+def get_names_engine(entity: Entity):
+    """
+    Get the ids and names of all entities
+    :param entity: entity to get names for
+    :return: list of (id, name)
+    """
+    return execute(f'SELECT id, name FROM "{entity.eng_table}";').fetchall()
+
+
+def get_search_text_engine(entity: Entity, prop: str):
+    """
+    Get the ids and values of a text property of all entities
+    :param entity: entity to get values for
+    :param prop:   property to get
+    :return: list of (id, value)
+    """
+    return execute(f'SELECT id, {prop} FROM "{entity.eng_table}";').fetchall()
+
+
+def get_availabilities_engine(artist_id: int) -> list:
+    """
+    Get all of an artist's availabilities
+    :param artist_id:  id of artist
+    :return: list of availability dicts ordered by from date and id
+    """
+    properties = ', '.join(get_model_property_list(AVAILABILITY_TABLE))
+    return [dict(a) for a in execute(
+        f'SELECT {properties} FROM "{AVAILABILITY_TABLE}" WHERE artist_id = :artist_id ORDER BY from_date, id;',
+        {"artist_id": artist_id}).mappings().all()]
+
+
+def get_genres_engine():
+    """
+    Get all genres ordered by name
+    :return: list of (id, name)
+    """
+    return execute(f'SELECT id, name FROM "{GENRES_TABLE}" ORDER BY name;').fetchall()
+
+
+# move shows to the archive, skipping shows locked by another archiver
+_ARCHIVE_SHOWS_ = \
+    f'WITH moved AS (' \
+    f'DELETE FROM "{SHOWS_TABLE}" WHERE id IN (' \
+    f'SELECT id FROM "{SHOWS_TABLE}" WHERE start_time < :before ORDER BY start_time LIMIT :batch_size ' \
+    f'FOR UPDATE SKIP LOCKED) ' \
+    f'RETURNING id, venue_id, artist_id, start_time, duration) ' \
+    f'INSERT INTO "{SHOWS_ARCHIVE_TABLE}" ' \
+    f'(id, venue_id, venue_name, artist_id, artist_name, start_time, duration) ' \
+    f'SELECT moved.id, moved.venue_id, v.name, moved.artist_id, a.name, moved.start_time, moved.duration ' \
+    f'FROM moved JOIN "{VENUE_TABLE}" v ON (v.id = moved.venue_id) JOIN "{ARTIST_TABLE}" a ON (a.id = moved.artist_id);'
+
+
+def archive_shows_engine(before: datetime, batch_size: int) -> int:
     """
-    Generate a list of possible genre options
+    Move a batch of shows to the shows archive
+    :param before:      archive shows which started before this time
+    :param batch_size:  max number of shows to archive
+    :return: number of shows archived
     """
-    return execute(f'SELECT name FROM "{GENRES_TABLE}" ORDER BY name;')
+    result = execute_transaction([(_ARCHIVE_SHOWS_, {"before": before, "batch_size": batch_size})])
+    return result[0].rowcount
@@ -5,15 +5,16 @@ from datetime import datetime
 from typing import Union, AnyStr, NewType, List, Callable
 
 from flask_sqlalchemy import Model
-from sqlalchemy import and_, func, or_, Column
-from sqlalchemy.orm import Query
+from sqlalchemy import and_, func, or_, not_, true, Column, literal_column, exists, select, delete, insert
+from sqlalchemy.orm import Query, selectinload
 
 from config import USE_ORM
 # ---------------------------------------------------------------------------- #
 # Models.
 # ---------------------------------------------------------------------------- #
 from .common import SearchParams
-from models import Show, Genre, Entity, VENUE_TABLE, get_entity, ARTIST_TABLE
+from models import (SQLAlchemyDB as db, Show, Genre, Availability, ShowArchive, Venue, Artist, Entity, VENUE_TABLE,
+                    get_entity, ARTIST_TABLE)
 
 ORM = USE_ORM
 ENGINE = not ORM
@@ -21,6 +22,12 @@ ENGINE = not ORM
 SHOWS_BY_KEYS = ['id', 'start_time', 'name', 'image_link']
 # indices to extract show results
 SHOWS_BY_KEYS = {SHOWS_BY_KEYS[p]: p for p in range(len(SHOWS_BY_KEYS))}
+# indices of the additional fields in entity_with_shows results
+SHOW_SUMMARY_PAST = len(SHOWS_BY_KEYS)          # show is in the past flag
+SHOW_SUMMARY_COUNT = len(SHOWS_BY_KEYS) + 1     # total number of past or upcoming shows
+
+# text search configuration for full text clauses; must match the full text search indexes
+TS_CONFIG = 'simple'
 
 AND_CONJUNC = 'and'
 OR_CONJUNC = 'or'
@@ -29,57 +36,89 @@ ModelOrStr = NewType('ModelOrStr', Union[Model, AnyStr])
 ListOfOrModelOrStr = NewType('ListOfOrModelOrStr', Union[ModelOrStr, List[ModelOrStr]])
 
 
-def entity_search_all_orm(entity: Entity, search: SearchParams) -> Query:
+def entity_search_all_orm(entity: Entity, search: SearchParams, columns: list = None) -> Query:
     """
     Basic 'all' mode query
-    :param entity: entity to search
+    :param entity:  entity to search
     :param search:  search parameters for advanced search
+    :param columns: columns to select; default is id and name
     """
     model_class = entity.orm_model
-    query = model_class.query
-    # add any joins
-    if search.customisation is not None:
-        for j in search.customisation:
-            query = query.join(j)
-    return query \
-        .with_entities(model_class.id, model_class.name)
+    if columns is None:
+        columns = [model_class.id, model_class.name]
+    return model_class.query \
+        .with_entities(*columns)
 
 
-def entity_search_like_orm(entity: Entity, prop: str, value: str):
+def entity_search_like_orm(entity: Entity, prop: str, value: str, search: SearchParams):
     """
     Like criteria
     :param entity:      entity to search
     :parameter prop:    property to apply 'like' criteria to
     :parameter value:   value for 'like' criteria
+    :param search:      search parameters for advanced search
     """
+    # match the lower() expression indexes on name and city
     if prop == 'name':
-        like = entity.orm_model.name.ilike("%" + value + "%")
+        like = func.lower(entity.orm_model.name).like(func.lower("%" + value + "%"))
     elif prop == 'city':
-        like = entity.orm_model.city.ilike("%" + value + "%")
+        like = func.lower(entity.orm_model.city).like(func.lower("%" + value + "%"))
     else:
         like = None
     return like
 
 
-def entity_search_state_orm(entity: Entity, value: str):
+def entity_search_fulltext_orm(entity: Entity, prop: str, tsquery: str, search: SearchParams):
+    """
+    Full text criteria
+    :param entity:      entity to search
+    :parameter prop:    property to apply full text criteria to
+    :parameter tsquery: full text search query
+    :param search:      search parameters for advanced search
+    """
+    # match the to_tsvector() expression indexes on name and city
+    if prop in ['name', 'city']:
+        ts_config = literal_column(f"'{TS_CONFIG}'")
+        vector = func.to_tsvector(ts_config, getattr(entity.orm_model, prop))
+        query = func.to_tsquery(ts_config, tsquery)
+        search.ranks.append(func.ts_rank(vector, query))
+        match = vector.op('@@')(query)
+    else:
+        match = None
+    return match
+
+
+def entity_search_ids_orm(entity: Entity, ids: list, search: SearchParams):
+    """
+    Ids criteria
+    :param entity:  entity to search
+    :param ids:     ids of entities to match
+    :param search:  search parameters for advanced search
+    """
+    return entity.orm_model.id.in_(ids)
+
+
+def entity_search_state_orm(entity: Entity, value: str, search: SearchParams):
     """
     State criteria
     :param entity:    entity to search
     :parameter value: value for criteria
+    :param search:    search parameters for advanced search
     """
     return func.upper(entity.orm_model.state) == func.upper(value)
 
 
-def entity_search_genres_orm(entity: Entity, values: list, search: SearchParams):
+def entity_search_genres_orm(entity: Entity, ids: list, search: SearchParams):
     """
     Genres criteria
     :param entity:  entity to search
-    :param values:  values for criteria
+    :param ids:     ids of genres to match; entities with any of the genres match
     :param search:  search parameters for advanced search
     """
-    return or_(*[
-            entity.orm_model.genres.any(Genre.name == g) for g in values
-        ])
+    # semi-join on the genre link table, so entities with multiple matching genres aren't repeated
+    link_column = entity.orm_genre_link_column
+    return exists().where(and_(link_column == entity.orm_model.id,
+                               link_column.table.columns.get('genre_id').in_(ids)))
 
 
 def entity_search_clauses_orm(query: Query, search: SearchParams, entity_search_expression: Callable):
@@ -105,33 +144,73 @@ def conjunction_op_orm(conjunction: str, *terms):
     return and_(*terms) if conjunction == AND_CONJUNC else or_(*terms)
 
 
-def entity_search_execute_orm(query: Query):
+def entity_search_execute_orm(query: Query, search: SearchParams):
     """
     Execute query
     :param query:           query to execute
+    :param search:          search parameters for advanced search
     """
+    if len(search.ranks) > 0:
+        # most relevant first
+        model = search.entities[0].orm_model
+        query = query.order_by(sum(search.ranks).desc(), model.name, model.id)
     return query.all()
 
 
+def entity_export_columns_orm(entity: Entity, properties: list) -> list:
+    """
+    Get the columns to select to export entities
+    :param entity:      entity to export
+    :param properties:  properties to export, followed by genres
+    :return: list of columns
+    """
+    model_class = entity.orm_model
+    link_column = entity.orm_genre_link_column
+    link_table = link_column.table
+    genres = select(Genre.name) \
+        .join(link_table, link_table.columns.get('genre_id') == Genre.id) \
+        .where(link_column == model_class.id) \
+        .order_by(Genre.name) \
+        .scalar_subquery()
+    return [getattr(model_class, p) for p in properties] + [func.array(genres).label('genres')]
+
+
+def entity_export_rows_orm(entity: Entity, query: Query, search: SearchParams, batch_size: int):
+    """
+    Execute an export query, fetching results in batches
+    :param entity:      entity to export
+    :param query:       query to execute
+    :param search:      search parameters for advanced search
+    :param batch_size:  number of rows to fetch at a time
+    :return: iterator of result rows
+    """
+    # generator, so the query is executed when the first row is requested
+    yield from query.order_by(entity.orm_model.id).yield_per(batch_size)
+
+
 def entity_shows_count_query_orm(entities: list, entity: Entity):
     """
     Get the shows count search query
     :param entities:    list of entities whose shows to search for
     :param entity:      entity to search for
     """
-    data = []
-    for instance in entities:
-        shows = Show.query \
-            .filter(and_(entity.orm_show_column == instance.id, Show.start_time > datetime.now())) \
-            .count()
-
-        data.append({
-            "id": instance.id,
-            "name": instance.name,
-            "num_upcoming_shows": shows
-        })
-
-    return data
+    entities = list(entities)
+    ids = [instance.id for instance in entities]
+    counts = {}
+    if len(ids) > 0:
+        # single grouped count for all entities, entities with no upcoming shows are absent from the result
+        show_column = entity.orm_show_column
+        counts = {row[0]: row[1] for row in Show.query
+                  .with_entities(show_column, func.count(Show.id))
+                  .filter(and_(show_column.in_(ids), Show.start_time > datetime.now()))
+                  .group_by(show_column)
+                  .all()}
+
+    return [{
+        "id": instance.id,
+        "name": instance.name,
+        "num_upcoming_shows": counts.get(instance.id, 0)
+    } for instance in entities]
 
 
 def shows_by_orm(entity_id: int, entity: Entity, link_column: Column, *criterion):
@@ -151,6 +230,47 @@ def shows_by_orm(entity_id: int, entity: Entity, link_column: Column, *criterion
         .all()
 
 
+def entity_with_shows_orm(entity_id: int, entity: Entity, shows_entity: Entity, link_column: Column,
+                          max_past: int = None) -> tuple:
+    """
+    Select an entity and its shows in a single query
+    :param entity_id:    id of entity
+    :param entity:       entity to select
+    :param shows_entity: entity at the other side of the shows, e.g. venue for an artist's shows
+    :param link_column:  show column linking show and entity
+    :param max_past:     max number of most recent past shows to select; None for all
+    :return: tuple of entity dict or None if not found, and list of show results ordered by start time,
+             with SHOW_SUMMARY_PAST and SHOW_SUMMARY_COUNT fields
+    """
+    model_class = entity.orm_model
+    shows_class = shows_entity.orm_model
+    show_column = shows_entity.orm_show_column  # foreign key column in show model linking show and shows_entity
+    is_past = Show.start_time < datetime.now()
+    # rank shows within past/upcoming and count them, so past shows may be limited but still counted
+    shows = db.session.query(
+            show_column.label("show_id"), Show.start_time.label("show_start_time"),
+            shows_class.name.label("show_name"), shows_class.image_link.label("show_image_link"),
+            is_past.label("show_past"),
+            func.count().over(partition_by=is_past).label("show_count"),
+            func.row_number().over(partition_by=is_past, order_by=Show.start_time.desc()).label("show_rank")) \
+        .join(shows_class, show_column == shows_class.id) \
+        .filter(link_column == model_class.id) \
+        .subquery() \
+        .lateral()
+    on_clause = true() if max_past is None else or_(not_(shows.c.show_past), shows.c.show_rank <= max_past)
+
+    results = db.session.query(model_class, shows.c.show_id, shows.c.show_start_time, shows.c.show_name,
+                               shows.c.show_image_link, shows.c.show_past, shows.c.show_count) \
+        .outerjoin(shows, on_clause) \
+        .options(selectinload(model_class.genres)) \
+        .filter(model_class.id == entity_id) \
+        .order_by(shows.c.show_start_time) \
+        .all()
+
+    data = results[0][0].get_dict(genres='name') if len(results) > 0 else None
+    return data, [r[1:] for r in results if r[1] is not None]
+
+
 def shows_by_artist_fields_orm() -> (Entity, Column, list[str]):
     """
     Select shows for the specified artist
@@ -171,9 +291,74 @@ def shows_by_venue_fields_orm() -> (Entity, Column, list[str]):
     return get_entity(ARTIST_TABLE), get_entity(VENUE_TABLE).orm_show_column, SHOWS_BY_KEYS
 
 
-def get_genres_options_orm():
+def get_names_orm(entity: Entity):
+    """
+    Get the ids and names of all entities
+    :param entity: entity to get names for
+    :return: list of (id, name)
+    """
+    model = entity.orm_model
+    return model.query.with_entities(model.id, model.name).all()
+
+
+def get_search_text_orm(entity: Entity, prop: str):
+    """
+    Get the ids and values of a text property of all entities
+    :param entity: entity to get values for
+    :param prop:   property to get
+    :return: list of (id, value)
+    """
+    model = entity.orm_model
+    return model.query.with_entities(model.id, getattr(model, prop)).all()
+
+
+def get_availabilities_orm(artist_id: int) -> list:
+    """
+    Get all of an artist's availabilities
+    :param artist_id:  id of artist
+    :return: list of availability dicts ordered by from date and id
+    """
+    return [a.get_dict() for a in Availability.query.filter(Availability.artist_id == artist_id)
+            .order_by(Availability.from_date, Availability.id).all()]
+
+
+def get_genres_orm():
     """
-    Generate a list of possible genre options
+    Get all genres ordered by name
+    :return: list of (id, name)
     """
-    return Genre.query.with_entities(Genre.name).order_by(Genre.name).all()
+    return Genre.query.with_entities(Genre.id, Genre.name).order_by(Genre.name).all()
 
+
+def archive_shows_orm(before: datetime, batch_size: int) -> int:
+    """
+    Move a batch of shows to the shows archive
+    :param before:      archive shows which started before this time
+    :param batch_size:  max number of shows to archive
+    :return: number of shows archived
+    """
+    # skip shows locked by another archiver
+    batch = select(Show.id) \
+        .where(Show.start_time < before) \
+        .order_by(Show.start_time) \
+        .limit(batch_size) \
+        .with_for_update(skip_locked=True)
+    moved = delete(Show) \
+        .where(Show.id.in_(batch)) \
+        .returning(Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.duration) \
+        .cte('moved')
+    archive = insert(ShowArchive).from_select(
+        ['id', 'venue_id', 'venue_name', 'artist_id', 'artist_name', 'start_time', 'duration'],
+        select(moved.c.id, moved.c.venue_id, Venue.name, moved.c.artist_id, Artist.name,
+               moved.c.start_time, moved.c.duration)
+        .join(Venue, Venue.id == moved.c.venue_id)
+        .join(Artist, Artist.id == moved.c.artist_id))
+    try:
+        count = db.session.execute(archive).rowcount
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    finally:
+        db.session.close()
+    return count
@@ -0,0 +1,121 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Union
+
+from config import USE_ORM, FULLTEXT_SEARCH, LOCAL_SEARCH
+from models import ARTIST_TABLE, VENUE_TABLE, Entity, get_entity
+from .cache import CachedValue
+from .invalidation import on_write
+from util import get_config
+
+ORM = USE_ORM
+ENGINE = not ORM
+
+if ORM:
+    from .queries_orm import get_search_text_orm as get_search_text_impl
+else:
+    from .queries_engine import get_search_text_engine as get_search_text_impl
+
+# properties which are text searched
+TEXT_SEARCH_PROPS = ['name', 'city']
+
+_WORD_ = re.compile(r'\w+')
+
+
+def search_words(text: str) -> list:
+    """
+    Split text into lowercase words
+    :param text: text to split
+    """
+    return _WORD_.findall(text.lower()) if text is not None else []
+
+
+def prefix_tsquery(value: str) -> Union[str, None]:
+    """
+    Generate a full text search query matching all the words in a value, as prefixes of words
+    :param value: value to search for
+    :return: query for to_tsquery() or None if value contains no words
+    """
+    words = search_words(value)
+    return ' & '.join([f'{word}:*' for word in words]) if len(words) > 0 else None
+
+
+def search_backend() -> str:
+    """
+    Get the text search backend; one of 'fulltext', 'local' or 'like'
+    """
+    return get_config("SEARCH_BACKEND")
+
+
+def use_fulltext() -> bool:
+    return search_backend() == FULLTEXT_SEARCH
+
+
+def use_local() -> bool:
+    return search_backend() == LOCAL_SEARCH
+
+
+class InvertedIndex:
+    """
+    Class representing an in-process inverted index of the words in a property of entities
+    :param entries: list of (id, text)
+    """
+    def __init__(self, entries: list):
+        postings = defaultdict(set)
+        for entity_id, text in entries:
+            for word in search_words(text):
+                postings[word].add(entity_id)
+        self.words = sorted(postings.keys())
+        self.postings = [postings[word] for word in self.words]
+
+    def search(self, value: str) -> dict:
+        """
+        Search for entities matching all the words in a value, as prefixes of words
+        :param value: value to search for
+        :return: dict of id to relevance score for matching entities
+        """
+        scores = None
+        for word in search_words(value):
+            matches = {}
+            index = bisect_left(self.words, word)
+            while index < len(self.words) and self.words[index].startswith(word):
+                # whole word matches rank above prefix matches
+                weight = 1.0 if self.words[index] == word else 0.5
+                for entity_id in self.postings[index]:
+                    matches[entity_id] = max(matches.get(entity_id, 0), weight)
+                index = index + 1
+            scores = matches if scores is None else \
+                {entity_id: scores[entity_id] + weight for entity_id, weight in matches.items() if entity_id in scores}
+        return scores if scores is not None else {}
+
+
+__INDICES__ = {
+    (table, prop): CachedValue(lambda entity=get_entity(table), prop=prop:
+                               InvertedIndex(get_search_text_impl(entity, prop)), ttl="SEARCH_INDEX_CACHE_TTL")
+    for table in [ARTIST_TABLE, VENUE_TABLE] for prop in TEXT_SEARCH_PROPS
+}
+
+
+def local_search(entity: Entity, prop: str, value: str) -> dict:
+    """
+    Search the in-process index of a property of entities
+    :param entity: entity to search
+    :param prop:   property to search
+    :param value:  value to search for
+    :return: dict of id to relevance score for matching entities
+    """
+    return __INDICES__[(entity.eng_table, prop)].get().search(value)
+
+
+def invalidate_search(table: str, entity_id: int = None):
+    """
+    Invalidate the in-process indices for an entity, e.g. after it is written
+    :param table:     name of entity table
+    :param entity_id: id of entity written
+    """
+    for prop in TEXT_SEARCH_PROPS:
+        __INDICES__[(table, prop)].invalidate()
+
+
+on_write([ARTIST_TABLE, VENUE_TABLE], invalidate_search)
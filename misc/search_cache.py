@@ -0,0 +1,55 @@
+from typing import Callable, Hashable
+
+from models import ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE
+from .cache import LRUCache
+from .invalidation import on_write
+from util import get_config
+
+# result caches by the table searched
+__RESULTS__ = {
+    table: LRUCache("SEARCH_CACHE_SIZE", ttl="SEARCH_CACHE_TTL") for table in [ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE]
+}
+# result caches invalidated by writes to a table; artist and venue results include upcoming show counts,
+# and show results include artist and venue names. Deleting an artist or venue also deletes its shows, so the delete
+# is notified as a write to SHOWS_TABLE as well, which invalidates the other entity's results
+_AFFECTED_RESULTS_ = {
+    ARTIST_TABLE: [ARTIST_TABLE, SHOWS_TABLE],
+    VENUE_TABLE: [VENUE_TABLE, SHOWS_TABLE],
+    SHOWS_TABLE: [ARTIST_TABLE, VENUE_TABLE, SHOWS_TABLE],
+}
+
+
+def cached_search(table: str, key: Hashable, loader: Callable[[], dict]) -> dict:
+    """
+    Get the results of a search, performing it if they are not cached
+    :param table:   name of table searched
+    :param key:     canonical form of the search
+    :param loader:  function to perform the search
+    :return: copy of the search results dict
+    """
+    if not get_config("SEARCH_CACHE_SIZE"):
+        return loader()
+    results = __RESULTS__[table].get(key, loader)
+    # callers may add to the results, so don't share the cached dict
+    return {**results, "data": list(results["data"])}
+
+
+def invalidate_search_results(table: str, entity_id: int = None):
+    """
+    Invalidate the cached search results affected by a write
+    :param table:     name of table written
+    :param entity_id: id of entity written
+    """
+    for results_table in _AFFECTED_RESULTS_[table]:
+        __RESULTS__[results_table].invalidate()
+
+
+def search_cache_stats() -> dict:
+    """
+    Get the search result cache statistics
+    :return: dict of statistics by the table searched
+    """
+    return {table: cache.stats() for table, cache in __RESULTS__.items()}
+
+
+on_write(list(_AFFECTED_RESULTS_.keys()), invalidate_search_results)
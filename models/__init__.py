@@ -1,5 +1,5 @@
-from .models import (Venue, Artist, Show, Genre, Availability, db as SQLAlchemyDB,
-                     VENUE_TABLE, ARTIST_TABLE, SHOWS_TABLE, GENRES_TABLE, AVAILABILITY_TABLE,
+from .models import (Venue, Artist, Show, Genre, Availability, ShowArchive, db as SQLAlchemyDB,
+                     VENUE_TABLE, ARTIST_TABLE, SHOWS_TABLE, GENRES_TABLE, AVAILABILITY_TABLE, SHOWS_ARCHIVE_TABLE,
                      ARTIST_GENRES_TABLE, VENUE_GENRES_TABLE, AVAILABILITY_TABLE,
                      is_available_time_key, is_available, get_model_property_list,
                      new_model_dict, get_entity, Entity
@@ -14,12 +14,14 @@ __all__ = [
     'Show',
     'Genre',
     'Availability',
+    'ShowArchive',
     'SQLAlchemyDB',
     'VENUE_TABLE',
     'ARTIST_TABLE',
     'SHOWS_TABLE',
     'GENRES_TABLE',
     'AVAILABILITY_TABLE',
+    'SHOWS_ARCHIVE_TABLE',
     'ARTIST_GENRES_TABLE',
     'VENUE_GENRES_TABLE',
     'AVAILABILITY_TABLE',
@@ -5,7 +5,7 @@ from datetime import timedelta
 from typing import List, Union, Callable
 
 from flask_sqlalchemy import SQLAlchemy, Model
-from sqlalchemy import Date, cast, Column
+from sqlalchemy import Date, cast, Column, func
 from sqlalchemy.ext.hybrid import hybrid_property
 
 from .models_misc import MultiDictMixin, model_property_list, fq_column
@@ -35,17 +35,20 @@ GENRES_TABLE = 'Genres'  # name of genres table
 VENUE_GENRES_TABLE = 'venue_genres'  # name of venue/genres link table
 ARTIST_GENRES_TABLE = 'artist_genres'  # name of artist/genres link table
 AVAILABILITY_TABLE = 'Availability'  # name of availability table
+SHOWS_ARCHIVE_TABLE = 'ShowsArchive'  # name of archived shows table
 
 # many-to-many relationship between venues and genres
 venue_genres = db.Table(VENUE_GENRES_TABLE, db.Model.metadata,
                         db.Column('venue_id', db.Integer, db.ForeignKey(f"{VENUE_TABLE}.id"), primary_key=True),
-                        db.Column('genre_id', db.Integer, db.ForeignKey(f"{GENRES_TABLE}.id"), primary_key=True)
+                        db.Column('genre_id', db.Integer, db.ForeignKey(f"{GENRES_TABLE}.id"), primary_key=True),
+                        db.Index(f'ix_{VENUE_GENRES_TABLE}_genre_id', 'genre_id')
                         )
 
 # many-to-many relationship between artists and genres
 artist_genres = db.Table(ARTIST_GENRES_TABLE, db.Model.metadata,
                          db.Column('artist_id', db.Integer, db.ForeignKey(f"{ARTIST_TABLE}.id"), primary_key=True),
-                         db.Column('genre_id', db.Integer, db.ForeignKey(f"{GENRES_TABLE}.id"), primary_key=True)
+                         db.Column('genre_id', db.Integer, db.ForeignKey(f"{GENRES_TABLE}.id"), primary_key=True),
+                         db.Index(f'ix_{ARTIST_GENRES_TABLE}_genre_id', 'genre_id')
                          )
 
 
@@ -63,7 +66,8 @@ class Venue(MultiDictMixin, db.Model):
     facebook_link = db.Column(db.String(URL_LINK_LEN), nullable=True)
     image_link = db.Column(db.String(IMAGE_LINK_LEN), nullable=True)
 
-    genres = db.relationship('Genre', secondary=venue_genres, lazy='joined')
+    # genres are only loaded when accessed; queries which display or update them use selectinload()
+    genres = db.relationship('Genre', secondary=venue_genres, lazy='select')
 
     seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(SEEKING_ITEM_LEN))
@@ -88,7 +92,8 @@ class Artist(MultiDictMixin, db.Model):
     facebook_link = db.Column(db.String(URL_LINK_LEN), nullable=True)
     image_link = db.Column(db.String(IMAGE_LINK_LEN), nullable=True)
 
-    genres = db.relationship('Genre', secondary=artist_genres, lazy='joined')
+    # genres are only loaded when accessed; queries which display or update them use selectinload()
+    genres = db.relationship('Genre', secondary=artist_genres, lazy='select')
 
     seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(SEEKING_ITEM_LEN))
@@ -103,6 +108,11 @@ class Artist(MultiDictMixin, db.Model):
 # show table
 class Show(MultiDictMixin, db.Model):
     __tablename__ = SHOWS_TABLE
+    __table_args__ = (
+        db.Index(f'ix_{SHOWS_TABLE}_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index(f'ix_{SHOWS_TABLE}_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index(f'ix_{SHOWS_TABLE}_start_time_id', 'start_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey(f"{VENUE_TABLE}.id"), nullable=False)
@@ -129,6 +139,24 @@ class Show(MultiDictMixin, db.Model):
                f"start_time={self.start_time}, duration={self.duration})>"
 
 
+# archived show table; no foreign keys, so archived shows are kept when their venue or artist is deleted
+class ShowArchive(db.Model):
+    __tablename__ = SHOWS_ARCHIVE_TABLE
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)   # id of show
+    venue_id = db.Column(db.Integer, nullable=False)
+    venue_name = db.Column(db.String, nullable=False)
+    artist_id = db.Column(db.Integer, nullable=False)
+    artist_name = db.Column(db.String, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    duration = db.Column(db.Integer, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<ShowArchive(id={self.id}, venue_id={self.venue_id}, artist_id={self.artist_id}, " \
+               f"start_time={self.start_time}, duration={self.duration}, archived_at={self.archived_at})>"
+
+
 # genre table
 class Genre(MultiDictMixin, db.Model):
     __tablename__ = GENRES_TABLE
@@ -164,6 +192,9 @@ def is_available(availability):
 
 class Availability(MultiDictMixin, db.Model):
     __tablename__ = AVAILABILITY_TABLE
+    __table_args__ = (
+        db.Index(f'ix_{AVAILABILITY_TABLE}_artist_id_from_date', 'artist_id', 'from_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     artist_id = db.Column(db.Integer, db.ForeignKey(f"{ARTIST_TABLE}.id"), nullable=False)
@@ -202,6 +202,47 @@ function getVenueBookings(venueId, queryDate) {
     }
 }
 
+// replace the options of a select with the names matching a search
+function setNameOptions(select, names) {
+    const selected = select.find("option:selected");
+    const placeholder = select.find("option").first();
+    select.empty();
+    select.append(placeholder);
+    names.forEach(entry => {
+        select.append($("<option></option>").val(entry['id']).text(entry['name']));
+    });
+    if (parseInt(selected.val()) > 0) {
+        // keep the current selection available
+        if (select.find("option[value='" + selected.val() + "']").length == 0) {
+            select.append(selected);
+        }
+        select.val(selected.val());
+    } else if (names.length > 0) {
+        select.val(names[0]['id']).change();
+    }
+}
+
+// search names as the user types, to populate the artist/venue selects on edit show page
+function searchNames(input) {
+    const query = input.val();
+    const select = $(input.data("select"));
+    if (query.trim().length > 0) {
+        fetch(input.data("names-url") + "?q=" + encodeURIComponent(query), {
+            method: 'GET'
+        })
+        .then(response => response.json())
+        .then(jsonResponse => {
+            // ignore responses to superseded searches
+            if (input.val() == query) {
+                setNameOptions(select, jsonResponse['names']);
+            }
+        })
+        .catch(() => {
+            console.log("Name search failed");
+        });
+    }
+}
+
 const dowIds = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
 function setDowIndicator(startTime) {
     $(".dow-day").attr("class", "dow")
@@ -242,6 +283,13 @@ $(function () {
         }
     });
 
+    // search artist/venue names on edit show page
+    $("input.name-search").on("input", function () {
+        const input = $(this);
+        clearTimeout(input.data("timer"));
+        input.data("timer", setTimeout(function () { searchNames(input); }, 250));
+    });
+
     // update bookings for selected venue on edit show page
     $("select#venue_id").change(function (event) {
         event.stopPropagation()
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+Load and benchmark suite.
+Seeds a synthetic catalogue of venues, artists, availability and shows through the models, then drives every route
+registered in app.py, in ORM and/or engine mode, and reports the p50/p95/p99 latency, throughput and database
+statements per request of each route.
+
+Run from the project root against a scratch database, as the catalogue is added to it:
+    python test/benchmark.py seed [--venues N] [--artists N] [--shows N]
+    python test/benchmark.py run [--mode orm|engine|both] [--requests N] [--users N] [--json]
+    python test/benchmark.py clean
+
+Synthetic venues and artists are named 'Bench ...', so 'clean' can remove them, and the shows and availability
+which reference them, including any created by a run. 'run' exits with an error if a route wasn't requested, or a
+request failed.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, time
+from time import perf_counter
+from typing import Callable, List
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config   # noqa: E402
+
+# prefix of synthetic artist and venue names
+BENCH_PREFIX = 'Bench'
+# prefixes of artists and venues created and edited by runs, and created to be deleted
+CREATED_PREFIX = f'{BENCH_PREFIX} Created'
+EDITED_PREFIX = f'{BENCH_PREFIX} Edited'
+DISPOSABLE_PREFIX = f'{BENCH_PREFIX} Disposable'
+
+WORDS = ['Amber', 'Blue', 'Crimson', 'Delta', 'Echo', 'Fable', 'Golden', 'Harbor', 'Indigo', 'Jade', 'Kinetic',
+         'Lunar', 'Midnight', 'Neon', 'Orchid', 'Park', 'Quartz', 'River', 'Silver', 'Tidal', 'Union', 'Velvet',
+         'Wild', 'Zenith']
+PLACES = [('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('New York', 'NY'), ('Austin', 'TX'), ('Dallas', 'TX'),
+          ('Seattle', 'WA'), ('Chicago', 'IL'), ('Boston', 'MA'), ('Denver', 'CO'), ('Nashville', 'TN')]
+PHONE = '512-555-1234'
+LINK = 'https://www.facebook.com/bench'
+IMAGE = 'https://images.example.com/bench.png'
+
+# routes which aren't benchmarked
+EXCLUDED_ENDPOINTS = ['static', 'pool_status', 'profile_status', 'cache_status']
+
+PERCENTILES = [50, 95, 99]
+
+
+# ---------------------------------------------------------------------------- #
+# Catalogue.
+# ---------------------------------------------------------------------------- #
+
+def set_mode(mode: str):
+    """
+    Set the connection mode, which is read when the application is imported
+    :param mode: connection mode; 'orm' or 'engine'
+    """
+    config.CONNECTION_MODE = mode
+    config.USE_ORM = mode == config.ORM_CONNECTION
+    config.USE_ENGINE = mode == config.ENGINE_CONNECTION
+    # printing & profiling statements would distort the timings
+    config.PRINT_SQL = False
+    config.PROFILE_QUERIES = False
+
+
+def bench_name(rng: random.Random, kind: str, n: int) -> str:
+    return f'{BENCH_PREFIX} {rng.choice(WORDS)} {rng.choice(WORDS)} {kind} {n}'
+
+
+def seed(num_venues: int, num_artists: int, num_shows: int, rng_seed: int):
+    """
+    Seed the synthetic catalogue through the models
+    :param num_venues:  number of venues
+    :param num_artists: number of artists
+    :param num_shows:   number of shows, spread over two years either side of now
+    :param rng_seed:    random number generator seed
+    """
+    from app import app
+    from models import SQLAlchemyDB as db, Venue, Artist, Show, Availability, Genre
+
+    rng = random.Random(rng_seed)
+    with app.app_context():
+        genres = Genre.query.all()
+        venues = []
+        for n in range(num_venues):
+            city, state = rng.choice(PLACES)
+            venues.append(Venue(name=bench_name(rng, 'Hall', n), address=f'{n} Main St', city=city, state=state,
+                                phone=PHONE, facebook_link=LINK, image_link=IMAGE, seeking_talent=rng.random() < 0.5,
+                                genres=rng.sample(genres, min(len(genres), rng.randint(1, 3)))))
+        artists = []
+        for n in range(num_artists):
+            city, state = rng.choice(PLACES)
+            artists.append(Artist(name=bench_name(rng, 'Band', n), city=city, state=state, phone=PHONE,
+                                  facebook_link=LINK, image_link=IMAGE, seeking_venue=rng.random() < 0.5,
+                                  genres=rng.sample(genres, min(len(genres), rng.randint(1, 3)))))
+        db.session.add_all(venues + artists)
+        db.session.flush()
+
+        # available all day, every day, so shows may be created for any artist
+        all_day = {f'{day}_{end}': time(0, 0) if end == 'from' else time(23, 59)
+                   for day in ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'] for end in ['from', 'to']}
+        from_date = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=800)
+        db.session.bulk_save_objects([Availability(artist_id=artist.id, from_date=from_date, **all_day)
+                                      for artist in artists])
+
+        start = datetime.today().replace(minute=0, second=0, microsecond=0) - timedelta(days=365)
+        shows = [Show(venue_id=rng.choice(venues).id, artist_id=rng.choice(artists).id,
+                      start_time=start + timedelta(hours=rng.randrange(2 * 365 * 24)), duration=120)
+                 for _ in range(num_shows)]
+        db.session.bulk_save_objects(shows)
+        db.session.commit()
+    print(f'Seeded {num_venues} venues, {num_artists} artists and {num_shows} shows')
+
+
+def clean():
+    """
+    Remove the synthetic catalogue through the models
+    """
+    from sqlalchemy import select
+    from app import app
+    from models import SQLAlchemyDB as db, Venue, Artist, Show, Availability
+    from models.models import venue_genres, artist_genres
+
+    with app.app_context():
+        artist_ids = select(Artist.id).where(Artist.name.like(f'{BENCH_PREFIX} %'))
+        venue_ids = select(Venue.id).where(Venue.name.like(f'{BENCH_PREFIX} %'))
+        shows = Show.query.filter(Show.artist_id.in_(artist_ids) | Show.venue_id.in_(venue_ids)) \
+            .delete(synchronize_session=False)
+        Availability.query.filter(Availability.artist_id.in_(artist_ids)).delete(synchronize_session=False)
+        db.session.execute(artist_genres.delete().where(artist_genres.c.artist_id.in_(artist_ids)))
+        db.session.execute(venue_genres.delete().where(venue_genres.c.venue_id.in_(venue_ids)))
+        artists = Artist.query.filter(Artist.name.like(f'{BENCH_PREFIX} %')).delete(synchronize_session=False)
+        venues = Venue.query.filter(Venue.name.like(f'{BENCH_PREFIX} %')).delete(synchronize_session=False)
+        db.session.commit()
+    print(f'Removed {venues} venues, {artists} artists and {shows} shows')
+
+
+class Catalogue:
+    """
+    Class representing the synthetic catalogue in the database, from which requests are generated
+    :param engine:   database engine, independent of the application mode
+    :param rng_seed: random number generator seed
+    """
+    def __init__(self, engine, rng_seed: int):
+        from sqlalchemy import select, func
+        from models import Venue, Artist, Genre, Show
+
+        self.engine = engine
+        self.rng = random.Random(rng_seed)
+        self.lock = threading.Lock()
+        with engine.connect() as conn:
+            self.artist_ids, self.venue_ids = [
+                conn.execute(select(model.id).where(model.name.like(f'{BENCH_PREFIX} %'),
+                                                    model.name.notlike(f'{DISPOSABLE_PREFIX} %'))).scalars().all()
+                for model in [Artist, Venue]
+            ]
+            self.genres = conn.execute(select(Genre.name)).scalars().all()
+            latest = conn.execute(select(func.max(Show.start_time))).scalar()
+        if len(self.artist_ids) == 0 or len(self.venue_ids) == 0:
+            raise ValueError('No synthetic catalogue found, run "python test/benchmark.py seed" first')
+        # shows created by the run are after any existing shows
+        self.show_time = max(latest or datetime.today(), datetime.today()).replace(
+            hour=19, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        # created artists & venues are named uniquely across runs
+        self.run_id = os.urandom(4).hex()
+        self.count = 0
+
+    def choice(self, values: list):
+        with self.lock:
+            return self.rng.choice(values)
+
+    def artist_id(self) -> int:
+        return self.choice(self.artist_ids)
+
+    def venue_id(self) -> int:
+        return self.choice(self.venue_ids)
+
+    def word(self) -> str:
+        return self.choice(WORDS).lower()
+
+    def genre(self) -> str:
+        return self.choice(self.genres)
+
+    def place(self) -> tuple:
+        return self.choice(PLACES)
+
+    def next_count(self) -> int:
+        with self.lock:
+            self.count = self.count + 1
+            return self.count
+
+    def next_show_time(self) -> datetime:
+        """ Start time of a show which doesn't conflict with other shows created by the run """
+        with self.lock:
+            self.show_time = self.show_time + timedelta(days=1)
+            return self.show_time
+
+    def disposable(self, table) -> int:
+        """
+        Insert an artist or venue to be deleted
+        :param table: Artist or Venue model table
+        :return: id of entity
+        """
+        city, state = self.place()
+        values = {"name": f'{DISPOSABLE_PREFIX} {self.run_id} {self.next_count()}', "city": city, "state": state}
+        if table.name == 'Venue':
+            values["address"] = '1 Main St'
+            values["seeking_talent"] = False
+        else:
+            values["seeking_venue"] = False
+        with self.engine.begin() as conn:
+            return conn.execute(table.insert().values(**values).returning(table.c.id)).scalar_one()
+
+
+def artist_form(cat: Catalogue, prefix: str) -> dict:
+    city, state = cat.place()
+    form = {'name': f'{prefix} Band {cat.run_id} {cat.next_count()}', 'city': city, 'state': state, 'phone': PHONE,
+            'genres': [cat.genre()], 'facebook_link': LINK, 'image_link': IMAGE, 'website': LINK,
+            'seeking_venue': 'y', 'seeking_description': 'gigs',
+            'from_date': (datetime.today() + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M')}
+    # available at any time, so shows may be created for them
+    form.update({f'{day}_{end}': '00:00' if end == 'from' else '23:59'
+                 for day in ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'] for end in ['from', 'to']})
+    return form
+
+
+def venue_form(cat: Catalogue, prefix: str) -> dict:
+    city, state = cat.place()
+    return {'name': f'{prefix} Hall {cat.run_id} {cat.next_count()}', 'address': '1 Main St', 'city': city,
+            'state': state, 'phone': PHONE, 'genres': [cat.genre()], 'facebook_link': LINK, 'image_link': IMAGE,
+            'website': LINK, 'seeking_talent': 'y', 'seeking_description': 'bands'}
+
+
+def show_entry(cat: Catalogue) -> dict:
+    return {'artist_id': cat.artist_id(), 'venue_id': cat.venue_id(),
+            'start_time': cat.next_show_time().strftime('%Y-%m-%d %H:%M'), 'duration': 120}
+
+
+def advanced_search(cat: Catalogue) -> dict:
+    return {'name': cat.word(), 'city': '', 'state': 'none', 'genres': [cat.genre()]}
+
+
+def query_date() -> str:
+    return datetime.today().strftime('%Y-%m-%d %H:%M')
+
+
+# ---------------------------------------------------------------------------- #
+# Tasks.
+# ---------------------------------------------------------------------------- #
+
+class Task:
+    """
+    Class representing a request type
+    :param method:  request method
+    :param rule:    url rule requested, for reporting
+    :param request: function generating the request arguments for the test client from the catalogue
+    """
+    def __init__(self, method: str, rule: str, request: Callable[[Catalogue], dict]):
+        self.method = method
+        self.rule = rule
+        self.request = request
+
+    @property
+    def name(self):
+        return f'{self.method} {self.rule}'
+
+
+TASKS = [
+    Task('GET', '/', lambda cat: {'path': '/'}),
+
+    Task('GET', '/shows', lambda cat: {'path': f'/shows?page={cat.choice(range(1, 6))}'}),
+    Task('GET', '/shows?filterby=upcoming', lambda cat: {'path': '/shows?filterby=upcoming'}),
+    Task('POST', '/shows/search', lambda cat: {'path': '/shows/search?mode=basic',
+                                               'data': {'search_term': cat.word()}}),
+    Task('GET', '/shows/advanced_search', lambda cat: {'path': '/shows/advanced_search'}),
+    Task('POST', '/shows/advanced_search', lambda cat: {'path': '/shows/advanced_search',
+                                                        'data': advanced_search(cat)}),
+    Task('GET', '/shows/export', lambda cat: {'path': f'/shows/export?format=json&filterby=upcoming'
+                                                      f'&genres={cat.genre()}'}),
+    Task('GET', '/shows/create', lambda cat: {'path': f'/shows/create?artist={cat.artist_id()}'
+                                                      f'&venue={cat.venue_id()}'}),
+    Task('POST', '/shows/create', lambda cat: {'path': '/shows/create', 'data': show_entry(cat)}),
+    Task('POST', '/shows/bulk', lambda cat: {'path': '/shows/bulk', 'json': [show_entry(cat) for _ in range(10)]}),
+
+    Task('GET', '/artists', lambda cat: {'path': '/artists'}),
+    Task('POST', '/artists/search', lambda cat: {'path': '/artists/search?mode=basic',
+                                                 'data': {'search_term': cat.word()}}),
+    Task('GET', '/artists/advanced_search', lambda cat: {'path': '/artists/advanced_search'}),
+    Task('POST', '/artists/advanced_search', lambda cat: {'path': '/artists/advanced_search',
+                                                          'data': advanced_search(cat)}),
+    Task('GET', '/artists/export', lambda cat: {'path': f'/artists/export?state={cat.place()[1]}'}),
+    Task('GET', '/artists/create', lambda cat: {'path': '/artists/create'}),
+    Task('POST', '/artists/create', lambda cat: {'path': '/artists/create', 'data': artist_form(cat, CREATED_PREFIX)}),
+    Task('GET', '/artists/names', lambda cat: {'path': f'/artists/names?q={cat.word()[:2]}'}),
+    Task('GET', '/artists/<artist_id>', lambda cat: {'path': f'/artists/{cat.artist_id()}'}),
+    Task('DELETE', '/artists/<artist_id>', lambda cat: {'path': f'/artists/{cat.disposable(_ARTIST_TABLE_)}'}),
+    Task('GET', '/artists/<artist_id>/edit', lambda cat: {'path': f'/artists/{cat.artist_id()}/edit'}),
+    Task('POST', '/artists/<artist_id>/edit', lambda cat: {'path': f'/artists/{cat.artist_id()}/edit',
+                                                           'data': artist_form(cat, EDITED_PREFIX)}),
+    Task('GET', '/artists/<artist_id>/availability', lambda cat: {
+        'path': f'/artists/{cat.artist_id()}/availability?query_date={query_date()}'}),
+
+    Task('GET', '/venues', lambda cat: {'path': '/venues'}),
+    Task('POST', '/venues/search', lambda cat: {'path': '/venues/search?mode=basic',
+                                                'data': {'search_term': cat.word()}}),
+    Task('GET', '/venues/advanced_search', lambda cat: {'path': '/venues/advanced_search'}),
+    Task('POST', '/venues/advanced_search', lambda cat: {'path': '/venues/advanced_search',
+                                                         'data': advanced_search(cat)}),
+    Task('GET', '/venues/export', lambda cat: {'path': f'/venues/export?format=json&city={quote(cat.place()[0])}'}),
+    Task('GET', '/venues/create', lambda cat: {'path': '/venues/create'}),
+    Task('POST', '/venues/create', lambda cat: {'path': '/venues/create', 'data': venue_form(cat, CREATED_PREFIX)}),
+    Task('GET', '/venues/names', lambda cat: {'path': f'/venues/names?q={cat.word()[:2]}'}),
+    Task('GET', '/venues/<venue_id>', lambda cat: {'path': f'/venues/{cat.venue_id()}'}),
+    Task('DELETE', '/venues/<venue_id>', lambda cat: {'path': f'/venues/{cat.disposable(_VENUE_TABLE_)}'}),
+    Task('GET', '/venues/<venue_id>/edit', lambda cat: {'path': f'/venues/{cat.venue_id()}/edit'}),
+    Task('POST', '/venues/<venue_id>/edit', lambda cat: {'path': f'/venues/{cat.venue_id()}/edit',
+                                                         'data': venue_form(cat, EDITED_PREFIX)}),
+    Task('GET', '/venues/<venue_id>/bookings', lambda cat: {
+        'path': f'/venues/{cat.venue_id()}/bookings?query_date={query_date()}'}),
+    Task('POST', '/venues/<venue_id>/search/artist', lambda cat: {
+        'path': f'/venues/{cat.venue_id()}/search/artist', 'data': {'name': cat.word(), 'genres': [cat.genre()]}}),
+]
+
+_ARTIST_TABLE_ = None
+_VENUE_TABLE_ = None
+
+
+# ---------------------------------------------------------------------------- #
+# Run.
+# ---------------------------------------------------------------------------- #
+
+class Recorder:
+    """
+    Class recording the database statements executed by each thread's current request
+    """
+    def __init__(self):
+        self.local = threading.local()
+
+    def reset(self):
+        self.local.count = 0
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(self.local, 'count', None) is not None:
+            self.local.count = self.local.count + 1
+
+    def stop(self) -> int:
+        count = self.local.count
+        self.local.count = None
+        return count
+
+
+def percentile(values: list, pct: int) -> float:
+    """
+    Get a percentile, using the nearest rank method
+    :param values: sorted values
+    :param pct:    percentile
+    """
+    return values[max(0, -(-len(values) * pct // 100) - 1)]
+
+
+def run_mode(mode: str, requests: int, users: int, rng_seed: int) -> dict:
+    """
+    Request every route in a mode
+    :param mode:     connection mode; 'orm' or 'engine'
+    :param requests: number of requests per route
+    :param users:    number of concurrent users
+    :param rng_seed: random number generator seed
+    :return: dict of results
+    """
+    global _ARTIST_TABLE_, _VENUE_TABLE_
+
+    set_mode(mode)
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.engine import Engine
+    from app import app
+    from models import Artist, Venue
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    _ARTIST_TABLE_ = Artist.__table__
+    _VENUE_TABLE_ = Venue.__table__
+
+    catalogue = Catalogue(create_engine(config.SQLALCHEMY_DATABASE_URI), rng_seed)
+    recorder = Recorder()
+    # all engines, as engine mode doesn't use the Flask-SQLAlchemy engine
+    event.listen(Engine, "before_cursor_execute", recorder.record)
+
+    adapter = app.url_map.bind('localhost')
+    routes = {(rule.endpoint, method) for rule in app.url_map.iter_rules()
+              if rule.endpoint not in EXCLUDED_ENDPOINTS
+              for method in rule.methods - {'HEAD', 'OPTIONS'}}
+
+    # tasks are performed in a random order by each user
+    schedule = [task for task in TASKS for _ in range(requests)]
+    random.Random(rng_seed).shuffle(schedule)
+    latencies = defaultdict(list)
+    queries = defaultdict(int)
+    failures = defaultdict(list)
+    requested = set()
+    lock = threading.Lock()
+
+    def user(tasks: List[Task]):
+        client = app.test_client()
+        for task in tasks:
+            kwargs = task.request(catalogue)
+            path = kwargs.pop('path')
+            endpoint, _ = adapter.match(path.split('?')[0], method=task.method)
+            recorder.reset()
+            start = perf_counter()
+            response = client.open(path, method=task.method, **kwargs)
+            # consume streamed responses
+            response.get_data()
+            elapsed = perf_counter() - start
+            count = recorder.stop()
+            with lock:
+                latencies[task.name].append(elapsed)
+                queries[task.name] = queries[task.name] + count
+                requested.add((endpoint, task.method))
+                if response.status_code >= 400:
+                    failures[task.name].append(response.status_code)
+
+    # warm up process-wide caches, e.g. genres and search indices
+    user([task for task in TASKS if task.method == 'GET'])
+    for values in [latencies, queries, failures]:
+        values.clear()
+
+    threads = [threading.Thread(target=user, args=(schedule[i::users],)) for i in range(users)]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = perf_counter() - start
+
+    results = {}
+    for task in TASKS:
+        times = sorted(latencies[task.name])
+        results[task.name] = {
+            "requests": len(times),
+            **{f'p{pct}': percentile(times, pct) * 1000 for pct in PERCENTILES},
+            "queries": queries[task.name] / len(times),
+            "failures": failures[task.name],
+        }
+    return {
+        "mode": mode,
+        "users": users,
+        "requests": len(schedule),
+        "seconds": wall_time,
+        "throughput": len(schedule) / wall_time,
+        "routes": results,
+        "not_requested": sorted(f'{method} {endpoint}' for endpoint, method in routes - requested),
+    }
+
+
+def print_results(results: list):
+    """
+    Print the results of one or more modes side by side
+    :param results: list of results dicts
+    """
+    modes = [r["mode"] for r in results]
+    columns = [f'{col} {mode}' for col in [*[f'p{pct}' for pct in PERCENTILES], 'queries'] for mode in modes]
+    print(f'{"route (ms)":<40} ' + ' '.join(f'{c:>14}' for c in columns))
+    for task in TASKS:
+        values = [r["routes"][task.name][col.split()[0]] for col in columns for r in results
+                  if r["mode"] == col.split()[1]]
+        print(f'{task.name:<40} ' + ' '.join(f'{v:>14.2f}' for v in values))
+    print()
+    for r in results:
+        print(f'{r["mode"]} mode: {r["requests"]} requests by {r["users"]} user(s) in {r["seconds"]:.2f}s, '
+              f'{r["throughput"]:.1f} requests/s')
+        for name, route in r["routes"].items():
+            if len(route["failures"]) > 0:
+                print(f'  {name} failed {len(route["failures"])} times, status {sorted(set(route["failures"]))}')
+        for route in r["not_requested"]:
+            print(f'  {route} was not requested')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Fyyur load and benchmark suite')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    seed_parser = subparsers.add_parser('seed', help='seed the synthetic catalogue')
+    seed_parser.add_argument('--venues', type=int, default=200, help='number of venues')
+    seed_parser.add_argument('--artists', type=int, default=1000, help='number of artists')
+    seed_parser.add_argument('--shows', type=int, default=20000, help='number of shows')
+    seed_parser.add_argument('--seed', type=int, default=1, help='random number generator seed')
+    run_parser = subparsers.add_parser('run', help='request every route')
+    run_parser.add_argument('--mode', choices=[config.ORM_CONNECTION, config.ENGINE_CONNECTION, 'both'],
+                            default='both', help='connection mode')
+    run_parser.add_argument('--requests', type=int, default=20, help='number of requests per route')
+    run_parser.add_argument('--users', type=int, default=1, help='number of concurrent users')
+    run_parser.add_argument('--seed', type=int, default=1, help='random number generator seed')
+    run_parser.add_argument('--json', action='store_true', help='print the results as json')
+    subparsers.add_parser('clean', help='remove the synthetic catalogue')
+    args = parser.parse_args()
+
+    if args.command in ['seed', 'clean']:
+        # the models are used in orm mode
+        set_mode(config.ORM_CONNECTION)
+    if args.command == 'seed':
+        seed(args.venues, args.artists, args.shows, args.seed)
+        return 0
+    if args.command == 'clean':
+        clean()
+        return 0
+
+    if args.mode == 'both':
+        # the connection mode is fixed on import, so each mode is run in its own process
+        results = []
+        for mode in [config.ORM_CONNECTION, config.ENGINE_CONNECTION]:
+            process = subprocess.run([sys.executable, os.path.abspath(__file__), 'run', '--mode', mode,
+                                      '--requests', str(args.requests), '--users', str(args.users),
+                                      '--seed', str(args.seed), '--json'],
+                                     stdout=subprocess.PIPE, text=True)
+            output = process.stdout.splitlines()
+            if len(output) == 0:
+                raise RuntimeError(f'{mode} mode run failed with exit code {process.returncode}')
+            # results are the last line of output
+            results.append(json.loads(output[-1]))
+    else:
+        results = [run_mode(args.mode, args.requests, args.users, args.seed)]
+
+    if args.json:
+        print(json.dumps(results[0] if len(results) == 1 else results))
+    else:
+        print_results(results)
+    failed = any(len(route["failures"]) > 0 for r in results for route in r["routes"].values()) or \
+        any(len(r["not_requested"]) > 0 for r in results)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
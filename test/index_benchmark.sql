@@ -0,0 +1,126 @@
+-- Benchmark for the indexes added by migration 3d9a6c1e7b42.
+--
+-- Seeds synthetic artists, venues, shows and availability in a transaction, runs EXPLAIN ANALYZE on the
+-- application's hot query shapes and rolls everything back, leaving the database unchanged.
+-- Run it with the database at revision f8fe5c0c244c (before) and at 3d9a6c1e7b42 (after), e.g.
+--     flask db downgrade f8fe5c0c244c
+--     psql -d fyyur -f test/index_benchmark.sql > before.txt
+--     flask db upgrade
+--     psql -d fyyur -f test/index_benchmark.sql > after.txt
+
+BEGIN;
+
+SET myvars.num_artists TO 5000;
+SET myvars.num_venues TO 1000;
+SET myvars.num_shows TO 200000;
+
+INSERT INTO public."Artist" (name, city, state, seeking_venue)
+    SELECT 'Bench Artist ' || md5(i::text), 'City ' || (i % 300), 'CA', false
+    FROM generate_series(1, current_setting('myvars.num_artists')::int) AS i;
+
+INSERT INTO public."Venue" (name, address, city, state, seeking_talent)
+    SELECT 'Bench Venue ' || md5(i::text), i || ' Main St', 'City ' || (i % 300), 'CA', false
+    FROM generate_series(1, current_setting('myvars.num_venues')::int) AS i;
+
+CREATE TEMP TABLE bench_artist ON COMMIT DROP AS
+    SELECT id, row_number() OVER (ORDER BY id) AS n FROM public."Artist" WHERE name LIKE 'Bench Artist %';
+CREATE TEMP TABLE bench_venue ON COMMIT DROP AS
+    SELECT id, row_number() OVER (ORDER BY id) AS n FROM public."Venue" WHERE name LIKE 'Bench Venue %';
+
+-- shows spread over two years either side of now
+INSERT INTO public."Shows" (venue_id, artist_id, start_time, duration)
+    SELECT v.id, a.id, date_trunc('hour', now()) + ((i % 17520) - 8760) * interval '1 hour', 120
+    FROM generate_series(1, current_setting('myvars.num_shows')::int) AS i
+    INNER JOIN bench_artist a ON a.n = 1 + (i::bigint * 7919) % current_setting('myvars.num_artists')::int
+    INNER JOIN bench_venue v ON v.n = 1 + (i::bigint * 104729) % current_setting('myvars.num_venues')::int;
+
+-- four availability entries per artist
+INSERT INTO public."Availability" (artist_id, from_date, mon_from, mon_to)
+    SELECT a.id, date_trunc('day', now()) + (q * 90 - 180) * interval '1 day', '09:00', '23:00'
+    FROM bench_artist a CROSS JOIN generate_series(0, 3) AS q;
+
+INSERT INTO public."artist_genres" (artist_id, genre_id)
+    SELECT a.id, g.id FROM bench_artist a INNER JOIN public."Genres" g ON g.id % 7 = a.id % 7;
+INSERT INTO public."venue_genres" (venue_id, genre_id)
+    SELECT v.id, g.id FROM bench_venue v INNER JOIN public."Genres" g ON g.id % 5 = v.id % 5;
+
+ANALYZE public."Artist", public."Venue", public."Shows", public."Availability",
+    public."artist_genres", public."venue_genres";
+
+-- upcoming shows for an artist page
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT "Shows".venue_id, "Shows".start_time, "Venue".name, "Venue".image_link FROM "Shows"
+    INNER JOIN "Venue" ON "Shows".venue_id = "Venue".id
+    WHERE "Shows".artist_id = (SELECT id FROM bench_artist WHERE n = 100) AND "Shows".start_time > now()
+    ORDER BY "Shows".start_time;
+
+-- upcoming shows for a venue page
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT "Shows".artist_id, "Shows".start_time, "Artist".name, "Artist".image_link FROM "Shows"
+    INNER JOIN "Artist" ON "Shows".artist_id = "Artist".id
+    WHERE "Shows".venue_id = (SELECT id FROM bench_venue WHERE n = 100) AND "Shows".start_time > now()
+    ORDER BY "Shows".start_time;
+
+-- venue bookings for a day
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT "Shows".start_time, "Shows".duration, "Artist".name FROM "Shows"
+    INNER JOIN "Artist" ON "Shows".artist_id = "Artist".id
+    WHERE "Shows".venue_id = (SELECT id FROM bench_venue WHERE n = 100)
+      AND "Shows".start_time >= date_trunc('day', now()) AND "Shows".start_time < date_trunc('day', now()) + interval '1 day';
+
+-- booking conflicts for a new show, at the venue or by the artist elsewhere
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT "Shows".start_time, "Shows".duration, "Shows".venue_id, "Shows".artist_id FROM "Shows"
+    WHERE ("Shows".venue_id = (SELECT id FROM bench_venue WHERE n = 100)
+           OR "Shows".artist_id = (SELECT id FROM bench_artist WHERE n = 100))
+      AND "Shows".start_time > date_trunc('hour', now()) - interval '1 day'
+      AND "Shows".start_time < date_trunc('hour', now()) + interval '2 hours'
+      AND "Shows".start_time + make_interval(mins => "Shows".duration) > date_trunc('hour', now());
+
+-- artist availability at a date
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM "Availability"
+    WHERE "Availability".artist_id = (SELECT id FROM bench_artist WHERE n = 100) AND "Availability".from_date <= now()
+    ORDER BY "Availability".from_date DESC, "Availability".id DESC LIMIT 1;
+
+-- deep page of the show listing, keyset pagination
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT "Shows".venue_id, "Shows".artist_id, "Shows".start_time, "Shows".id FROM "Shows"
+    WHERE ("Shows".start_time, "Shows".id) > (now() + interval '300 days', 0)
+    ORDER BY "Shows".start_time, "Shows".id LIMIT 7;
+
+-- artists by genre
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT "Artist".id, "Artist".name FROM "Artist"
+    WHERE EXISTS (SELECT 1 FROM "artist_genres" WHERE "artist_genres".artist_id = "Artist".id
+        AND "artist_genres".genre_id = ANY(ARRAY(SELECT id FROM "Genres" ORDER BY id LIMIT 2)));
+
+-- shows by venue or artist genre
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT COUNT("Shows".venue_id) FROM (("Shows" INNER JOIN "Venue" ON "Shows".venue_id = "Venue".id)
+        INNER JOIN "Artist" ON "Shows".artist_id = "Artist".id)
+    WHERE EXISTS (SELECT 1 FROM "venue_genres" WHERE "venue_genres".venue_id = "Venue".id
+            AND "venue_genres".genre_id = ANY(ARRAY(SELECT id FROM "Genres" ORDER BY id LIMIT 2)))
+        OR EXISTS (SELECT 1 FROM "artist_genres" WHERE "artist_genres".artist_id = "Artist".id
+            AND "artist_genres".genre_id = ANY(ARRAY(SELECT id FROM "Genres" ORDER BY id LIMIT 2)));
+
+-- name search, substring pattern; served by trigram indexes only
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT "Artist".id, "Artist".name FROM "Artist" WHERE LOWER("Artist".name) LIKE LOWER('%a1b%');
+
+-- name search, prefix pattern
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT "Artist".id, "Artist".name FROM "Artist" WHERE LOWER("Artist".name) LIKE LOWER('bench artist a1b%');
+
+-- city search
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT "Venue".id, "Venue".name FROM "Venue" WHERE LOWER("Venue".city) LIKE LOWER('%ity 12%');
+
+-- name search, full text word prefixes ranked by relevance
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT "Artist".id, "Artist".name FROM "Artist"
+    WHERE to_tsvector('simple', "Artist".name) @@ to_tsquery('simple', 'bench:* & a1:*')
+    ORDER BY ts_rank(to_tsvector('simple', "Artist".name), to_tsquery('simple', 'bench:* & a1:*')) DESC,
+        "Artist".name, "Artist".id;
+
+ROLLBACK;
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Listing queries benchmark.
+Requests the listing, search and detail pages, and reports the number and time of the database statements each
+executes. Exits with an error if a listing or search page queries the genre tables, or a detail page needs more than
+one statement to load genres.
+
+Run from the project root against a database containing the sample data, see load_initial_data.py:
+    python test/listing_queries.py [repeats]
+"""
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event     # noqa: E402
+from sqlalchemy.engine import Engine    # noqa: E402
+
+import config   # noqa: E402
+# printing statements would distort the timings
+config.PRINT_SQL = False
+
+from app import app     # noqa: E402
+from models import GENRES_TABLE, ARTIST_GENRES_TABLE, VENUE_GENRES_TABLE   # noqa: E402
+
+# pages which don't display genres; (method, url, form data)
+LISTINGS = [
+    ('GET', '/', None),
+    ('GET', '/artists', None),
+    ('GET', '/venues', None),
+    ('GET', '/shows', None),
+    ('POST', '/artists/search?mode=basic', {'search_term': 'a'}),
+    ('POST', '/venues/search?mode=basic', {'search_term': 'the'}),
+    ('POST', '/shows/search?mode=basic', {'search_term': 'park'}),
+    ('GET', '/artists/names?q=gu', None),
+    ('GET', '/artists/1/availability', None),
+    ('GET', '/venues/1/bookings', None),
+    ('GET', '/shows/create?artist=1&venue=1', None),
+]
+# pages which display genres
+GENRE_PAGES = [
+    ('GET', '/artists/1', None),
+    ('GET', '/venues/1', None),
+    ('GET', '/artists/1/edit', None),
+    ('GET', '/venues/1/edit', None),
+]
+
+GENRE_TABLES = [f'"{GENRES_TABLE}"'.lower(), ARTIST_GENRES_TABLE.lower(), VENUE_GENRES_TABLE.lower()]
+
+statements = []
+
+
+def _record(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+def genre_statements(executed: list) -> list:
+    """
+    Get the statements which query the genre tables
+    :param executed: executed statements
+    """
+    return [s for s in executed if any(t in s.lower() for t in GENRE_TABLES)]
+
+
+def measure(client, method: str, url: str, data: dict, repeats: int) -> tuple:
+    """
+    Request a page
+    :param client:  test client
+    :param method:  request method
+    :param url:     page url
+    :param data:    form data
+    :param repeats: number of times to request the page
+    :return: tuple of (statements executed by the last request, average request time in ms)
+    """
+    # first request loads the process-wide caches
+    client.open(url, method=method, data=data)
+    start = perf_counter()
+    for _ in range(repeats):
+        statements.clear()
+        response = client.open(url, method=method, data=data)
+        if response.status_code != 200:
+            raise ValueError(f'{method} {url} returned {response.status_code}')
+    return list(statements), (perf_counter() - start) * 1000 / repeats
+
+
+def main(repeats: int) -> int:
+    app.config['WTF_CSRF_ENABLED'] = False
+    # all engines, as engine mode doesn't use the Flask-SQLAlchemy engine
+    event.listen(Engine, "before_cursor_execute", _record)
+    client = app.test_client()
+
+    print(f'{config.CONNECTION_MODE} mode, average of {repeats} requests')
+    print(f'{"page":<40} {"statements":>10} {"genre":>6} {"ms":>8}')
+    failures = []
+    for pages, max_genre in [(LISTINGS, 0), (GENRE_PAGES, 1)]:
+        for method, url, data in pages:
+            executed, ms = measure(client, method, url, data, repeats)
+            genre = genre_statements(executed)
+            print(f'{f"{method} {url}":<40} {len(executed):>10} {len(genre):>6} {ms:>8.2f}')
+            if len(genre) > max_genre:
+                failures.append((method, url, genre))
+
+    for method, url, genre in failures:
+        print(f'\n{method} {url} queried genres in {len(genre)} statement(s):')
+        for statement in genre:
+            print(f'  {" ".join(statement.split())}')
+    return 1 if len(failures) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))